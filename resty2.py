@@ -1,8 +1,38 @@
 import streamlit as st
+import altair as alt
 import requests
 import pandas as pd
 import json
+import os
+import re
+import tempfile
+import time
+import weakref
+from datetime import datetime, timezone
 from urllib.parse import urljoin
+from resty_client import RestyClient, SalesforceAPIError, send_record_request, DEFAULT_POOL_SIZE
+from resty_async import SyncRestyClient
+from resty_limits import RateLimiter, fetch_api_limits, DEFAULT_RATE, DEFAULT_BURST, DEFAULT_RESERVE_PERCENT
+from resty_retry import RetryPolicy, DEFAULT_MAX_ATTEMPTS
+from resty_cache import ResponseCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_ENTRIES
+from resty_query import PageFetchError, get_many, DEFAULT_QUERY_WORKERS
+from resty_chunking import DEFAULT_CHUNK_SIZE
+from resty_engine import iter_spec_pages, schema_resolver as engine_schema_resolver
+from resty_trace import Tracer, current_tracer, span, SPAN_KIND_CLIENT
+from resty_sinks import ListSink, TypedDataFrameSink, drain, export_sink, export_frame, EXPORT_FORMATS
+from resty_schema import SchemaCache
+from resty_flatten import flatten_frame, explode_children, query_fields, PARENT_ROW
+from resty_extract import ExtractCheckpoint, is_expired_locator, resume_rest_pages, DEFAULT_SPOOL_DIR, SPOOL_FORMATS
+from resty_session import SessionCache, spec_key, DEFAULT_RESULT_CACHE_MB
+from resty_viewer import FrameView, filter_kind, filter_choices, page_count, PAGE_SIZES, DEFAULT_PAGE_SIZE
+from resty_jobs import JobRunner, fetch_job, collections_job, ingest_job, DEFAULT_JOB_WORKERS
+from resty_orgs import load_profiles, fetch_org, fan_out, merge_org_frames, merge_org_children, DEFAULT_PROFILES_DIR, DEFAULT_ORG_WORKERS
+from resty_mirror import ObjectMirror, MirrorSink, plan_sync, finish_sync, MIRROR_ENGINES, DEFAULT_MIRROR_PATH
+from resty_bulk import (BulkJobError, iter_bulk_job_pages, api_version_from_path, sobject_from_soql, bulk_ingest, read_ingest_file,
+                        DEFAULT_BULK_THRESHOLD, DEFAULT_INGEST_WORKERS, INGEST_OPERATIONS)
+from resty_composite import (run_collections, run_composite_batch, collection_results_frame, frame_records,
+                             validate_collection_records, CompositeRequestBuilder, composite_failures, composite_results_frame,
+                             COLLECTION_OPERATIONS, DEFAULT_DML_WORKERS)
 
 #------------------------------------------------------
 # Salesforce RESTY Streamlit Application
@@ -44,102 +74,571 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-def load_auth_credentials(auth_file):
-    """Loads Salesforce credentials and API version from an auth.json file with nested result structure."""
-    auth_data = json.load(auth_file)
-    # Access the 'result' object
-    result = auth_data.get('result', {})
-    access_token = result.get('accessToken')
-    instance_url = result.get('instanceUrl')
-    api_version = result.get('apiVersion', '60.0')  # Default to 60.0 if missing
-
-    if not access_token or not instance_url:
-        raise ValueError("Missing required credentials (accessToken or instanceUrl) in auth.json under 'result'")
-
-    return {
-        'access_token': access_token,
-        'instance_url': instance_url,
-        'api_version': api_version
-    }
+HTTP_ENGINES = ["requests (thread pool)", "httpx (asyncio)"]
 
-def determine_record_key(endpoint_path, response_json):
-    """Determines the key to use for accessing records based on the endpoint."""
-    endpoint_key = endpoint_path.split('/')[-1]
-    if endpoint_key in response_json:
-        return endpoint_key
-    return next(iter(response_json.keys()), 'records')
+@st.cache_resource(show_spinner=False)
+def get_rate_limiter(instance_url):
+    """Returns the API budget limiter for instance_url, shared by every client and session talking to that org."""
+    return RateLimiter()
 
-def fetch_data(method, full_url, headers, instance_url, endpoint_path, all_pages=False, payload=None, soql_query=None):
-    """Fetches or modifies data using the specified HTTP method, with support for SOQL queries."""
-    method = method.upper()
-    all_records = []
-    response_json = None
+@st.cache_resource(show_spinner=False)
+def get_response_cache(instance_url):
+    """Returns the GET response cache for instance_url, shared by every client and session talking to that org."""
+    return ResponseCache()
 
-    if method == "GET":
-        if 'query' in endpoint_path.lower() and soql_query:
-            params = {'q': soql_query}
+@st.cache_resource(show_spinner=False)
+def get_http_client(instance_url, pool_size=DEFAULT_POOL_SIZE, keep_alive=True, engine=HTTP_ENGINES[0], max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """Returns a pooled keep-alive client for instance_url, shared across Streamlit reruns."""
+    limiter = get_rate_limiter(instance_url)
+    cache = get_response_cache(instance_url)
+    retry_policy = RetryPolicy(max_attempts=max_attempts)
+    if engine == "httpx (asyncio)":
+        return SyncRestyClient(instance_url, pool_size=pool_size, keep_alive=keep_alive, limiter=limiter, retry_policy=retry_policy, cache=cache)
+    return RestyClient(instance_url, pool_size=pool_size, keep_alive=keep_alive, limiter=limiter, retry_policy=retry_policy, cache=cache)
+
+@st.cache_resource(show_spinner=False)
+def get_schema_cache(instance_url):
+    """Returns the parsed describe schemas for instance_url, shared across reruns and sessions."""
+    return SchemaCache()
+
+@st.cache_resource(show_spinner=False)
+def get_object_mirror(path, engine):
+    """Returns the open mirror database at path, shared across reruns and sessions."""
+    return ObjectMirror(path, engine)
+
+@st.cache_resource(show_spinner=False)
+def get_job_runner():
+    """Returns the background job runner; its worker pool is shared by every session, so concurrent users queue instead of piling up threads."""
+    return JobRunner(DEFAULT_JOB_WORKERS)
+
+def org_client(instance_url, connection, budget, cache_settings):
+    """Applies the sidebar's API budget and response cache settings to an org and returns its pooled client.
+
+    connection is (pool_size, keep_alive, engine, max_attempts), budget (rate, reserve_percent, enabled) and
+    cache_settings (max_entries, disk_dir, enabled).
+    """
+    rate, reserve_percent, throttle = budget
+    get_rate_limiter(instance_url).configure(rate=rate, burst=max(int(rate), DEFAULT_BURST), reserve_percent=reserve_percent, enabled=throttle)
+    max_entries, disk_dir, enabled = cache_settings
+    get_response_cache(instance_url).configure(max_entries=max_entries, disk_dir=disk_dir, enabled=enabled)
+    return get_http_client(instance_url, *connection)
+
+def get_session_cache():
+    """Returns this browser session's cache of credentials, client and results, kept in st.session_state across reruns."""
+    if 'resty_session' not in st.session_state:
+        session_cache = SessionCache()
+        # The session state goes away with the browser session; its jobs and their results go with it
+        weakref.finalize(session_cache, get_job_runner().forget, session_cache.owner)
+        st.session_state['resty_session'] = session_cache
+    return st.session_state['resty_session']
+
+def schema_resolver(client, headers, instance_url, api_version, soql_query=None):
+    """Returns resty_engine's resolve_schema callback on the org's schema cache, warning in the UI when a describe fails."""
+    return engine_schema_resolver(client, headers, instance_url, api_version, soql_query, get_schema_cache(instance_url), st.warning)
+
+def render_frame_size(df):
+    """Notes how much memory the result table takes."""
+    st.caption(f"{len(df):,} rows, {df.memory_usage(deep=True).sum() / (1024 * 1024):,.1f} MB in memory")
+
+def result_view(df, key):
+    """Returns the FrameView of df kept for this viewer across reruns, so paging does not filter and sort again."""
+    views = st.session_state.setdefault('result_views', {})
+    view = views.get(key)
+    if view is None or view.df is not df:
+        view = views[key] = FrameView(df)
+    return view
+
+def render_filter(series, key):
+    """Shows the filter widget of one column; returns its (op, value) or None while it does not narrow anything."""
+    kind = filter_kind(series)
+    if kind == 'values':
+        chosen = st.multiselect(series.name, filter_choices(series), key=f"{key}_in", placeholder="Any value")
+        return ('in', tuple(chosen)) if chosen else None
+    if kind == 'range':
+        low_column, high_column = st.columns(2)
+        if pd.api.types.is_datetime64_any_dtype(series.dtype):
+            low = low_column.date_input(f"{series.name} from", value=None, key=f"{key}_low")
+            high = high_column.date_input(f"{series.name} to", value=None, key=f"{key}_high")
+            # date_input gives days; the upper bound takes in the whole last day
+            high = pd.Timestamp(high) + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1) if high is not None else None
         else:
-            params = None
+            low = low_column.number_input(f"{series.name} from", value=None, key=f"{key}_low")
+            high = high_column.number_input(f"{series.name} to", value=None, key=f"{key}_high")
+        return ('range', (low, high)) if low is not None or high is not None else None
+    text = st.text_input(f"{series.name} contains", key=f"{key}_contains")
+    return ('contains', text) if text else None
 
-        while full_url:
-            try:
-                response = requests.get(full_url, headers=headers, params=params)
-                if response.status_code != 200:
-                    st.error(f"Failed to fetch data: {response.status_code} {response.text}")
-                    st.write("Raw Response:", response.text)
-                    return None, None
-                
-                try:
-                    response_json = response.json()
-                except json.JSONDecodeError as e:
-                    st.error(f"Failed to parse response as JSON: {e}")
-                    st.write("Raw Response:", response.text)
-                    return None, None
-
-                if 'query' in endpoint_path.lower():
-                    all_records.extend(response_json.get('records', []))
-                    if all_pages and 'nextRecordsUrl' in response_json:
-                        st.write(f"Next Records URL: {response_json['nextRecordsUrl']}")
-                        full_url = urljoin(instance_url, response_json['nextRecordsUrl'])
-                        params = None
-                    else:
-                        full_url = None
-                else:
-                    record_key = determine_record_key(endpoint_path, response_json)
-                    all_records.extend(response_json.get(record_key, []))
-                    if all_pages and 'nextPageUrl' in response_json and response_json['nextPageUrl'] is not None:
-                        st.write(f"Next Page URL: {response_json['nextPageUrl']}")
-                        full_url = urljoin(instance_url, response_json['nextPageUrl'])
-                    else:
-                        full_url = None
+def render_result_viewer(df, key="result", kept=True):
+    """Shows df one page at a time, with sorting and column filters applied on the server.
+
+    Only the rows of the current page are sent to the browser, so the tab stays responsive whatever
+    the result size. The index keeps each row's number in the full result. Every widget change reruns
+    the script, so a result that is not kept in the session cache only gets its first page.
+    """
+    if not kept:
+        st.caption(f"First {min(len(df), DEFAULT_PAGE_SIZE):,} of {len(df):,} rows. This result is not kept in the session cache "
+                   "(it is larger than Result cache (MB), or incomplete), so it cannot be paged, sorted or filtered.")
+        st.dataframe(df.head(DEFAULT_PAGE_SIZE), use_container_width=True)
+        return
+    view = result_view(df, key)
+    with st.expander("Sort and filter", expanded=False):
+        sort_column, order_column, size_column = st.columns([3, 1, 1])
+        sort_by = sort_column.selectbox("Sort by", [None] + list(df.columns), format_func=lambda column: "(fetched order)" if column is None else column,
+                                        key=f"{key}_sort")
+        ascending = order_column.radio("Order", ["Ascending", "Descending"], key=f"{key}_order", disabled=sort_by is None) == "Ascending"
+        page_size = size_column.selectbox("Rows per page", PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE), key=f"{key}_page_size")
+        filters = []
+        for column in st.multiselect("Filter columns", list(df.columns), key=f"{key}_filter_columns"):
+            condition = render_filter(df[column], f"{key}_filter_{column}")
+            if condition is not None:
+                filters.append((column, *condition))
+    try:
+        rows = len(view.rows(tuple(filters), sort_by, ascending))
+    except (TypeError, ValueError) as e:
+        st.error(f"Could not apply the filters: {e}")
+        return
+    # A new filter or sort starts again from the first page
+    signature = (tuple(filters), sort_by, ascending, page_size)
+    if st.session_state.get(f"{key}_signature") != signature:
+        st.session_state[f"{key}_signature"] = signature
+        st.session_state[f"{key}_page"] = 1
+    pages = page_count(rows, page_size)
+    st.session_state[f"{key}_page"] = min(st.session_state.get(f"{key}_page", 1), pages)
+    page = st.number_input("Page", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+    window, rows = view.window(page, page_size, tuple(filters), sort_by, ascending)
+    first = (page - 1) * page_size + 1 if rows else 0
+    filtered = f", filtered from {len(df):,}" if filters else ""
+    st.caption(f"Page {page:,} of {pages:,}: rows {first:,}-{first + len(window) - 1 if rows else 0:,} of {rows:,}{filtered}")
+    st.dataframe(window, use_container_width=True)
+
+def explode_first_subquery(df, children):
+    """Joins the first subquery's child records onto their parents; returns the exploded frame and the other children."""
+    relationship = next(iter(children))
+    remaining = {path: child for path, child in children.items() if path != relationship}
+    return explode_children(df, children, relationship), remaining
+
+def render_download(path, export_format, file_name='salesforce_data', label="Download", key=None):
+    """Serves an exported file from disk in the chosen format."""
+    extension, mime = EXPORT_FORMATS[export_format]
+    with open(path, 'rb') as export_file:
+        st.download_button(
+            label=f"{label} {export_format} ({os.path.getsize(path) / 1024:,.0f} KB)",
+            data=export_file,
+            file_name=f"{file_name}{extension}",
+            mime=mime,
+            key=key
+        )
+
+def temp_export_path(export_format):
+    """Returns a fresh temporary file path with the format's extension."""
+    export_fd, export_path = tempfile.mkstemp(suffix=EXPORT_FORMATS[export_format][0])
+    os.close(export_fd)
+    return export_path
+
+def render_child_frames(children, export_format, key_prefix="result", kept=True):
+    """Shows each subquery's child records as its own table linked to the parent rows."""
+    for relationship, child in children.items():
+        st.subheader(f"{relationship} (subquery)")
+        st.caption(f"{len(child):,} records, linked to the parent table's row number by {PARENT_ROW}")
+        render_result_viewer(child, f"{key_prefix}_{relationship}", kept)
+        export_path = temp_export_path(export_format)
+        try:
+            export_frame(child, export_format, export_path)
+            render_download(export_path, export_format, f"salesforce_{relationship.replace('.', '_')}", f"Download {relationship}",
+                            f"download_{key_prefix}_{relationship}")
+        finally:
+            os.remove(export_path)
+
+def render_cache_stats(cache):
+    """Shows the response cache hit/miss counters in the sidebar, with a button to empty it."""
+    with st.sidebar:
+        stats = cache.summary()
+        st.caption(
+            f"Cache: {stats['hits']} hits, {stats['revalidated']} revalidated (304), {stats['misses']} misses "
+            f"({stats['hit_ratio']:.0%} served from cache); {stats['entries']} entries, {stats['bytes'] / 1024:,.0f} KB in memory"
+        )
+        if st.button("Clear response cache", key="clear_cache"):
+            cache.clear()
+            st.caption("Response cache cleared.")
 
+def render_session_cache_stats(session_cache):
+    """Shows what the session cache holds in the sidebar, with a button to forget it."""
+    with st.sidebar:
+        stats = session_cache.summary()
+        st.caption(
+            f"Session: {stats['results']} results, {stats['bytes'] / (1024 * 1024):,.1f} of {stats['max_bytes'] / (1024 * 1024):,.0f} MB; "
+            f"{stats['hits']} reruns served without calling the API"
+        )
+        if st.button("Clear session cache", key="clear_session", help="Forget cached results and re-read auth.json on the next run"):
+            session_cache.clear()
+            st.caption("Session cache cleared.")
+
+def export_name(export_format, exploded):
+    return f"{export_format} ({'exploded' if exploded else 'parent rows'})"
+
+def read_bytes(path):
+    with open(path, 'rb') as export_file:
+        return export_file.read()
+
+def frame_export_bytes(df, export_format):
+    """Encodes a DataFrame in one of EXPORT_FORMATS and returns the file content."""
+    export_path = temp_export_path(export_format)
+    try:
+        export_frame(df, export_format, export_path)
+        return read_bytes(export_path)
+    finally:
+        os.remove(export_path)
+
+def render_cached_result(session_cache, key, entry, export_format, explode_subqueries, key_prefix="result", kept=True):
+    """Shows a result kept in the session cache without calling the API; each download format is encoded once."""
+    fetched_at = datetime.fromtimestamp(entry['stored']).strftime('%H:%M:%S')
+    st.info(f"Showing {entry['records']:,} records fetched at {fetched_at}, kept in this session. Execute to fetch them again.")
+    if st.button("Discard cached result", key=f"discard_{key_prefix}"):
+        session_cache.invalidate(key=key)
+        st.caption("Cached result discarded.")
+        return
+    df, children = entry['df'], entry['children']
+    exploded = explode_subqueries and bool(children)
+    if exploded:
+        df, children = explode_first_subquery(df, children)
+    if df.empty:
+        st.warning("No data returned.")
+        return
+    render_frame_size(df)
+    render_result_viewer(df, key_prefix, kept)
+    if session_cache.results.get(key) is entry:
+        data = session_cache.export(entry, export_name(export_format, exploded), lambda: frame_export_bytes(df, export_format))
+    else:
+        data = frame_export_bytes(df, export_format)
+    extension, mime = EXPORT_FORMATS[export_format]
+    st.download_button(f"Download {export_format} ({len(data) / 1024:,.0f} KB)", data=data, file_name=f"salesforce_data{extension}", mime=mime,
+                       key=f"download_{key_prefix}")
+    render_child_frames(children, export_format, key_prefix, kept)
+    with st.expander("Response JSON"):
+        st.json(entry['last_response'])
+    if entry.get('tracer') is not None:
+        render_trace(entry['tracer'], f"{key_prefix}_trace")
+
+def render_api_budget(limiter, instance_url, api_version, headers, client):
+    """Shows the org's remaining daily API budget in the sidebar, with a /limits refresh."""
+    with st.sidebar:
+        if st.button("Refresh API usage from /limits", key="refresh_limits"):
+            try:
+                limiter.observe(*fetch_api_limits(client, headers, instance_url, api_version))
             except requests.RequestException as e:
-                st.error(f"Request failed: {e}")
-                return None, None
-        return all_records, response_json
+                st.error(f"Failed to read /limits: {e}")
+        if limiter.remaining is None:
+            st.caption("API usage is read from the Sforce-Limit-Info header of the next response.")
+            return
+        st.metric("Daily API requests remaining", f"{limiter.remaining:,} / {limiter.maximum:,}")
+        st.progress(min(limiter.used / limiter.maximum, 1.0) if limiter.maximum else 0.0)
+        st.caption(f"{limiter.reserve:,} reserved for other integrations; {limiter.available:,} usable; throttle at {limiter.current_rate():.1f} req/s")
 
-    elif method == "POST":
-        response = requests.post(full_url, headers=headers, json=payload)
-        if response.status_code not in (200, 201):
-            st.error(f"Failed to create data: {response.status_code} {response.text}")
-            return None, None
-        response_json = response.json()
-        return response_json, response_json
+MAX_WATERFALL_ROWS = 300
 
-    elif method == "PATCH":
-        response = requests.patch(full_url, headers=headers, json=payload)
-        if response.status_code != 204:
-            st.error(f"Failed to update data: {response.status_code} {response.text}")
+def trace_waterfall(records):
+    """Lays spans out as waterfall bars: one row per HTTP call or step, HTTP phases drawn on their call's row."""
+    http_ids = {record['span_id'] for record in records if record['kind'] == SPAN_KIND_CLIENT}
+    origin = min(record['start'] for record in records)
+    rows, labels = [], {}
+    for record in records:
+        if record['parent_id'] in http_ids:
+            continue
+        if len(labels) >= MAX_WATERFALL_ROWS:
+            break
+        labels[record['span_id']] = f"{len(labels) + 1:03d} {record['name']}"
+    for record in records:
+        owner = record['parent_id'] if record['parent_id'] in http_ids else record['span_id']
+        if owner not in labels or record['span_id'] in http_ids:
+            continue
+        rows.append({
+            'row': labels[owner],
+            'phase': record['name'],
+            'start_ms': (record['start'] - origin) / 1e6,
+            'end_ms': (record['end'] - origin) / 1e6,
+            'duration_ms': round(record['duration_ms'], 2)
+        })
+    return pd.DataFrame(rows), len(labels)
+
+def render_trace(tracer, key="trace"):
+    """Shows where a run spent its time: network, Salesforce or client totals, a waterfall and span exports."""
+    records = tracer.to_records()
+    if not records:
+        return
+    with st.expander(f"Request trace ({sum(record['kind'] == SPAN_KIND_CLIENT for record in records):,} HTTP calls)"):
+        categories = tracer.categories()
+        for column, (name, millis) in zip(st.columns(len(categories)), categories.items()):
+            column.metric(name.capitalize(), f"{millis:,.0f} ms")
+        st.caption(f"Mostly {max(categories, key=categories.get)}-bound. Times are summed over spans, so parallel work can exceed the wall-clock time; "
+                   "connect includes DNS, ttfb is Salesforce's time to first byte.")
+        breakdown = pd.DataFrame(sorted(tracer.breakdown().items(), key=lambda item: -item[1]), columns=['step', 'ms'])
+        st.dataframe(breakdown, use_container_width=True, hide_index=True)
+        frame, row_count = trace_waterfall(records)
+        if row_count >= MAX_WATERFALL_ROWS:
+            st.caption(f"Waterfall shows the first {MAX_WATERFALL_ROWS} calls and steps; the exports hold every span.")
+        chart = alt.Chart(frame).mark_bar().encode(
+            x=alt.X('start_ms:Q', title='ms since first span'),
+            x2='end_ms:Q',
+            y=alt.Y('row:N', sort=None, title=None, axis=alt.Axis(labelLimit=320)),
+            color=alt.Color('phase:N', title='phase / step'),
+            tooltip=['row', 'phase', 'start_ms', 'duration_ms']
+        ).properties(height=min(18 * row_count + 40, 2400))
+        st.altair_chart(chart, use_container_width=True)
+        json_col, otlp_col = st.columns(2)
+        with json_col:
+            st.download_button("Download spans (JSON)", tracer.to_json(), file_name="resty_trace.json", mime="application/json", key=f"{key}_spans")
+        with otlp_col:
+            st.download_button("Download OTLP/JSON", tracer.to_json(otlp=True), file_name="resty_trace_otlp.json", mime="application/json", key=f"{key}_otlp")
+
+def extract_result_key(checkpoint, typed_columns):
+    """Returns the session cache key of a finished extract read back from disk."""
+    return spec_key(extract=checkpoint.directory, records=checkpoint.state['records'], typed_columns=typed_columns)
+
+def render_checkpoint(checkpoint):
+    """Describes an earlier run of this extract found on disk."""
+    state = checkpoint.state
+    if not checkpoint.started:
+        st.caption(f"No checkpoint yet; pages will be spooled under {checkpoint.directory}")
+    elif state['done']:
+        st.info(f"Extract complete: {state['records']:,} records spooled. Executing shows them from disk; discard the checkpoint to fetch again.")
+    elif state['source'] == 'bulk':
+        st.info(f"Checkpoint found: {state['records']:,} records spooled from Bulk job {state['job_id']}; executing resumes at result chunk {state['result_chunk'] + 1}.")
+    elif checkpoint.locator_expired:
+        st.info(f"Checkpoint found: {state['records']:,} records spooled, but its query locator has most likely expired; executing reruns the query "
+                f"and skips the records already spooled.")
+    else:
+        st.info(f"Checkpoint found: {state['records']:,} records spooled; executing resumes from {state['next_url']}.")
+
+def announce_next_pages(pages, endpoint_path, all_pages):
+    """Passes pages through, writing each next page URL as it is reached."""
+    label = "Next Records URL" if 'query' in endpoint_path.lower() else "Next Page URL"
+    for records, response_json in pages:
+        next_url = response_json.get('nextRecordsUrl') or response_json.get('nextPageUrl')
+        if all_pages and next_url:
+            st.write(f"{label}: {next_url}")
+        yield records, response_json
+
+PREVIEW_ROWS = 10_000
+PREVIEW_INTERVAL_SECONDS = 0.5
+
+class LiveProgress:
+    """Shows a GET while its pages stream in: the first page as soon as it arrives, then a growing preview table,
+    a progress bar against the total when it is known, and a rows/sec readout.
+
+    The preview is built from frame_sink's per-page chunks and stops growing at max_rows, so later pages only
+    update the bar; redraws are throttled to one per interval. The preview and bar are cleared once the stream
+    ends, leaving a summary caption above the final table.
+    """
+
+    def __init__(self, frame_sink, total=None, max_rows=PREVIEW_ROWS, interval=PREVIEW_INTERVAL_SECONDS):
+        self.frame_sink = frame_sink
+        self.total = total
+        self.max_rows = max_rows
+        self.interval = interval
+        self.pages = 0
+        self.preview_rows = 0
+        self.started = time.perf_counter()
+        self.first_page_seconds = None
+        self.drawn_at = None
+        self.bar = self.caption = self.table = None
+
+    def track(self, pages):
+        """Passes pages through, redrawing once each page has reached the sinks."""
+        try:
+            for records, response_json in pages:
+                yield records, response_json
+                self.pages += 1
+                if self.first_page_seconds is None:
+                    self.first_page_seconds = time.perf_counter() - self.started
+                if self.total is None:
+                    total = response_json.get('totalSize', response_json.get('numberRecordsProcessed'))
+                    self.total = total if isinstance(total, int) else None
+                if self.drawn_at is None or time.perf_counter() - self.drawn_at >= self.interval:
+                    self.draw()
+        finally:
+            self.finish()
+
+    def rate(self):
+        elapsed = time.perf_counter() - self.started
+        return self.frame_sink.count / elapsed if elapsed > 0 else 0.0
+
+    def draw(self):
+        if self.drawn_at is None:
+            # Placed on the first page, below whatever stream_data wrote while planning the fetch
+            self.bar, self.caption, self.table = st.empty(), st.empty(), st.empty()
+        count = self.frame_sink.count
+        text = f"{count:,}{f' of {self.total:,}' if self.total else ''} records in {self.pages} pages, {self.rate():,.0f} rows/sec"
+        if self.total:
+            self.bar.progress(min(count / self.total, 1.0), text=text)
+        else:
+            self.caption.caption(text)
+        if self.preview_rows < self.max_rows and count > self.preview_rows:
+            chunks, rows = [], 0
+            for chunk in self.frame_sink.chunks:
+                chunks.append(chunk)
+                rows += len(chunk)
+                if rows >= self.max_rows:
+                    break
+            preview = pd.concat(chunks).head(self.max_rows) if len(chunks) > 1 else chunks[0].head(self.max_rows)
+            self.preview_rows = len(preview)
+            self.table.dataframe(preview, use_container_width=True)
+        self.drawn_at = time.perf_counter()
+
+    def finish(self):
+        if self.drawn_at is not None:
+            self.bar.empty()
+            self.table.empty()
+            self.caption.caption(f"{self.frame_sink.count:,} records in {self.pages} pages, {self.rate():,.0f} rows/sec; "
+                                 f"first page after {self.first_page_seconds:.2f}s")
+
+def report_fetch_error(error):
+    """Shows a failed fetch in the UI with as much of the raw response as is available."""
+    if isinstance(error, SalesforceAPIError):
+        st.error(f"Failed to fetch data: {error}")
+        st.write("Raw Response:", error.response.text)
+    elif isinstance(error, BulkJobError):
+        st.error(f"Bulk query failed: {error}")
+        st.json(error.job_info)
+    elif isinstance(error, json.JSONDecodeError):
+        st.error(f"Failed to parse response as JSON: {error}")
+        st.write("Raw Response:", error.doc)
+    else:
+        st.error(f"Request failed: {error}")
+
+def consume_pages(pages, endpoint_path, sinks, all_pages=False, checkpoint=None, progress=None):
+    """Drains a page stream into sinks, reporting failures in the UI; returns the last response JSON or None on failure.
+
+    When a page still fails after retries, its URL is kept in st.session_state['resume_url'] so the
+    next run can continue from that page; the records already written to the sinks are kept. With a
+    checkpoint every page is spooled to disk first and the checkpoint itself records where to resume.
+    A LiveProgress replaces the next page URL lines with a preview that updates as pages arrive.
+    """
+    if checkpoint is not None:
+        pages = checkpoint.spool(pages, all_pages)
+    pages = progress.track(pages) if progress is not None else announce_next_pages(pages, endpoint_path, all_pages)
+    try:
+        response_json = drain(pages, *sinks)
+        st.session_state.pop('resume_url', None)
+        return response_json
+    except PageFetchError as e:
+        report_fetch_error(e.error)
+        if checkpoint is not None:
+            st.warning(f"Stopped at page {e.resume_url}. {checkpoint.state['records']:,} records are spooled; execute again to resume from the checkpoint.")
+        elif is_expired_locator(e):
+            # Resuming from a locator that is gone can only fail again
+            st.session_state.pop('resume_url', None)
+            st.warning("The query locator has expired (Salesforce keeps one for about 15 minutes unread); execute again to rerun the query from the first page.")
+        else:
+            st.session_state['resume_url'] = e.resume_url
+            st.warning(f"Stopped at page {e.resume_url}. Records fetched before it are kept; tick 'Resume from failed page' to continue from there.")
+    except (BulkJobError, json.JSONDecodeError, requests.RequestException) as e:
+        report_fetch_error(e)
+    return None
+
+def bulk_job_status(checkpoint=None):
+    """Returns an on_poll callback showing the Bulk job state in one line that updates, recording the job in the checkpoint."""
+    status = []
+
+    def show_job_state(job_info):
+        if checkpoint is not None:
+            checkpoint.start_bulk(job_info)
+        if not status:
+            # Placed at the first poll, so fetches that do not go to Bulk leave nothing behind
+            status.append(st.empty())
+        status[0].write(f"Bulk job {job_info.get('id')}: {job_info.get('state')}, {job_info.get('numberRecordsProcessed', 0)} records processed")
+
+    return show_job_state
+
+def stream_data(full_url, headers, instance_url, endpoint_path, sinks, all_pages=False, soql_query=None, client=None, parallel_workers=1,
+                query_engine="REST", api_version=None, bulk_threshold=DEFAULT_BULK_THRESHOLD, checkpoint=None, pk_chunk_size=None, progress=None):
+    """Streams GET result pages into sinks one page at a time, returning the last response JSON or None on failure.
+
+    query_engine is "REST", "Bulk API 2.0" or "Auto"; Auto picks Bulk when a COUNT() probe reaches bulk_threshold.
+    With an ExtractCheckpoint the pages are spooled to disk and a started extract continues where it stopped,
+    on the engine it started with. With pk_chunk_size a REST query over all pages is split into Id ranges of
+    about that many records, run parallel_workers at a time. A LiveProgress shows the pages as they arrive.
+    """
+    if client is None:
+        client = get_http_client(instance_url)
+    if api_version is None:
+        api_version = api_version_from_path(endpoint_path)
+
+    if checkpoint is not None and checkpoint.state['source'] == 'bulk':
+        # A checkpoint that already holds a job resumes that job's result download after the last spooled chunk
+        st.write(f"Resuming Bulk API 2.0 job {checkpoint.state['job_id']} after {checkpoint.state['records']:,} spooled records")
+        pages = iter_bulk_job_pages(client, headers, instance_url, api_version, checkpoint.state['job_id'], workers=parallel_workers,
+                                    on_poll=bulk_job_status(checkpoint), start=checkpoint.state['result_chunk'], locator=checkpoint.state['result_locator'])
+        return consume_pages(pages, endpoint_path, sinks, checkpoint=checkpoint, progress=progress)
+    # Extracts spool one page stream in order, so they are never split into Id-range chunks
+    spec = {'query': soql_query, 'all_pages': all_pages, 'engine': query_engine, 'bulk_threshold': bulk_threshold,
+            'chunk_size': pk_chunk_size if checkpoint is None else None}
+    on_total = (lambda total: setattr(progress, 'total', total)) if progress is not None else None
+    if checkpoint is not None and checkpoint.state['source'] == 'rest':
+        st.write(f"Resuming from {checkpoint.state['next_url']} after {checkpoint.state['records']:,} spooled records")
+        # An expired locator reruns the query on REST, the engine the extract started with
+        rest_spec = dict(spec, engine='REST')
+        pages = resume_rest_pages(
+            lambda: iter_spec_pages(client, headers, instance_url, api_version, endpoint_path, rest_spec, parallel_workers, st.write, on_total,
+                                    urljoin(instance_url, checkpoint.state['next_url'])),
+            lambda: iter_spec_pages(client, headers, instance_url, api_version, endpoint_path, rest_spec, parallel_workers, st.write, on_total),
+            checkpoint.state['records'], st.warning)
+        return consume_pages(pages, endpoint_path, sinks, all_pages, checkpoint, progress)
+    pages = iter_spec_pages(client, headers, instance_url, api_version, endpoint_path, spec, parallel_workers, st.write, on_total, full_url,
+                            bulk_job_status(checkpoint))
+    return consume_pages(pages, endpoint_path, sinks, all_pages, checkpoint, progress)
+
+def render_mirror_sync(mirror, soql_query, full_reload, headers, instance_url, endpoint_path, client, parallel_workers, query_engine, api_version, bulk_threshold,
+                       pk_chunk_size=None):
+    """Syncs the query's sObject into the local mirror: a full load the first time, then changes and deletions since the last sync."""
+    started_at = datetime.now(timezone.utc)
+    try:
+        sobject, sync_query, previous = plan_sync(mirror, soql_query, full_reload)
+    except ValueError as e:
+        st.error(str(e))
+        return
+    st.write(f"{'Incremental' if previous else 'Full'} sync of {sobject}: `{sync_query}`")
+    sink = MirrorSink(mirror, sobject, query_fields(sync_query), staged=previous is None)
+    # Every page is needed, and a delta always starts from the first page of its own query
+    if stream_data(urljoin(instance_url, endpoint_path), headers, instance_url, endpoint_path, [sink], True, sync_query, client, parallel_workers,
+                   query_engine, api_version, bulk_threshold, pk_chunk_size=pk_chunk_size) is None:
+        if previous is None:
+            st.warning(f"Full load stopped after {sink.count:,} records; the mirror keeps its previous copy of {sobject}.")
+        else:
+            st.warning(f"Sync stopped after {sink.count:,} records; the watermark is unchanged, so the next sync fetches them again.")
+        return
+    try:
+        state, warning = finish_sync(client, headers, instance_url, api_version, mirror, sobject, soql_query, sink, started_at, previous)
+    except (requests.RequestException, ValueError) as e:
+        st.warning(f"Upserted {sink.count:,} records but getDeleted failed, so the sync is not recorded: {e}")
+        return
+    if warning:
+        st.warning(warning)
+    st.success(f"{state['mode'].capitalize()} sync: {state['upserted']:,} records upserted, {state['deleted']:,} deleted; watermark {state['watermark']}")
+
+RECORD_ACTIONS = {"POST": "create", "PATCH": "update", "DELETE": "delete"}
+
+def fetch_data(method, full_url, headers, instance_url, endpoint_path, all_pages=False, payload=None, soql_query=None, client=None, parallel_workers=1,
+               query_engine="REST", api_version=None):
+    """Fetches or modifies data using the specified HTTP method, with support for SOQL queries."""
+    method = method.upper()
+    if client is None:
+        client = get_http_client(instance_url)
+    response_json = None
+
+    if method == "GET":
+        records = ListSink()
+        response_json = stream_data(full_url, headers, instance_url, endpoint_path, [records], all_pages, soql_query, client, parallel_workers,
+                                    query_engine, api_version)
+        if response_json is None:
             return None, None
-        response_json = response.json() if response.content else {"message": "Update successful"}
-        return response_json, response_json
+        return records.records, response_json
 
-    elif method == "DELETE":
-        response = requests.delete(full_url, headers=headers)
-        if response.status_code != 204:
-            st.error(f"Failed to delete data: {response.status_code} {response.text}")
+    elif method in RECORD_ACTIONS:
+        try:
+            response_json = send_record_request(client, method, full_url, headers, payload)
+        except SalesforceAPIError as e:
+            st.error(f"Failed to {RECORD_ACTIONS[method]} data: {e}")
             return None, None
-        response_json = {"message": "Delete successful"}
         return response_json, response_json
 
     else:
@@ -311,6 +810,428 @@ deleteData();
     
     return node_js_code
 
+def render_multi_org(profiles_dir, session_cache, org_client):
+    """Runs one GET or SOQL query against every selected org profile at once and shows the merged result with an org column.
+
+    org_client(instance_url) returns that org's own pooled client, so the orgs neither share connections nor
+    API budgets. The run takes about as long as the slowest org; a failing org is reported without stopping the others.
+    """
+    try:
+        profiles, skipped = load_profiles(profiles_dir)
+    except OSError as e:
+        st.error(f"Cannot read the profiles directory: {e}")
+        return
+    for file_name, reason in skipped:
+        st.warning(f"Skipped {file_name}: {reason}")
+    if not profiles:
+        st.info(f"No auth.json profiles in {profiles_dir}. Save one 'sf org display --json' output per org there.")
+        return
+    names = st.multiselect("Orgs", [profile['name'] for profile in profiles], default=[profile['name'] for profile in profiles])
+    selected = [profile for profile in profiles if profile['name'] in names]
+    endpoint_path = st.text_input(
+        "Endpoint Path",
+        value="/services/data/v{version}/query",
+        key="orgs_endpoint",
+        help="{version} becomes each org's API version from its auth file"
+    )
+    soql_query = None
+    if 'query' in endpoint_path.lower():
+        soql_query = st.text_area("SOQL Query", value="SELECT Id, Name FROM Organization", height=100, key="orgs_query")
+        if not soql_query.strip():
+            st.error("SOQL query is required for /query endpoint")
+            return
+    all_pages = st.checkbox("Fetch all pages", value=True, key="orgs_all_pages")
+    typed_columns = st.checkbox("Typed columns from describe", value=True, key="orgs_typed")
+    query_engine = st.radio("Query engine", ["REST", "Bulk API 2.0", "Auto"], horizontal=True, key="orgs_engine") if soql_query else "REST"
+    export_format = st.selectbox("Download format", list(EXPORT_FORMATS), key="orgs_format")
+    org_workers = st.number_input("Orgs at a time", min_value=1, max_value=256, value=DEFAULT_ORG_WORKERS, key="orgs_workers",
+                                  help="Orgs queried concurrently; each has its own connection pool and API budget")
+    result_key = spec_key(orgs=names, profiles_dir=profiles_dir, endpoint_path=endpoint_path, soql_query=soql_query, all_pages=all_pages,
+                          query_engine=query_engine, typed_columns=typed_columns)
+
+    if st.button(f"Run against {len(selected)} orgs", key="orgs_run", disabled=not selected):
+        spec = {'id': 'orgs', 'query': soql_query, 'all_pages': all_pages, 'engine': query_engine, 'typed': typed_columns}
+        # Clients and schema caches come from st.cache_resource, so they are looked up here rather than on the fan-out threads
+        clients = {profile['name']: org_client(profile['instance_url']) for profile in selected}
+        schema_caches = {profile['name']: get_schema_cache(profile['instance_url']) for profile in selected}
+        progress = st.progress(0.0, text=f"Querying {len(selected)} orgs")
+        started = time.perf_counter()
+        statuses, frames, children = [], {}, {}
+        runs = fan_out(selected, lambda profile: fetch_org(profile, clients[profile['name']], endpoint_path, spec, 1, schema_caches[profile['name']]),
+                       int(org_workers))
+        for done, (profile, result, error, seconds) in enumerate(runs, 1):
+            status = {'org': profile['name'], 'instance_url': profile['instance_url'], 'status': 'ok' if error is None else 'error',
+                      'records': 0, 'pages': 0, 'seconds': round(seconds, 3), 'error': None if error is None else str(error)}
+            if error is None:
+                frames[profile['name']], children[profile['name']] = result['df'], result['children']
+                status.update(records=result['records'], pages=result['pages'], error='; '.join(result['messages']) or None)
+            statuses.append(status)
+            progress.progress(done / len(selected), text=f"{done} of {len(selected)} orgs finished, {sum(s['records'] for s in statuses):,} records")
+        progress.empty()
+        org_status = pd.DataFrame(statuses).sort_values('org', ignore_index=True)
+        df = merge_org_frames(frames)
+        entry = session_cache.put(result_key, df, merge_org_children(children), {'orgs': statuses}, records=len(df), org_status=org_status,
+                                  seconds=time.perf_counter() - started, instance_urls=[profile['instance_url'] for profile in selected])
+        kept = entry is not None
+        if not kept:
+            entry = {'df': df, 'children': merge_org_children(children), 'last_response': {'orgs': statuses}, 'records': len(df), 'exports': {},
+                     'stored': time.time(), 'org_status': org_status, 'seconds': time.perf_counter() - started}
+    else:
+        entry, kept = session_cache.get(result_key), True
+        if entry is None:
+            return
+
+    org_status = entry['org_status']
+    failed = int((org_status['status'] != 'ok').sum())
+    st.subheader("Orgs")
+    st.caption(f"{len(org_status)} orgs in {entry['seconds']:.2f}s; the slowest took {org_status['seconds'].max():.2f}s"
+               + (f", {failed} failed" if failed else ""))
+    st.dataframe(org_status, use_container_width=True, hide_index=True)
+    render_cached_result(session_cache, result_key, entry, export_format, False, key_prefix="orgs", kept=kept)
+
+def render_concurrent_gets(instance_url, endpoint_paths, headers, client):
+    """Fetches several GET endpoints at once and shows each response in its own tab."""
+    urls = [urljoin(instance_url, path) for path in endpoint_paths]
+    if isinstance(client, SyncRestyClient):
+        results = client.get_many(urls, headers)
+    else:
+        results = get_many(client, urls, headers, client.pool_size)
+    for tab, path, result in zip(st.tabs(endpoint_paths), endpoint_paths, results):
+        with tab:
+            if isinstance(result, Exception):
+                st.error(f"Request failed: {result}")
+            else:
+                st.json(result)
+
+BULK_OPERATION_DEFAULTS = {"POST": "insert", "PATCH": "update", "DELETE": "delete"}
+COLLECTION_OPERATION_DEFAULTS = {"POST": "create", "PATCH": "update", "DELETE": "delete"}
+# Buttons of the DML panels; a click means records may have changed
+DML_BUTTON_KEYS = ("collections_dml", "composite_batch", "composite_request", "bulk_ingest")
+DML_MODES = ["Single record", "sObject Collections", "Composite batch", "Composite request", "Bulk API 2.0"]
+
+def example_composite_steps(api_version):
+    """Returns an Account with a Contact and an Opportunity linked through @{acct.id}."""
+    builder = CompositeRequestBuilder(api_version)
+    account_ref = builder.create('Account', 'acct', {'Name': 'New Account'})
+    builder.create('Contact', 'contact', {'LastName': 'New Contact', 'AccountId': account_ref})
+    builder.create('Opportunity', 'opportunity', {'Name': 'New Opportunity', 'StageName': 'Prospecting', 'CloseDate': '2030-12-31', 'AccountId': account_ref})
+    return builder.subrequests
+
+def render_composite_request(instance_url, api_version, headers, client):
+    """Renders the composite request builder and sends the dependent steps in one round trip."""
+    steps_input = st.text_area(
+        "Composite steps (JSON array)",
+        value=json.dumps(example_composite_steps(api_version), indent=2),
+        height=300,
+        help="Each step has referenceId, method, url and an optional body; later steps use @{referenceId.id} to reuse earlier results"
+    )
+    col1, col2 = st.columns(2)
+    with col1:
+        endpoint = st.radio("Endpoint", ["/composite", "/composite/graph"], horizontal=True,
+                            help="/composite takes up to 25 steps; /composite/graph up to 500 nodes in one graph")
+    with col2:
+        all_or_none = st.checkbox("All or none", value=True, help="Roll back every step if any step fails (/composite only; graphs always are)")
+
+    try:
+        steps = json.loads(steps_input) if steps_input.strip() else []
+        builder = CompositeRequestBuilder.from_steps(api_version, steps, all_or_none)
+    except json.JSONDecodeError:
+        st.error("Invalid JSON array of steps")
+        return
+    except (AttributeError, ValueError) as e:
+        st.error(f"Invalid composite steps: {e}")
+        return
+
+    graph = endpoint == "/composite/graph"
+    with st.expander("Request body"):
+        st.json(builder.build_graph() if graph else builder.build())
+
+    if st.button("Send composite request", key="composite_request"):
+        try:
+            responses = builder.send(client, headers, instance_url, graph)
+        except (requests.RequestException, ValueError) as e:
+            st.error(f"Composite request failed: {e}")
+            return
+        failed = composite_failures(responses)
+        if failed:
+            rolled_back = " and every step was rolled back" if graph or all_or_none else ""
+            st.error(f"{len(failed)} of {len(responses)} steps failed{rolled_back}: "
+                     f"{', '.join(str(response.get('referenceId')) for response in failed)}")
+        else:
+            st.success(f"{len(responses)} steps completed in one round trip")
+        st.dataframe(composite_results_frame(responses), use_container_width=True)
+        st.json(responses)
+
+def render_collections_dml(method, instance_url, api_version, headers, client):
+    """Renders the sObject Collections form and runs the chunked DML on request."""
+    col1, col2 = st.columns(2)
+    with col1:
+        sobject = st.text_input("sObject", value="Account", help="API name of the object to change")
+    with col2:
+        operation = st.selectbox("Operation", COLLECTION_OPERATIONS, index=COLLECTION_OPERATIONS.index(COLLECTION_OPERATION_DEFAULTS[method]))
+    external_id_field = None
+    if operation == 'upsert':
+        external_id_field = st.text_input("External ID field", value="Id", help="Field used to match existing records")
+
+    data_file = st.file_uploader("Records file (CSV or JSONL)", type=['csv', 'jsonl', 'ndjson', 'json'])
+    col1, col2 = st.columns(2)
+    with col1:
+        workers = st.slider("Concurrent calls", min_value=1, max_value=16, value=DEFAULT_DML_WORKERS,
+                            help="Number of 200-record calls in flight at once; capped at the connection pool size")
+    with col2:
+        all_or_none = st.checkbox("All or none", help="Roll back each 200-record chunk if any record in it fails")
+    background = st.checkbox("Run in background", key="collections_background", help="Run on the job pool and follow progress under Background jobs")
+
+    if data_file is None:
+        st.info("Upload a CSV or JSONL file whose columns are field API names (Id only for delete).")
+        return
+
+    records = frame_records(read_ingest_file(data_file))
+    st.write(f"{len(records)} records loaded")
+
+    if st.button(f"Run {operation} with sObject Collections", key="collections_dml"):
+        try:
+            validate_collection_records(operation, records)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        if background:
+            submit_job('dml', f"Collections {operation} of {len(records):,} {sobject}", collections_job, client, headers, instance_url, api_version,
+                       operation, sobject, records, all_or_none, external_id_field, workers,
+                       details={'instance_url': instance_url, 'operation': operation})
+            return
+        try:
+            with st.spinner(f"Running {operation} of {len(records)} {sobject} records"):
+                results = run_collections(client, headers, instance_url, api_version, operation, sobject, records, all_or_none,
+                                          external_id_field, workers)
+        except (requests.RequestException, ValueError) as e:
+            st.error(f"sObject Collections request failed: {e}")
+            return
+
+        render_collections_results(collection_results_frame(records, results), operation)
+
+def render_collections_results(results_df, operation, key=None):
+    """Shows the per-record outcome of an sObject Collections run with a CSV download."""
+    succeeded = int(results_df['success'].fillna(False).astype(bool).sum()) if not results_df.empty else 0
+    st.success(f"{succeeded} of {len(results_df)} records succeeded")
+    st.dataframe(results_df, use_container_width=True)
+    st.download_button(
+        label="Download results CSV",
+        data=results_df.to_csv(index=False).encode('utf-8'),
+        file_name=f'collections_{operation}_results.csv',
+        mime='text/csv',
+        key=key
+    )
+
+def render_composite_batch(instance_url, api_version, headers, client):
+    """Renders the /composite/batch form and runs the subrequests in 25-request batches on request."""
+    subrequests_input = st.text_area(
+        "Batch subrequests (JSON array)",
+        value=json.dumps([{"method": "GET", "url": f"v{api_version}/limits"}], indent=2),
+        height=200,
+        help="Each item has method, url (e.g. v60.0/sobjects/Account/001...) and an optional richInput body"
+    )
+    col1, col2 = st.columns(2)
+    with col1:
+        workers = st.slider("Concurrent calls", min_value=1, max_value=16, value=DEFAULT_DML_WORKERS,
+                            help="Number of 25-subrequest batches in flight at once")
+    with col2:
+        halt_on_error = st.checkbox("Halt on error", help="Stop the remaining subrequests of a batch after the first failure")
+
+    try:
+        subrequests = json.loads(subrequests_input) if subrequests_input.strip() else []
+    except json.JSONDecodeError:
+        st.error("Invalid JSON array of subrequests")
+        return
+    if not isinstance(subrequests, list):
+        st.error("Subrequests must be a JSON array")
+        return
+
+    if st.button("Run composite batch", key="composite_batch"):
+        try:
+            with st.spinner(f"Running {len(subrequests)} subrequests"):
+                results = run_composite_batch(client, headers, instance_url, api_version, subrequests, halt_on_error, workers)
+        except requests.RequestException as e:
+            st.error(f"Composite batch request failed: {e}")
+            return
+
+        failed = sum(1 for result in results if result.get('statusCode', 500) >= 400)
+        st.success(f"{len(results) - failed} of {len(results)} subrequests succeeded")
+        st.json(results)
+
+def render_bulk_ingest(method, instance_url, api_version, headers, client):
+    """Renders the Bulk API 2.0 ingest form for POST/PATCH/DELETE and runs the jobs on request."""
+    col1, col2 = st.columns(2)
+    with col1:
+        sobject = st.text_input("sObject", value="Account", help="API name of the object to load")
+    with col2:
+        operation = st.selectbox("Operation", INGEST_OPERATIONS, index=INGEST_OPERATIONS.index(BULK_OPERATION_DEFAULTS[method]))
+    external_id_field = None
+    if operation == 'upsert':
+        external_id_field = st.text_input("External ID field", value="Id", help="Field used to match existing records")
+
+    data_file = st.file_uploader("Records file (CSV or JSONL)", type=['csv', 'jsonl', 'ndjson', 'json'])
+    col1, col2 = st.columns(2)
+    with col1:
+        max_upload_mb = st.number_input("Max upload per job (MB)", min_value=1, max_value=100, value=100,
+                                        help="Larger files are split into several jobs of at most this size")
+    with col2:
+        workers = st.slider("Concurrent jobs", min_value=1, max_value=16, value=DEFAULT_INGEST_WORKERS)
+    background = st.checkbox("Run in background", key="ingest_background", help="Run on the job pool and follow progress under Background jobs")
+
+    if data_file is None:
+        st.info("Upload a CSV or JSONL file whose columns are field API names (Id only for delete).")
+        return
+
+    df = read_ingest_file(data_file)
+    st.write(f"{len(df)} records loaded")
+    st.dataframe(df.head(100), use_container_width=True)
+
+    if st.button(f"Run bulk {operation}", key="bulk_ingest"):
+        if background:
+            submit_job('dml', f"Bulk {operation} of {len(df):,} {sobject}", ingest_job, client, headers, instance_url, api_version,
+                       sobject, operation, df, external_id_field, int(max_upload_mb) * 1024 * 1024, workers,
+                       details={'instance_url': instance_url, 'operation': operation})
+            return
+        try:
+            with st.spinner(f"Running bulk {operation} of {len(df)} {sobject} records"):
+                job_infos, frames = bulk_ingest(client, headers, instance_url, api_version, sobject, operation, df, external_id_field,
+                                                int(max_upload_mb) * 1024 * 1024, workers)
+        except (BulkJobError, requests.RequestException, ValueError) as e:
+            st.error(f"Bulk ingest failed: {e}")
+            return
+
+        render_ingest_results(job_infos, frames, operation)
+
+def render_ingest_results(job_infos, frames, operation, key_prefix='download'):
+    """Shows the successful, failed and unprocessed records of a bulk ingest with CSV downloads, then the job infos."""
+    st.success(f"Bulk {operation} finished in {len(job_infos)} job(s)")
+    for name, frame in frames.items():
+        st.subheader(f"{name.title()} records ({len(frame)})")
+        if not frame.empty:
+            st.dataframe(frame, use_container_width=True)
+            st.download_button(
+                label=f"Download {name} CSV",
+                data=frame.to_csv(index=False).encode('utf-8'),
+                file_name=f'bulk_{operation}_{name}.csv',
+                mime='text/csv',
+                key=f'{key_prefix}_{name}'
+            )
+    st.subheader("Jobs")
+    st.json(job_infos)
+
+JOB_POLL_SECONDS = 1.0
+JOB_STATE_ICONS = {'queued': '⏳', 'running': '🔄', 'done': '✅', 'failed': '❌', 'cancelled': '⛔'}
+
+def submit_job(kind, label, fn, *args, details=None, tracer=None):
+    """Queues work on the shared job runner for this session and reruns, so the jobs panel starts polling."""
+    job = get_job_runner().submit(kind, label, fn, *args, owner=get_session_cache().owner, details=details, tracer=tracer)
+    st.session_state['shown_job'] = None
+    st.toast(f"Started background job {job.id}")
+    st.rerun()
+
+def collect_finished_jobs(runner, session_cache):
+    """Takes over the outcome of this session's newly finished jobs; returns True if any finished since the last call.
+
+    Fetch results move into the session cache under their request spec, with the streamed export file,
+    and leave the shared runner; one too large for the cache is spilled to a temporary file instead.
+    Finished DML drops the cached results of its org, which may no longer match, and spills its results.
+    """
+    changed = False
+    for job in runner.jobs(session_cache.owner):
+        if job.active or job.collected:
+            continue
+        job.collected = changed = True
+        export_path = job.details.get('export_path')
+        if job.kind == 'fetch':
+            if job.state == 'done':
+                result = job.result
+                entry = session_cache.put(job.details['result_key'], result['df'], result['children'], result['last_response'],
+                                          instance_url=job.details['instance_url'], records=result['records'], tracer=job.tracer)
+                if entry is not None:
+                    if export_path and os.path.exists(export_path):
+                        session_cache.export(entry, export_name(job.details['export_format'], False), lambda: read_bytes(export_path))
+                    # The session cache holds the frames now, under its memory cap
+                    job.release()
+                else:
+                    job.spill()
+            if export_path and os.path.exists(export_path):
+                os.remove(export_path)
+        elif job.state == 'done':
+            session_cache.invalidate(job.details.get('instance_url'))
+            job.spill()
+    return changed
+
+def render_job_list(runner, session_cache):
+    """Lists this session's jobs with progress, cancel, show and remove buttons; reruns the app when one finishes."""
+    jobs = runner.jobs(session_cache.owner)
+    running = sum(job.active for job in jobs)
+    with st.container(border=True):
+        st.markdown(f"**Background jobs** ({running} running)" if running else "**Background jobs**")
+        for job in jobs:
+            info_col, button_col = st.columns([5, 1])
+            with info_col:
+                text = f"{job.pages:,} pages, {job.records:,}{f' of {job.total:,}' if job.total else ''} records, {job.elapsed():.1f}s"
+                st.markdown(f"{JOB_STATE_ICONS[job.state]} **{job.label}** `{job.id}` {job.state}")
+                if job.active:
+                    fraction = job.fraction()
+                    st.progress(fraction if fraction is not None else 0.0, text=text if fraction is not None else f"{text} (total not known yet)")
+                else:
+                    st.caption(text)
+                if job.error:
+                    st.error(job.error)
+                elif job.messages:
+                    st.caption(job.messages[-1][1])
+            with button_col:
+                if job.active:
+                    if st.button("Cancel", key=f"cancel_job_{job.id}"):
+                        runner.cancel(job.id, session_cache.owner)
+                else:
+                    if job.state == 'done' and st.button("Show", key=f"show_job_{job.id}"):
+                        st.session_state['shown_job'] = job.id
+                        st.rerun()
+                    if st.button("Remove", key=f"remove_job_{job.id}"):
+                        runner.remove(job.id, session_cache.owner)
+                        if st.session_state.get('shown_job') == job.id:
+                            st.session_state['shown_job'] = None
+                        st.rerun()
+    if collect_finished_jobs(runner, session_cache):
+        st.rerun()
+
+def shows_job_result(result_key):
+    """Tells whether the jobs panel already shows the result kept under result_key."""
+    shown = get_job_runner().get(st.session_state.get('shown_job'), get_session_cache().owner)
+    return shown is not None and shown.details.get('result_key') == result_key
+
+def render_jobs(runner, session_cache):
+    """Shows the jobs panel, polling every JOB_POLL_SECONDS while a job is queued or running instead of holding the script."""
+    jobs = runner.jobs(session_cache.owner)
+    if not jobs:
+        return
+    active = any(job.active for job in jobs)
+    st.fragment(render_job_list, run_every=JOB_POLL_SECONDS if active else None)(runner, session_cache)
+    shown = runner.get(st.session_state.get('shown_job'), session_cache.owner)
+    if shown is None or shown.state != 'done':
+        return
+    st.subheader(f"Result of job {shown.id}: {shown.label}")
+    if shown.kind == 'fetch':
+        key = shown.details['result_key']
+        entry = session_cache.get(key)
+        if entry is None:
+            # Too large for the session cache; read back from the job's spill file
+            result = shown.load_result()
+            entry = dict(result, exports={}, stored=shown.finished, tracer=shown.tracer) if result is not None else None
+        if entry is None:
+            st.info("This result has been evicted from the session cache; run the job again to see it.")
+        else:
+            render_cached_result(session_cache, key, entry, shown.details['export_format'], False, key_prefix=f"job_{shown.id}")
+        return
+    result = shown.load_result()
+    if 'job_infos' in result:
+        render_ingest_results(result['job_infos'], result['frames'], shown.details['operation'], key_prefix=f"job_{shown.id}")
+    else:
+        render_collections_results(result['results'], shown.details['operation'], key=f"job_{shown.id}_results")
+
 def main():
     st.title("Salesforce RESTY")
 
@@ -356,11 +1277,68 @@ def main():
 
         # Upload auth.json file
         auth_json = st.file_uploader("Upload auth.json", type=['json'])
+        multi_org = st.checkbox("Multi-org mode", help="Run one GET or SOQL query against every org whose auth.json is in a directory, all at once")
+        profiles_dir = None
+        if multi_org:
+            profiles_dir = st.text_input("Profiles directory", value=DEFAULT_PROFILES_DIR, help="One 'sf org display --json' output per org")
+
+        # Connection pool settings for the shared HTTP client
+        pool_size = st.number_input(
+            "Connection pool size",
+            min_value=1,
+            max_value=100,
+            value=DEFAULT_POOL_SIZE,
+            help="Maximum number of keep-alive connections kept open to the instance"
+        )
+        keep_alive = st.checkbox("Keep-alive connections", value=True, help="Reuse TLS connections across requests and pages")
+        st.subheader("API budget")
+        throttle = st.checkbox("Throttle requests", value=True, help="Token-bucket throttling that slows down as the daily API quota runs low")
+        rate_limit = st.number_input("Max requests per second", min_value=1.0, max_value=500.0, value=DEFAULT_RATE, disabled=not throttle)
+        reserve_percent = st.slider(
+            "Reserve (% of daily API limit)",
+            min_value=0,
+            max_value=90,
+            value=int(DEFAULT_RESERVE_PERCENT),
+            help="Share of the daily quota this app never spends, kept for production integrations"
+        )
+        max_attempts = st.number_input(
+            "Max attempts per request",
+            min_value=1,
+            max_value=10,
+            value=DEFAULT_MAX_ATTEMPTS,
+            help="Retries connection errors, 5xx, UNABLE_TO_LOCK_ROW and REQUEST_LIMIT_EXCEEDED with jittered backoff; POST only when Salesforce did not process it"
+        )
+        st.subheader("Response cache")
+        cache_enabled = st.checkbox("Cache metadata GETs", value=True, help="Serve /sobjects, describe and /limits from a local cache within their TTL, then revalidate with ETag/If-Modified-Since")
+        cache_entries = st.number_input("Max cached responses", min_value=1, max_value=10000, value=DEFAULT_MAX_ENTRIES, disabled=not cache_enabled)
+        cache_dir = None
+        if cache_enabled and st.checkbox("Persist cache to disk", help="Keep cached responses across app restarts"):
+            cache_dir = st.text_input("Cache directory", value=DEFAULT_CACHE_DIR)
+        http_engine = st.radio("HTTP engine", HTTP_ENGINES, help="httpx (asyncio) runs concurrent page and endpoint requests on one event loop instead of threads")
+        trace_requests = st.checkbox("Trace request timings", value=True, help="Time connect, TLS, time to first byte, download, JSON decode, DataFrame build and encoding for every call")
+        st.subheader("Session cache")
+        result_cache_mb = st.number_input(
+            "Result cache (MB)",
+            min_value=0,
+            max_value=65536,
+            value=DEFAULT_RESULT_CACHE_MB,
+            help="Finished GET results kept in this browser session, so changing options or downloading again does not re-run the query"
+        )
+
+    session_cache = get_session_cache()
+    session_cache.configure(int(result_cache_mb) * 1024 * 1024)
+    render_session_cache_stats(session_cache)
 
     # Main content in a container
-    if auth_json is not None:
+    if multi_org:
         with st.container():
-            auth_credentials = load_auth_credentials(auth_json)
+            connection = (int(pool_size), keep_alive, http_engine, int(max_attempts))
+            budget = (rate_limit, reserve_percent, throttle)
+            cache_settings = (int(cache_entries), cache_dir, cache_enabled)
+            render_multi_org(profiles_dir, session_cache, lambda instance_url: org_client(instance_url, connection, budget, cache_settings))
+    elif auth_json is not None:
+        with st.container():
+            auth_credentials = session_cache.credentials_for(auth_json)
             instance_url = auth_credentials['instance_url'].strip()
             if not instance_url.startswith(('http://', 'https://')):
                 instance_url = 'https://' + instance_url
@@ -373,6 +1351,20 @@ def main():
                 help="Enter the Salesforce API version (e.g., 60.0). Loaded from auth.json if available, defaults to 60.0."
             )
 
+            # Every client for this org shares one limiter; apply the sidebar settings to it
+            limiter = get_rate_limiter(instance_url)
+            limiter.configure(rate=rate_limit, burst=max(int(rate_limit), DEFAULT_BURST), reserve_percent=reserve_percent, enabled=throttle)
+            cache = get_response_cache(instance_url)
+            cache.configure(max_entries=int(cache_entries), disk_dir=cache_dir, enabled=cache_enabled)
+            client_settings = (instance_url, int(pool_size), keep_alive, http_engine, int(max_attempts))
+            client = session_cache.client_for(client_settings, lambda: get_http_client(*client_settings))
+            render_api_budget(limiter, instance_url, api_version, {
+                'Authorization': f'Bearer {auth_credentials["access_token"]}',
+                'Content-Type': 'application/json'
+            }, client)
+            render_cache_stats(cache)
+            render_jobs(get_job_runner(), session_cache)
+
             # Layout with columns
             col1, col2 = st.columns([1, 2])
             with col1:
@@ -399,6 +1391,82 @@ def main():
 
             # Additional options
             all_pages = st.checkbox("Fetch all pages", disabled=method != "GET", help="Only applicable for GET requests")
+            typed_columns = method == "GET" and st.checkbox(
+                "Typed columns from describe",
+                value=True,
+                help="Describe the sObject once and build numeric, boolean, datetime and categorical picklist columns instead of text"
+            )
+            export_format = None
+            if method == "GET":
+                export_format = st.selectbox(
+                    "Download format",
+                    list(EXPORT_FORMATS),
+                    help="Written while the pages stream in; Parquet and Arrow IPC keep the describe types for Spark/DuckDB, gzip/zstd shrink CSV and JSONL"
+                )
+            explode_subqueries = False
+            if soql_query and re.search(r'\(\s*SELECT\b', soql_query, re.IGNORECASE):
+                explode_subqueries = st.radio(
+                    "Subquery results",
+                    ["Separate tables", "Explode into rows"],
+                    horizontal=True,
+                    help="Separate tables link child records to their parent row; exploding repeats the parent row for each record of the first subquery"
+                ) == "Explode into rows"
+            query_engine = "REST"
+            bulk_threshold = DEFAULT_BULK_THRESHOLD
+            if soql_query:
+                query_engine = st.radio(
+                    "Query engine",
+                    ["REST", "Bulk API 2.0", "Auto"],
+                    horizontal=True,
+                    help="Auto runs a COUNT() probe and switches to Bulk API 2.0 for large results"
+                )
+                if query_engine == "Auto":
+                    bulk_threshold = st.number_input(
+                        "Bulk threshold (records)",
+                        min_value=1,
+                        value=DEFAULT_BULK_THRESHOLD,
+                        help="Use Bulk API 2.0 when the query returns at least this many records"
+                    )
+            parallel_workers = 1
+            if soql_query and (all_pages or query_engine != "REST"):
+                if st.checkbox("Fetch pages in parallel", help="Request the remaining query pages or Bulk result chunks concurrently"):
+                    parallel_workers = st.slider(
+                        "Parallel workers",
+                        min_value=2,
+                        max_value=32,
+                        value=DEFAULT_QUERY_WORKERS,
+                        help="Concurrent page requests; capped at the connection pool size"
+                    )
+            pk_chunk_size = None
+            if soql_query and all_pages and query_engine != "Bulk API 2.0":
+                if st.checkbox("Split into Id-range chunks", help="PK chunking for REST: sample Id boundaries, then run one query per Id range on the parallel workers; skipped for ORDER BY, LIMIT, OFFSET and GROUP BY"):
+                    pk_chunk_size = int(st.number_input("Records per chunk", min_value=1000, value=DEFAULT_CHUNK_SIZE, step=1000))
+
+            dml_mode = DML_MODES[0]
+            if method in BULK_OPERATION_DEFAULTS:
+                dml_mode = st.radio(
+                    "DML mode",
+                    DML_MODES,
+                    horizontal=True,
+                    help="Collections: 200 records per call; Composite batch: 25 subrequests per call; Bulk API 2.0: large files"
+                )
+            if dml_mode != DML_MODES[0]:
+                headers = {
+                    'Authorization': f'Bearer {auth_credentials["access_token"]}',
+                    'Content-Type': 'application/json'
+                }
+                if dml_mode == "sObject Collections":
+                    render_collections_dml(method, instance_url, api_version, headers, client)
+                elif dml_mode == "Composite batch":
+                    render_composite_batch(instance_url, api_version, headers, client)
+                elif dml_mode == "Composite request":
+                    render_composite_request(instance_url, api_version, headers, client)
+                else:
+                    render_bulk_ingest(method, instance_url, api_version, headers, client)
+                if any(st.session_state.get(key) for key in DML_BUTTON_KEYS):
+                    # The org's data changed; results fetched before may no longer match it
+                    session_cache.invalidate(instance_url)
+                return
 
             if method in ["POST", "PATCH"]:
                 payload_input = st.text_area(
@@ -415,35 +1483,180 @@ def main():
             else:
                 payload = None
 
+            if method == "GET":
+                with st.expander("Fetch several endpoints concurrently"):
+                    endpoints_input = st.text_area(
+                        "Endpoint paths (one per line)",
+                        value=f"/services/data/v{api_version}/limits\n/services/data/v{api_version}/sobjects",
+                        height=100
+                    )
+                    endpoint_paths = [line.strip() for line in endpoints_input.splitlines() if line.strip()]
+                    if endpoint_paths and st.button("Fetch endpoints", key="fetch_many"):
+                        headers = {
+                            'Authorization': f'Bearer {auth_credentials["access_token"]}',
+                            'Content-Type': 'application/json'
+                        }
+                        render_concurrent_gets(instance_url, endpoint_paths, headers, client)
+
+            if soql_query:
+                with st.expander("Local mirror (incremental sync)"):
+                    mirror_col, engine_col = st.columns([3, 1])
+                    with mirror_col:
+                        mirror_path = st.text_input("Mirror database", value=DEFAULT_MIRROR_PATH)
+                    with engine_col:
+                        mirror_engine = st.selectbox("Engine", MIRROR_ENGINES)
+                    mirror = get_object_mirror(mirror_path, mirror_engine)
+                    full_reload = st.checkbox("Full reload", help="Empty the object's table and load every record instead of the changes since the last sync")
+                    if st.button("Sync to mirror", key="mirror_sync"):
+                        headers = {
+                            'Authorization': f'Bearer {auth_credentials["access_token"]}',
+                            'Content-Type': 'application/json'
+                        }
+                        render_mirror_sync(mirror, soql_query, full_reload, headers, instance_url, endpoint_path,
+                                           client,
+                                           parallel_workers, query_engine, api_version, int(bulk_threshold), pk_chunk_size)
+                    status = mirror.sync_status()
+                    if not status.empty:
+                        st.dataframe(status, use_container_width=True, hide_index=True)
+                        local_sql = st.text_area("Local SQL", value=f"SELECT * FROM {status['sobject'].iloc[0]} LIMIT 100", height=80)
+                        if st.button("Run local SQL", key="mirror_query"):
+                            try:
+                                st.dataframe(mirror.query(local_sql), use_container_width=True)
+                            except Exception as e:
+                                st.error(f"Query failed: {e}")
+
+            checkpoint = None
+            if method == "GET" and st.checkbox("Extract job mode", help="Spool every page to disk and checkpoint progress, so a rerun or crash resumes where it stopped"):
+                spool_col, format_col = st.columns([3, 1])
+                with spool_col:
+                    spool_dir = st.text_input("Spool directory", value=DEFAULT_SPOOL_DIR)
+                with format_col:
+                    spool_format = st.selectbox("Spool format", SPOOL_FORMATS)
+                checkpoint = ExtractCheckpoint.open(instance_url, endpoint_path, soql_query, query_engine, spool_dir, spool_format)
+                render_checkpoint(checkpoint)
+                if st.button("Discard checkpoint", key="discard_checkpoint", disabled=not checkpoint.started):
+                    session_cache.invalidate(key=extract_result_key(checkpoint, typed_columns))
+                    checkpoint.discard()
+                    checkpoint = ExtractCheckpoint.open(instance_url, endpoint_path, soql_query, query_engine, spool_dir, spool_format)
+                    st.info("Checkpoint discarded; the next run starts from the first page.")
+
+            resume_url = st.session_state.get('resume_url') if method == "GET" and checkpoint is None else None
+            if resume_url and not st.checkbox(f"Resume from failed page {resume_url}", value=True):
+                resume_url = None
+
+            # Finished GET results are kept per request spec; options that only change the display are left out
+            result_key = None
+            if method == "GET" and checkpoint is None and not resume_url:
+                result_key = spec_key(instance_url=instance_url, endpoint_path=endpoint_path, soql_query=soql_query, all_pages=all_pages,
+                                      query_engine=query_engine, typed_columns=typed_columns)
+            elif checkpoint is not None and checkpoint.state['done']:
+                # Read back from disk once, then kept like a fetched result so it can be paged
+                result_key = extract_result_key(checkpoint, typed_columns)
+
+            run_in_background = result_key is not None and checkpoint is None and st.checkbox(
+                "Run in background",
+                help="Fetch on the job pool while the page stays usable; progress, cancel and the result are under Background jobs"
+            )
+
             if st.button(f"Execute {method}", key="execute"):
                 if not endpoint_path:
                     st.error("Endpoint path is required.")
                     return
 
-                full_url = urljoin(instance_url, endpoint_path)
+                full_url = resume_url or urljoin(instance_url, endpoint_path)
                 headers = {
                     'Authorization': f'Bearer {auth_credentials["access_token"]}',
                     'Content-Type': 'application/json'
                 }
 
+                if run_in_background:
+                    export_path = temp_export_path(export_format)
+                    spec = {'id': 'app', 'query': soql_query, 'all_pages': all_pages, 'engine': query_engine, 'bulk_threshold': int(bulk_threshold),
+                            'chunk_size': pk_chunk_size, 'typed': typed_columns}
+                    label = f"{sobject_from_soql(soql_query) or 'Query'}: {soql_query[:60]}" if soql_query else f"GET {endpoint_path}"
+                    submit_job('fetch', label, fetch_job, client, headers, instance_url, api_version, endpoint_path, spec, parallel_workers,
+                               get_schema_cache(instance_url), export_format, export_path,
+                               details={'result_key': result_key, 'instance_url': instance_url, 'export_format': export_format, 'export_path': export_path},
+                               tracer=Tracer() if trace_requests else None)
+
+                tracer = Tracer() if trace_requests else None
+                trace_token = current_tracer.set(tracer)
                 try:
-                    data, last_response = fetch_data(method, full_url, headers, instance_url, endpoint_path, all_pages, payload, soql_query)
-                    if data is None:
-                        return
-
-                    # Display results
-                    if method == "GET" and data:
-                        df = pd.DataFrame(data)
-                        st.dataframe(df, use_container_width=True)
-                        csv = df.to_csv(index=False).encode('utf-8')
-                        st.download_button(
-                            label="Download CSV",
-                            data=csv,
-                            file_name='salesforce_data.csv',
-                            mime='text/csv'
-                        )
-                    elif method in ["POST", "PATCH", "DELETE"]:
+                    if method == "GET" and checkpoint is not None:
+                        # A finished extract is shown from disk; unfinished ones continue from the checkpoint
+                        last_response = None
+                        if not checkpoint.state['done']:
+                            last_response = stream_data(full_url, headers, instance_url, endpoint_path, [], all_pages, soql_query, client, parallel_workers,
+                                                        query_engine, api_version, int(bulk_threshold), checkpoint)
+                        if checkpoint.state['records'] == 0 and last_response is None:
+                            return
+                        df, children = flatten_frame(checkpoint.frame(), fields=query_fields(soql_query))
+                        schema = schema_resolver(client, headers, instance_url, api_version, soql_query)() if typed_columns else None
+                        if schema is not None:
+                            df = schema.coerce_frame(df)
+                        cached = None
+                        if checkpoint.state['done']:
+                            cached = session_cache.put(extract_result_key(checkpoint, typed_columns), df, children, last_response,
+                                                       instance_url=instance_url, records=checkpoint.state['records'])
+                        if explode_subqueries and children:
+                            df, children = explode_first_subquery(df, children)
+                        has_data = not df.empty
+                        if has_data:
+                            st.caption(f"{checkpoint.state['records']:,} records in {len(checkpoint.state['parts'])} {checkpoint.state['format']} parts under {checkpoint.directory}")
+                            render_frame_size(df)
+                            render_result_viewer(df, kept=cached is not None)
+                            export_path = temp_export_path(export_format)
+                            try:
+                                export_frame(df, export_format, export_path)
+                                render_download(export_path, export_format)
+                            finally:
+                                os.remove(export_path)
+                            render_child_frames(children, export_format, kept=cached is not None)
+                    elif method == "GET":
+                        # Stream pages straight into the table chunks and an export file in the chosen format
+                        resolve_schema = schema_resolver(client, headers, instance_url, api_version, soql_query) if typed_columns else None
+                        fields = query_fields(soql_query)
+                        frame_sink = TypedDataFrameSink(resolve_schema=resolve_schema, fields=fields)
+                        export_path = temp_export_path(export_format)
+                        try:
+                            last_response = stream_data(full_url, headers, instance_url, endpoint_path,
+                                                        [frame_sink, export_sink(export_format, export_path, resolve_schema=resolve_schema, fields=fields)],
+                                                        all_pages, soql_query, client, parallel_workers, query_engine, api_version, int(bulk_threshold),
+                                                        pk_chunk_size=pk_chunk_size, progress=LiveProgress(frame_sink))
+                            if last_response is None and frame_sink.count == 0:
+                                return
+
+                            # Display results, including the pages fetched before a failure
+                            with span('DataFrame build'):
+                                df = frame_sink.frame()
+                            children = frame_sink.children()
+                            cached = None
+                            if result_key is not None and last_response is not None:
+                                cached = session_cache.put(result_key, df, children, last_response, instance_url=instance_url, records=frame_sink.count)
+                            exploded = explode_subqueries and bool(children)
+                            if exploded:
+                                df, children = explode_first_subquery(df, children)
+                            has_data = not df.empty
+                            if has_data:
+                                render_frame_size(df)
+                                render_result_viewer(df, kept=cached is not None)
+                                if exploded:
+                                    # The streamed export holds the parent rows only
+                                    export_frame(df, export_format, export_path)
+                                render_download(export_path, export_format)
+                                if cached is not None:
+                                    session_cache.export(cached, export_name(export_format, exploded), lambda: read_bytes(export_path))
+                                render_child_frames(children, export_format, kept=cached is not None)
+                        finally:
+                            os.remove(export_path)
+                    else:
+                        data, last_response = fetch_data(method, full_url, headers, instance_url, endpoint_path, all_pages, payload, soql_query, client=client)
+                        if data is None:
+                            return
+                        has_data = bool(data)
                         st.success(f"{method} request completed successfully")
+                        if session_cache.invalidate(instance_url):
+                            st.caption("Cached results from this org were dropped, as they may no longer match its data.")
                         st.json(data)
 
                     st.subheader("Request Details")
@@ -452,7 +1665,7 @@ def main():
                         st.subheader("Response JSON")
                         st.json(last_response)
 
-                    if not data:
+                    if not has_data:
                         st.warning("No data returned.")
 
                     # Display Node.js equivalent code
@@ -469,6 +1682,14 @@ def main():
 
                 except Exception as e:
                     st.error(f"An error occurred: {e}")
+                finally:
+                    current_tracer.reset(trace_token)
+                    if tracer is not None:
+                        render_trace(tracer)
+            elif result_key is not None and not shows_job_result(result_key):
+                entry = session_cache.get(result_key)
+                if entry is not None:
+                    render_cached_result(session_cache, result_key, entry, export_format, explode_subqueries)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
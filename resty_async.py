@@ -0,0 +1,272 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from urllib.parse import urljoin
+
+import httpx
+import requests
+
+from resty_client import raise_for_status, DEFAULT_POOL_SIZE
+from resty_query import PageFetchError, determine_record_key, is_locator_url, locator_offset, locator_page_urls
+from resty_trace import current_tracer, httpx_trace_recorder, span
+
+#------------------------------------------------------
+# Salesforce RESTY - asyncio HTTP core with a blocking facade
+# Author: Mohan Chinnappan
+# Copyleft software. Maintain the author name in your copies/modifications
+#------------------------------------------------------
+
+
+class AsyncRestyClient:
+    """asyncio HTTP client for one Salesforce instance with a bounded pool of keep-alive connections."""
+
+    def __init__(self, instance_url, pool_size=DEFAULT_POOL_SIZE, keep_alive=True, timeout=None, limiter=None, retry_policy=None, cache=None):
+        self.instance_url = instance_url.rstrip('/')
+        self.pool_size = pool_size
+        self.limiter = limiter
+        self.retry_policy = retry_policy
+        self.cache = cache
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size if keep_alive else 0)
+        # httpx defaults to a 5 second timeout; None keeps the unbounded behaviour of requests
+        self.client = httpx.AsyncClient(limits=limits, timeout=httpx_timeout(timeout))
+
+    async def request(self, method, url, idempotent=None, **kwargs):
+        """Sends a request with the same caching, throttling, retry and tracing rules as RestyClient.request."""
+        tracer = current_tracer.get()
+        if tracer is None:
+            return await self._request(method, url, idempotent, **kwargs)
+        start = time.perf_counter_ns()
+        phases, trace = httpx_trace_recorder()
+        kwargs['extensions'] = dict(kwargs.get('extensions') or {}, trace=trace)
+        attributes = {}
+        try:
+            response = await self._request(method, url, idempotent, **kwargs)
+            attributes['http.status_code'] = response.status_code
+            attributes['resty.cache'] = response.headers.get('X-Resty-Cache', 'miss')
+            return response
+        except (httpx.HTTPError, requests.RequestException) as e:
+            attributes['error'] = str(e)
+            raise
+        finally:
+            tracer.add_http(method.upper(), str(url), start, time.perf_counter_ns(), phases, attributes)
+
+    async def _request(self, method, url, idempotent=None, **kwargs):
+        lookup = self.cache.prepare(method, url, kwargs.get('params'), kwargs.get('headers')) if self.cache is not None else None
+        if lookup is None:
+            return await self._send(method, url, idempotent, **kwargs)
+        if lookup.hit:
+            return cached_response(lookup.entry)
+        kwargs['headers'] = lookup.headers
+        response = await self._send(method, url, idempotent, **kwargs)
+        entry = self.cache.complete(lookup, response.status_code, response.headers, response.content)
+        return cached_response(entry) if entry is not None else response
+
+    async def _send(self, method, url, idempotent=None, **kwargs):
+        policy = self.retry_policy
+        attempt = 0
+        while True:
+            attempt += 1
+            if self.limiter is not None:
+                delay = self.limiter.take()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            try:
+                response = await self.client.request(method.upper(), url, **kwargs)
+            except httpx.TransportError as e:
+                if policy is None or not policy.should_retry_error(method, _as_requests_error(e), attempt, idempotent):
+                    raise
+                await asyncio.sleep(policy.backoff(attempt))
+                continue
+            if self.limiter is not None:
+                self.limiter.observe_response(response)
+            if response.status_code >= 400 and policy is not None and policy.should_retry_response(method, response, attempt, idempotent):
+                await asyncio.sleep(policy.backoff(attempt, response))
+                continue
+            return response
+
+    async def get_json(self, url, headers=None, params=None):
+        """GETs a URL and returns its JSON body, raising SalesforceAPIError on a non-200 status."""
+        response = raise_for_status(await self.request('GET', url, headers=headers, params=params))
+        with span('JSON decode'):
+            return response.json()
+
+    async def get_page_json(self, url, headers=None, params=None):
+        """Like get_json, but raises PageFetchError carrying the page URL so pagination can resume there."""
+        try:
+            return await self.get_json(url, headers, params)
+        except httpx.HTTPError as e:
+            raise PageFetchError(url, _as_requests_error(e)) from e
+        except (requests.RequestException, ValueError) as e:
+            raise PageFetchError(url, e) from e
+
+    async def iter_json_in_order(self, urls, headers=None, concurrency=DEFAULT_POOL_SIZE):
+        """Yields the JSON bodies of urls in order while up to concurrency GETs run at once.
+
+        Closing the generator cancels every request still in flight.
+        """
+        concurrency = max(1, min(concurrency, self.pool_size))
+        pending = deque()
+        urls = iter(urls)
+        try:
+            for url in urls:
+                pending.append(asyncio.ensure_future(self.get_page_json(url, headers)))
+                if len(pending) >= concurrency * 2:
+                    break
+            while pending:
+                result = await pending.popleft()
+                next_url = next(urls, None)
+                if next_url is not None:
+                    pending.append(asyncio.ensure_future(self.get_page_json(next_url, headers)))
+                yield result
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def iter_pages(self, full_url, headers, endpoint_path, all_pages=False, soql_query=None, concurrency=1):
+        """Yields (records, response JSON) per page like resty_query.iter_pages, fetching locator pages concurrently."""
+        is_query = 'query' in endpoint_path.lower()
+        params = {'q': soql_query} if is_query and soql_query and not is_locator_url(full_url) else None
+
+        while full_url:
+            response_json = await self.get_page_json(full_url, headers, params)
+            if is_query:
+                yield response_json.get('records', []), response_json
+                next_url = response_json.get('nextRecordsUrl') if all_pages else None
+                page_urls = None
+                if next_url and concurrency > 1:
+                    page_urls = locator_page_urls(next_url, response_json.get('totalSize', 0), locator_offset(full_url))
+                if page_urls is not None:
+                    urls = [urljoin(self.instance_url, page_url) for page_url in page_urls]
+                    async for page in self.iter_json_in_order(urls, headers, concurrency):
+                        yield page.get('records', []), page
+                    return
+                params = None
+            else:
+                record_key = determine_record_key(endpoint_path, response_json)
+                yield response_json.get(record_key, []), response_json
+                next_url = response_json.get('nextPageUrl') if all_pages else None
+
+            full_url = urljoin(self.instance_url, next_url) if next_url else None
+
+    async def get_many(self, urls, headers=None, concurrency=DEFAULT_POOL_SIZE):
+        """GETs several endpoints at once; each entry is the JSON body or the exception that request raised."""
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def fetch(url):
+            async with semaphore:
+                return await self.get_json(url, headers)
+
+        return await asyncio.gather(*(fetch(url) for url in urls), return_exceptions=True)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+def cached_response(entry):
+    """Builds an httpx.Response from a resty_cache.CacheEntry."""
+    return httpx.Response(entry.status_code, headers={**entry.headers, 'X-Resty-Cache': 'hit'}, content=entry.content,
+                          request=httpx.Request('GET', entry.url))
+
+
+def httpx_timeout(timeout):
+    """Turns a requests timeout (seconds, a (connect, read) pair or None for no limit) into an httpx timeout."""
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return httpx.Timeout(read, connect=connect)
+    return timeout
+
+
+def _as_requests_error(error):
+    """Maps an httpx transport error onto the requests exception the callers already handle."""
+    if isinstance(error, httpx.ConnectTimeout):
+        return requests.ConnectTimeout(str(error))
+    if isinstance(error, httpx.TimeoutException):
+        return requests.Timeout(str(error))
+    if isinstance(error, httpx.TransportError):
+        return requests.ConnectionError(str(error))
+    return requests.RequestException(str(error))
+
+
+async def _with_tracer(coroutine, tracer):
+    # The loop thread has its own context; carry the caller's tracer over to it
+    token = current_tracer.set(tracer)
+    try:
+        return await coroutine
+    finally:
+        current_tracer.reset(token)
+
+
+class SyncRestyClient:
+    """Blocking facade over AsyncRestyClient that runs its event loop on a private daemon thread.
+
+    It offers the same request/get/post/patch/delete/pool_size surface as RestyClient and raises
+    requests exceptions, so the Streamlit flow and the other helpers can use either client.
+    """
+
+    def __init__(self, instance_url, pool_size=DEFAULT_POOL_SIZE, keep_alive=True, timeout=None, limiter=None, retry_policy=None, cache=None):
+        self.instance_url = instance_url.rstrip('/')
+        self.pool_size = pool_size
+        self.limiter = limiter
+        self.retry_policy = retry_policy
+        self.cache = cache
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='resty-async', daemon=True)
+        self.thread.start()
+        self.async_client = self._run(self._create(instance_url, pool_size, keep_alive, timeout, limiter, retry_policy, cache))
+
+    @staticmethod
+    async def _create(instance_url, pool_size, keep_alive, timeout, limiter, retry_policy, cache):
+        # Build the httpx client on the loop that will use it
+        return AsyncRestyClient(instance_url, pool_size, keep_alive, timeout, limiter, retry_policy, cache)
+
+    def _run(self, coroutine):
+        """Runs a coroutine on the client loop and waits for its result."""
+        try:
+            return asyncio.run_coroutine_threadsafe(_with_tracer(coroutine, current_tracer.get()), self.loop).result()
+        except httpx.HTTPError as e:
+            raise _as_requests_error(e) from e
+
+    def request(self, method, url, **kwargs):
+        if 'timeout' in kwargs:
+            kwargs['timeout'] = httpx_timeout(kwargs['timeout'])
+        # requests takes raw bodies as data=, httpx as content=
+        if isinstance(kwargs.get('data'), (bytes, str)):
+            kwargs['content'] = kwargs.pop('data')
+        return self._run(self.async_client.request(method, url, **kwargs))
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request('PATCH', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+    def get_many(self, urls, headers=None, concurrency=None):
+        """GETs several endpoints concurrently and returns JSON bodies or exceptions in input order."""
+        results = self._run(self.async_client.get_many(urls, headers, concurrency or self.pool_size))
+        return [_as_requests_error(result) if isinstance(result, httpx.HTTPError) else result for result in results]
+
+    def iter_pages(self, full_url, headers, instance_url, endpoint_path, all_pages=False, soql_query=None, parallel_workers=1):
+        """Blocking generator over AsyncRestyClient.iter_pages; closing it cancels the pages still in flight."""
+        pages = self.async_client.iter_pages(full_url, headers, endpoint_path, all_pages, soql_query, parallel_workers)
+        try:
+            while True:
+                try:
+                    page = self._run(pages.__anext__())
+                except StopAsyncIteration:
+                    return
+                yield page
+        finally:
+            self._run(pages.aclose())
+
+    def close(self):
+        """Closes the pooled connections and stops the loop thread."""
+        self._run(self.async_client.aclose())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
@@ -0,0 +1,292 @@
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from statistics import median
+
+from resty_async import SyncRestyClient
+from resty_bulk import iter_bulk_query_pages
+from resty_chunking import iter_chunk_pages, plan_chunks
+from resty_client import RestyClient
+from resty_limits import RateLimiter
+from resty_query import iter_pages
+from resty_retry import RetryPolicy
+from resty_schema import SchemaCache
+from resty_sinks import ListSink, TypedDataFrameSink, export_sink, EXPORT_FORMATS
+
+#------------------------------------------------------
+# Salesforce RESTY - benchmarks against the local mock server, with regression checks
+# Author: Mohan Chinnappan
+# Copyleft software. Maintain the author name in your copies/modifications
+#------------------------------------------------------
+
+DEFAULT_ROUNDS = 3
+DEFAULT_THRESHOLD = 10.0
+DEFAULT_WORKERS = 4
+BENCH_FIELDS = 'Id, Name, Industry, AnnualRevenue, NumberOfEmployees, IsActive__c, CreatedDate, SystemModstamp, Owner.Name'
+API_VERSION = '62.0'
+QUERY_PATH = f"/services/data/v{API_VERSION}/query"
+HEADERS = {'Authorization': 'Bearer MOCK!token', 'Content-Type': 'application/json'}
+# Metric name -> True when a larger value is better
+METRICS = {'records_per_sec': True, 'p50_ms': False, 'p99_ms': False, 'peak_rss_mb': False}
+
+
+def bench_query(record_width):
+    """Selects every field of the mock's Account, spelled out since Bulk API 2.0 does not accept FIELDS()."""
+    return f"SELECT {', '.join([BENCH_FIELDS] + [f'Text_{n}__c' for n in range(1, record_width + 1)])} FROM Account"
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a list of numbers, or None when it is empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, int(round(percent / 100 * len(ordered) + 0.5)) - 1))]
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def timed_pages(pages, *sinks):
+    """Consumes a page stream into the sinks and returns (records, seconds each page took to arrive and be written)."""
+    records, latencies = 0, []
+    started = time.perf_counter()
+    for page, _ in pages:
+        for sink in sinks:
+            sink.write(page)
+        records += len(page)
+        now = time.perf_counter()
+        latencies.append(now - started)
+        started = now
+    return records, latencies
+
+
+def timed_writes(sink, pages):
+    """Writes preloaded pages to a sink and returns (records, seconds per write, with close counted in the last one)."""
+    latencies = []
+    with sink:
+        for page in pages:
+            started = time.perf_counter()
+            sink.write(page)
+            latencies.append(time.perf_counter() - started)
+        started = time.perf_counter()
+    latencies[-1] += time.perf_counter() - started
+    return sink.count, latencies
+
+
+def make_client(url, engine='requests', workers=DEFAULT_WORKERS):
+    limiter = RateLimiter()
+    limiter.configure(enabled=False)
+    client_class = SyncRestyClient if engine == 'httpx' else RestyClient
+    return client_class(url, pool_size=max(workers, 1), limiter=limiter, retry_policy=RetryPolicy(base_delay=0.01))
+
+
+def query_pages(context, workers=1):
+    url = context['url']
+    return iter_pages(context['client'], url + QUERY_PATH, HEADERS, url, QUERY_PATH, True, context['query'], workers)
+
+
+def bench_rest(context):
+    return timed_pages(query_pages(context), ListSink())
+
+
+def bench_rest_parallel(context):
+    return timed_pages(query_pages(context, context['workers']), ListSink())
+
+
+def bench_chunked(context):
+    url = context['url']
+    _, chunk_queries = plan_chunks(context['client'], HEADERS, url, QUERY_PATH, context['query'], context['chunk_size'], context['workers'])
+    return timed_pages(iter_chunk_pages(context['client'], HEADERS, url, QUERY_PATH, chunk_queries, context['workers']), ListSink())
+
+
+def bench_bulk(context):
+    return timed_pages(iter_bulk_query_pages(context['client'], HEADERS, context['url'], API_VERSION, context['query'], workers=context['workers']), ListSink())
+
+
+def bench_dataframe(context):
+    sink = TypedDataFrameSink(context['schema'])
+    records, latencies = timed_writes(sink, context['pages'])
+    sink.frame()
+    return records, latencies
+
+
+def export_bench(export_format):
+    def bench(context):
+        path = os.path.join(context['tmpdir'], f"bench{EXPORT_FORMATS[export_format][0]}")
+        return timed_writes(export_sink(export_format, path, context['schema']), context['pages'])
+    return bench
+
+
+# name -> (what it measures, HTTP engine or None for in-memory cases, function); tests/test_bench.py runs each one small under pytest
+BENCHMARKS = {
+    'fetch-rest': ("REST query, every page in order (fetch_data's path)", 'requests', bench_rest),
+    'fetch-rest-parallel': ("REST query, locator pages fetched by several workers", 'requests', bench_rest_parallel),
+    'fetch-rest-httpx': ("REST query, every page in order, on the httpx client", 'httpx', bench_rest),
+    'fetch-chunked': ("REST query split into Id-range chunks", 'requests', bench_chunked),
+    'fetch-bulk': ("Bulk API 2.0 query job, result chunks downloaded in parallel", 'requests', bench_bulk),
+    'dataframe-build': ("Typed DataFrame built from preloaded pages", None, bench_dataframe),
+    'export-csv': ("CSV export from preloaded pages", None, export_bench('CSV')),
+    'export-parquet': ("Parquet export from preloaded pages", None, export_bench('Parquet')),
+}
+
+
+def run_case(name, url, options):
+    """Runs one benchmark for options['rounds'] rounds and returns its metrics; meant to run in a fresh process so peak RSS is its own."""
+    _, engine, bench = BENCHMARKS[name]
+    client = make_client(url, engine or 'requests', options['workers'])
+    context = dict(options, url=url, client=client, query=bench_query(options['record_width']))
+    try:
+        if engine is None:
+            # In-memory cases time only the local work; the pages are fetched once beforehand
+            context['schema'] = SchemaCache().get(client, HEADERS, url, API_VERSION, 'Account')
+            context['pages'] = [page for page, _ in query_pages(context, options['workers'])]
+        walls, latencies, records = [], [], 0
+        with tempfile.TemporaryDirectory() as tmpdir:
+            context['tmpdir'] = tmpdir
+            for _ in range(options['rounds']):
+                gc.collect()
+                started = time.perf_counter()
+                records, round_latencies = bench(context)
+                walls.append(time.perf_counter() - started)
+                latencies.extend(round_latencies)
+    finally:
+        client.close()
+    wall = median(walls)
+    return {
+        'records': records,
+        'rounds': len(walls),
+        'seconds_median': round(wall, 4),
+        'seconds_min': round(min(walls), 4),
+        'records_per_sec': round(records / wall, 1) if wall else None,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3) if latencies else None,
+        'peak_rss_mb': round(peak_rss_mb(), 1)
+    }
+
+
+def start_mock(args):
+    """Starts resty_mock in its own process, so serving pages does not compete with the benchmark for the GIL, and returns (process, URL)."""
+    command = [sys.executable, '-m', 'resty_mock', '--port', '0', '--records', str(args.records), '--page-size', str(args.page_size),
+               '--record-width', str(args.record_width), '--latency', str(args.latency), '--error-rate', str(args.error_rate),
+               '--bulk-chunk-size', str(args.bulk_chunk_size), '--job-polls', '0']
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    match = re.search(r'(http://\S+)', process.stdout.readline())
+    if not match:
+        process.kill()
+        raise RuntimeError("The mock server did not start")
+    return process, match.group(1)
+
+
+def environment():
+    import pandas
+    versions = {'python': platform.python_version(), 'pandas': pandas.__version__}
+    for module in ('requests', 'httpx', 'pyarrow'):
+        try:
+            versions[module] = __import__(module).__version__
+        except ImportError:
+            pass
+    return {'platform': platform.platform(), 'machine': platform.machine(), 'cpus': os.cpu_count(), 'versions': versions}
+
+
+def compare(results, baseline, threshold):
+    """Returns one row per metric of every benchmark also in the baseline: (name, metric, before, after, change %, regressed)."""
+    rows = []
+    for name, metrics in results.items():
+        before_metrics = baseline.get('results', {}).get(name)
+        if not before_metrics:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            before, after = before_metrics.get(metric), metrics.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before * 100
+            regressed = -change > threshold if higher_is_better else change > threshold
+            rows.append((name, metric, before, after, round(change, 1), regressed))
+    return rows
+
+
+def print_results(results, rows=None):
+    print(f"{'benchmark':<22}{'records':>10}{'records/s':>13}{'p50 ms':>10}{'p99 ms':>10}{'peak RSS MB':>13}")
+    for name, metrics in results.items():
+        print(f"{name:<22}{metrics['records']:>10,}{metrics['records_per_sec']:>13,.0f}{metrics['p50_ms']:>10.2f}{metrics['p99_ms']:>10.2f}{metrics['peak_rss_mb']:>13.1f}")
+    for name, metric, before, after, change, regressed in rows or []:
+        if regressed:
+            print(f"REGRESSION {name} {metric}: {before} -> {after} ({change:+.1f}%)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m resty_bench', description="Benchmark fetching, DataFrame building and export against the local mock server.")
+    parser.add_argument('benchmarks', nargs='*', help=f"Benchmarks to run (default: all): {', '.join(BENCHMARKS)}")
+    parser.add_argument('--rounds', type=int, default=DEFAULT_ROUNDS, help=f"Timed rounds per benchmark (default: {DEFAULT_ROUNDS})")
+    parser.add_argument('--records', type=int, default=50000, help="Records in the mock org (default: 50000)")
+    parser.add_argument('--page-size', type=int, default=2000, help="Records per REST page (default: 2000)")
+    parser.add_argument('--record-width', type=int, default=20, help="Extra text fields per record (default: 20)")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds the mock adds to every response")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of mock responses that are 503s, retried by the client")
+    parser.add_argument('--bulk-chunk-size', type=int, default=10000, help="Records per Bulk result chunk (default: 10000)")
+    parser.add_argument('--chunk-size', type=int, default=10000, help="Records per Id-range chunk (default: 10000)")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help=f"Parallel workers (default: {DEFAULT_WORKERS})")
+    parser.add_argument('--save', help="Write the results as JSON to this file, e.g. to serve as the next baseline")
+    parser.add_argument('--compare', help="Baseline results JSON to check for regressions")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help=f"Percent change that counts as a regression (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument('--list', action='store_true', help="List the benchmarks and exit")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.list:
+        for name, (description, _, _) in BENCHMARKS.items():
+            print(f"{name:<22}{description}")
+        return 0
+    names = args.benchmarks or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        print(f"Unknown benchmarks: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+    options = {'rounds': max(1, args.rounds), 'workers': args.workers, 'chunk_size': args.chunk_size, 'record_width': args.record_width}
+    process, url = start_mock(args)
+    results = {}
+    try:
+        # A fresh spawned process per benchmark keeps peak RSS and warm caches from leaking between them
+        context = multiprocessing.get_context('spawn')
+        for name in names:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                results[name] = executor.submit(run_case, name, url, options).result()
+            print(f"{name}: {results[name]['records_per_sec']:,.0f} records/s", file=sys.stderr, flush=True)
+    finally:
+        process.terminate()
+        process.wait()
+    config = {key: getattr(args, key) for key in ('rounds', 'records', 'page_size', 'record_width', 'latency', 'error_rate',
+                                                   'bulk_chunk_size', 'chunk_size', 'workers')}
+    rows = compare(results, baseline, args.threshold) if baseline else []
+    print_results(results, rows)
+    if baseline and baseline.get('config') != config:
+        print(f"Note: the baseline ran with different settings ({baseline.get('config')}); changes may not be regressions")
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as results_file:
+            json.dump({'finished': datetime.now(timezone.utc).isoformat(), 'environment': environment(), 'config': config, 'results': results},
+                      results_file, indent=2)
+    return 1 if any(row[5] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
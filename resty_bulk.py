@@ -0,0 +1,370 @@
+import csv
+import io
+import re
+import time
+from urllib.parse import urljoin
+
+import pandas as pd
+
+from resty_client import raise_for_status
+from resty_query import iter_in_order
+from resty_trace import span
+
+#------------------------------------------------------
+# Salesforce RESTY - Bulk API 2.0 helpers
+# Author: Mohan Chinnappan
+# Copyleft software. Maintain the author name in your copies/modifications
+#------------------------------------------------------
+
+DEFAULT_BULK_THRESHOLD = 50000
+DEFAULT_DOWNLOAD_WORKERS = 4
+DEFAULT_MAX_RECORDS = 50000
+
+JOB_DONE_STATES = ('JobComplete',)
+JOB_FAILED_STATES = ('Failed', 'Aborted')
+
+# The parallel resultPages resource only exists from this API version on
+RESULT_PAGES_MIN_VERSION = 62.0
+
+
+class BulkJobError(Exception):
+    """Raised when a Bulk API 2.0 job ends Failed or Aborted, or does not finish in time."""
+
+    def __init__(self, message, job_info=None):
+        super().__init__(message)
+        self.job_info = job_info or {}
+
+
+def api_version_from_path(endpoint_path, default='60.0'):
+    """Extracts the API version from a /services/data/vXX.X/... path."""
+    match = re.search(r'/v(\d+\.\d+)(?:/|$)', endpoint_path or '')
+    return match.group(1) if match else default
+
+
+def jobs_url(instance_url, api_version, job_type='query'):
+    """Returns the Bulk API 2.0 jobs collection URL for 'query' or 'ingest' jobs."""
+    return urljoin(instance_url, f"/services/data/v{api_version}/jobs/{job_type}")
+
+
+def create_query_job(client, headers, instance_url, api_version, soql_query, query_all=False):
+    """Creates a Bulk API 2.0 query job and returns its job info."""
+    body = {
+        'operation': 'queryAll' if query_all else 'query',
+        'query': soql_query,
+        'contentType': 'CSV',
+        'columnDelimiter': 'COMMA',
+        'lineEnding': 'LF'
+    }
+    response = client.post(jobs_url(instance_url, api_version), headers=headers, json=body)
+    return raise_for_status(response, (200, 201)).json()
+
+
+def wait_for_job(client, headers, job_url, poll_interval=0.5, max_interval=10.0, timeout=None, on_poll=None):
+    """Polls a job with exponential backoff until it completes, raising BulkJobError if it fails."""
+    started = time.monotonic()
+    interval = poll_interval
+    while True:
+        job_info = raise_for_status(client.get(job_url, headers=headers)).json()
+        if on_poll is not None:
+            on_poll(job_info)
+        state = job_info.get('state')
+        if state in JOB_DONE_STATES:
+            return job_info
+        if state in JOB_FAILED_STATES:
+            raise BulkJobError(f"Bulk job {job_info.get('id')} {state}: {job_info.get('errorMessage', '')}", job_info)
+        if timeout is not None and time.monotonic() - started > timeout:
+            raise BulkJobError(f"Bulk job {job_info.get('id')} still {state} after {timeout} seconds", job_info)
+        time.sleep(interval)
+        interval = min(interval * 2, max_interval)
+
+
+def csv_records(text):
+    """Parses one Bulk API CSV result chunk into a list of record dicts."""
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+def _result_text(response):
+    # Bulk results are always UTF-8 CSV; requests would otherwise guess from the headers
+    response.encoding = 'utf-8'
+    return response.text
+
+
+def iter_result_chunks_serial(client, headers, results_url, max_records=DEFAULT_MAX_RECORDS, locator=None):
+    """Yields (CSV chunk, next locator) in order by following the Sforce-Locator header, optionally starting at a locator."""
+    while True:
+        params = {'maxRecords': max_records}
+        if locator:
+            params['locator'] = locator
+        response = raise_for_status(client.get(results_url, headers=headers, params=params))
+        locator = response.headers.get('Sforce-Locator')
+        if not locator or locator == 'null':
+            locator = None
+        yield _result_text(response), locator
+        if locator is None:
+            return
+
+
+def list_result_pages(client, headers, instance_url, job_url):
+    """Lists every result page link of a finished query job, or returns None if resultPages is unavailable."""
+    links = []
+    page_url = f"{job_url}/resultPages"
+    while page_url:
+        response = client.get(page_url, headers=headers)
+        if response.status_code == 404:
+            return None
+        body = raise_for_status(response).json()
+        if 'resultPages' not in body:
+            return None
+        links.extend(urljoin(instance_url, page['resultLink']) for page in body['resultPages'])
+        next_url = body.get('nextRecordsUrl')
+        page_url = urljoin(instance_url, next_url) if next_url else None
+    return links
+
+
+def iter_query_result_chunks(client, headers, instance_url, api_version, job_id, max_records=DEFAULT_MAX_RECORDS, workers=DEFAULT_DOWNLOAD_WORKERS,
+                             start=0, locator=None):
+    """Yields (CSV chunk, next locator) for the result chunks of a finished query job in order, downloading them in parallel when possible.
+
+    On API versions with the resultPages resource every locator is known up front, so chunks are fetched
+    concurrently and the next locator is None; otherwise the Sforce-Locator chain is followed one chunk
+    at a time. start skips chunks already consumed; locator resumes a serial download where it stopped.
+    """
+    job_url = f"{jobs_url(instance_url, api_version)}/{job_id}"
+    csv_headers = {**headers, 'Accept': 'text/csv'}
+
+    links = None
+    if locator is None and workers > 1 and float(api_version) >= RESULT_PAGES_MIN_VERSION:
+        links = list_result_pages(client, headers, instance_url, job_url)
+    if not links:
+        chunks = iter_result_chunks_serial(client, csv_headers, f"{job_url}/results", max_records, locator)
+        # Without a locator the chain has to be replayed up to the first chunk not yet consumed
+        skip = start if locator is None else 0
+        for index, chunk in enumerate(chunks):
+            if index >= skip:
+                yield chunk
+        return
+
+    def download(link):
+        return _result_text(raise_for_status(client.get(link, headers=csv_headers))), None
+
+    yield from iter_in_order(download, links[start:], min(workers, client.pool_size))
+
+
+def iter_bulk_job_pages(client, headers, instance_url, api_version, job_id, max_records=DEFAULT_MAX_RECORDS,
+                        workers=DEFAULT_DOWNLOAD_WORKERS, on_poll=None, start=0, locator=None):
+    """Waits for an existing query job and yields (records, chunk info) per result chunk from chunk start on.
+
+    The chunk info is the job info plus 'resultChunk' (index of the next chunk) and 'resultLocator'
+    (the Sforce-Locator of the next chunk, when known), which is enough to resume the download later.
+    """
+    job_url = f"{jobs_url(instance_url, api_version)}/{job_id}"
+    job_info = wait_for_job(client, headers, job_url, on_poll=on_poll)
+    chunks = iter_query_result_chunks(client, headers, instance_url, api_version, job_id, max_records, workers, start, locator)
+    for index, (chunk, next_locator) in enumerate(chunks, start + 1):
+        with span('CSV decode'):
+            records = csv_records(chunk)
+        yield records, {**job_info, 'resultChunk': index, 'resultLocator': next_locator}
+
+
+def iter_bulk_query_pages(client, headers, instance_url, api_version, soql_query, query_all=False,
+                          max_records=DEFAULT_MAX_RECORDS, workers=DEFAULT_DOWNLOAD_WORKERS, on_poll=None):
+    """Runs a SOQL query as a Bulk API 2.0 job and yields (records, chunk info) per result chunk, like iter_pages."""
+    job_info = create_query_job(client, headers, instance_url, api_version, soql_query, query_all)
+    if on_poll is not None:
+        on_poll(job_info)
+    yield from iter_bulk_job_pages(client, headers, instance_url, api_version, job_info['id'], max_records, workers, on_poll)
+
+
+def top_level_keyword(soql_query, keyword):
+    """Returns the index of keyword outside any parentheses, or -1."""
+    depth = 0
+    pattern = re.compile(r'\(|\)|\b' + keyword.replace(' ', r'\s+') + r'\b', re.IGNORECASE)
+    for match in pattern.finditer(soql_query):
+        token = match.group(0)
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+        elif depth == 0:
+            return match.start()
+    return -1
+
+
+def add_where_condition(soql_query, condition):
+    """ANDs condition into the query's top-level WHERE clause, adding one before GROUP BY/ORDER BY/LIMIT/OFFSET if needed."""
+    ends = [index for index in (top_level_keyword(soql_query, keyword) for keyword in ('GROUP BY', 'ORDER BY', 'LIMIT', 'OFFSET')) if index >= 0]
+    end = min(ends) if ends else len(soql_query)
+    head, tail = soql_query[:end].rstrip(), soql_query[end:]
+    where_index = top_level_keyword(head, 'WHERE')
+    if where_index < 0:
+        return f"{head} WHERE {condition} {tail}".rstrip()
+    return f"{head[:where_index]}WHERE ({head[where_index + len('WHERE'):].strip()}) AND {condition} {tail}".rstrip()
+
+
+def is_bulk_compatible(soql_query):
+    """Tells whether Bulk API 2.0 can run the query: no subqueries, aggregates or OFFSET."""
+    if re.search(r'\(\s*SELECT\b', soql_query, re.IGNORECASE):
+        return False
+    return all(top_level_keyword(soql_query, keyword) < 0 for keyword in ('GROUP BY', 'OFFSET', 'TYPEOF'))
+
+
+def count_query(soql_query):
+    """Rewrites a SOQL query as a SELECT COUNT() with the same FROM/WHERE, or returns None if it cannot."""
+    from_index = top_level_keyword(soql_query, 'FROM')
+    if from_index < 0:
+        return None
+    tail = soql_query[from_index:]
+    # COUNT() rejects ORDER BY; LIMIT is kept so the count matches what the query would return
+    order_index = top_level_keyword(tail, 'ORDER BY')
+    if order_index >= 0:
+        limit_index = top_level_keyword(tail, 'LIMIT')
+        tail = tail[:order_index] + (tail[limit_index:] if limit_index > order_index else '')
+    return f"SELECT COUNT() {tail.strip()}"
+
+
+def sobject_from_soql(soql_query):
+    """Returns the sObject named in the top-level FROM clause, or None."""
+    from_index = top_level_keyword(soql_query, 'FROM')
+    if from_index < 0:
+        return None
+    match = re.match(r'FROM\s+([A-Za-z0-9_]+)', soql_query[from_index:], re.IGNORECASE)
+    return match.group(1) if match else None
+
+
+def probe_total_size(client, headers, instance_url, api_version, soql_query):
+    """Runs a cheap COUNT() version of the query and returns its totalSize, or None if the probe fails."""
+    probe = count_query(soql_query)
+    if probe is None:
+        return None
+    query_url = urljoin(instance_url, f"/services/data/v{api_version}/query")
+    response = client.get(query_url, headers=headers, params={'q': probe})
+    if response.status_code != 200:
+        return None
+    return response.json().get('totalSize')
+
+
+def should_use_bulk(client, headers, instance_url, api_version, soql_query, threshold=DEFAULT_BULK_THRESHOLD):
+    """Returns (use bulk, probed totalSize), choosing Bulk API 2.0 when the COUNT() probe reaches threshold."""
+    if not is_bulk_compatible(soql_query):
+        return False, None
+    total_size = probe_total_size(client, headers, instance_url, api_version, soql_query)
+    return total_size is not None and total_size >= threshold, total_size
+
+
+INGEST_OPERATIONS = ('insert', 'update', 'upsert', 'delete', 'hardDelete')
+
+# Bulk API 2.0 accepts at most 150 MB of base64-encoded CSV per job; 100 MB of raw CSV stays under it
+DEFAULT_MAX_UPLOAD_BYTES = 100 * 1024 * 1024
+DEFAULT_INGEST_WORKERS = 4
+INGEST_RESULT_PATHS = {
+    'successful': 'successfulResults',
+    'failed': 'failedResults',
+    'unprocessed': 'unprocessedrecords'
+}
+
+
+def iter_csv_batches(df, max_bytes=DEFAULT_MAX_UPLOAD_BYTES, rows_per_slice=10000):
+    """Yields UTF-8 CSV payloads of the DataFrame, each with a header and no larger than max_bytes where possible."""
+    header = df.iloc[:0].to_csv(index=False, lineterminator='\n').encode('utf-8')
+    parts, size = [], len(header)
+    for start in range(0, len(df), rows_per_slice):
+        body = df.iloc[start:start + rows_per_slice].to_csv(index=False, header=False, lineterminator='\n').encode('utf-8')
+        if parts and size + len(body) > max_bytes:
+            yield header + b''.join(parts)
+            parts, size = [], len(header)
+        parts.append(body)
+        size += len(body)
+    if parts:
+        yield header + b''.join(parts)
+
+
+def create_ingest_job(client, headers, instance_url, api_version, sobject, operation, external_id_field=None):
+    """Creates a Bulk API 2.0 ingest job for CSV data and returns its job info."""
+    body = {
+        'object': sobject,
+        'operation': operation,
+        'contentType': 'CSV',
+        'columnDelimiter': 'COMMA',
+        'lineEnding': 'LF'
+    }
+    if operation == 'upsert':
+        body['externalIdFieldName'] = external_id_field
+    response = client.post(jobs_url(instance_url, api_version, 'ingest'), headers=headers, json=body)
+    return raise_for_status(response, (200, 201)).json()
+
+
+def upload_ingest_data(client, headers, job_url, csv_bytes):
+    """Uploads the CSV data of an ingest job and marks the upload complete."""
+    csv_headers = {**headers, 'Content-Type': 'text/csv'}
+    raise_for_status(client.request('PUT', f"{job_url}/batches", headers=csv_headers, data=csv_bytes), (201,))
+    raise_for_status(client.patch(job_url, headers=headers, json={'state': 'UploadComplete'}), (200,))
+
+
+def fetch_ingest_results(client, headers, job_url):
+    """Downloads the successful, failed and unprocessed record sets of a finished ingest job as DataFrames."""
+    csv_headers = {**headers, 'Accept': 'text/csv'}
+    results = {}
+    for name, path in INGEST_RESULT_PATHS.items():
+        response = raise_for_status(client.get(f"{job_url}/{path}", headers=csv_headers))
+        text = _result_text(response)
+        results[name] = pd.read_csv(io.StringIO(text), dtype=str, keep_default_na=False) if text.strip() else pd.DataFrame()
+    return results
+
+
+def run_ingest_job(client, headers, instance_url, api_version, sobject, operation, csv_bytes, external_id_field=None, on_poll=None):
+    """Runs one ingest job end to end and returns (job info, result frames)."""
+    job_info = create_ingest_job(client, headers, instance_url, api_version, sobject, operation, external_id_field)
+    job_url = f"{jobs_url(instance_url, api_version, 'ingest')}/{job_info['id']}"
+    try:
+        upload_ingest_data(client, headers, job_url, csv_bytes)
+    except Exception:
+        # Leave nothing half-open in the org if the upload fails, but report the upload's error rather than the abort's
+        try:
+            client.patch(job_url, headers=headers, json={'state': 'Aborted'})
+        except Exception:
+            pass
+        raise
+    try:
+        job_info = wait_for_job(client, headers, job_url, on_poll=on_poll)
+    except BulkJobError as e:
+        # A Failed job still reports which records failed or were never processed
+        if e.job_info.get('state') != 'Failed':
+            raise
+        job_info = e.job_info
+    return job_info, fetch_ingest_results(client, headers, job_url)
+
+
+def bulk_ingest(client, headers, instance_url, api_version, sobject, operation, df, external_id_field=None,
+                max_bytes=DEFAULT_MAX_UPLOAD_BYTES, workers=DEFAULT_INGEST_WORKERS, on_poll=None):
+    """Loads a DataFrame through Bulk API 2.0 ingest jobs, one job per size-limited CSV batch.
+
+    Jobs run concurrently up to workers; returns (job infos, result frames) where the successful,
+    failed and unprocessed frames are concatenated across every job.
+    """
+    if operation not in INGEST_OPERATIONS:
+        raise ValueError(f"Unsupported ingest operation: {operation}")
+    if operation == 'upsert' and not external_id_field:
+        raise ValueError("An external ID field is required for upsert")
+
+    def run(csv_bytes):
+        return run_ingest_job(client, headers, instance_url, api_version, sobject, operation, csv_bytes, external_id_field, on_poll)
+
+    job_infos = []
+    collected = {name: [] for name in INGEST_RESULT_PATHS}
+    for job_info, results in iter_in_order(run, iter_csv_batches(df, max_bytes), min(workers, client.pool_size)):
+        job_infos.append(job_info)
+        for name, frame in results.items():
+            if not frame.empty:
+                collected[name].append(frame)
+    frames = {name: pd.concat(parts, ignore_index=True) if parts else pd.DataFrame() for name, parts in collected.items()}
+    return job_infos, frames
+
+
+def read_ingest_file(uploaded_file):
+    """Reads an uploaded CSV or JSONL file into a DataFrame of strings for ingest."""
+    name = (getattr(uploaded_file, 'name', '') or '').lower()
+    if name.endswith(('.jsonl', '.ndjson')):
+        return pd.read_json(uploaded_file, lines=True, dtype=False)
+    if name.endswith('.json'):
+        return pd.read_json(uploaded_file, dtype=False)
+    return pd.read_csv(uploaded_file, dtype=str, keep_default_na=False)
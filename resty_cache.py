@@ -0,0 +1,249 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from email.utils import formatdate
+from urllib.parse import urlencode, urlparse
+
+#------------------------------------------------------
+# Salesforce RESTY - GET response cache with conditional revalidation
+# Author: Mohan Chinnappan
+# Copyleft software. Maintain the author name in your copies/modifications
+#------------------------------------------------------
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'resty_cache')
+
+# (path pattern, seconds an entry is served without asking Salesforce); unmatched URLs are never cached
+DEFAULT_TTL_RULES = (
+    (r'/sobjects/[^/]+/describe/?$', 3600),
+    (r'/sobjects/?$', 900),
+    (r'/limits/?$', 30),
+    (r'/services/data/?$', 3600),
+    (r'/services/data/v\d+\.\d+/?$', 3600),
+)
+
+# The cached body is already decoded, so transfer headers no longer describe it
+DROPPED_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding', 'connection', 'keep-alive')
+
+
+class CacheEntry:
+    """One stored 200 response: status, headers and raw body plus when it was stored."""
+
+    def __init__(self, url, status_code, headers, content, ttl, stored_at=None):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.ttl = ttl
+        self.stored_at = stored_at if stored_at is not None else time.time()
+
+    @property
+    def size(self):
+        return len(self.content)
+
+    def is_fresh(self, now=None):
+        return (now if now is not None else time.time()) - self.stored_at < self.ttl
+
+    def validators(self):
+        """Conditional request headers that let Salesforce answer 304 Not Modified."""
+        headers = {}
+        lowered = {key.lower(): value for key, value in self.headers.items()}
+        if lowered.get('etag'):
+            headers['If-None-Match'] = lowered['etag']
+        # Describe resources honour If-Modified-Since; fall back to when the entry was fetched
+        headers['If-Modified-Since'] = lowered.get('last-modified') or formatdate(self.stored_at, usegmt=True)
+        return headers
+
+    def to_meta(self):
+        return {'url': self.url, 'status_code': self.status_code, 'headers': self.headers, 'ttl': self.ttl, 'stored_at': self.stored_at}
+
+
+class CacheLookup:
+    """What a client needs to finish a cacheable GET: the key, any stored entry and the headers to send."""
+
+    def __init__(self, key, url, ttl, entry, headers):
+        self.key = key
+        self.url = url
+        self.ttl = ttl
+        self.entry = entry
+        self.headers = headers
+
+    @property
+    def hit(self):
+        return self.entry is not None and self.entry.is_fresh()
+
+
+class ResponseCache:
+    """LRU cache of GET responses for metadata endpoints, optionally backed by a directory on disk.
+
+    Entries are keyed by URL, query parameters and the Authorization header, so different users never
+    share responses. Each URL's TTL comes from the first matching ttl_rules pattern; within it the
+    stored response is served without a request, after it the request is sent with If-None-Match /
+    If-Modified-Since and a 304 renews the entry. A request sent with Cache-Control: no-cache skips the
+    stored entry and goes to Salesforce, and its response replaces the entry. The memory tier evicts least recently used entries
+    beyond max_entries or max_bytes; the disk tier keeps everything until clear().
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES, ttl_rules=DEFAULT_TTL_RULES, disk_dir=None, enabled=True):
+        self.lock = threading.RLock()
+        self.disk_locks = {}
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'evictions': 0}
+        self.configure(max_entries, max_bytes, ttl_rules, disk_dir, enabled)
+
+    def configure(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES, ttl_rules=DEFAULT_TTL_RULES, disk_dir=None, enabled=True):
+        """Updates the cache settings, keeping the entries already stored."""
+        with self.lock:
+            self.max_entries = max(int(max_entries), 1)
+            self.max_bytes = max(int(max_bytes), 1)
+            self.ttl_rules = [(re.compile(pattern), ttl) for pattern, ttl in ttl_rules]
+            self.disk_dir = disk_dir
+            self.enabled = enabled
+            self._evict()
+
+    def ttl_for(self, url):
+        """Returns the TTL in seconds for url, or None when it must not be cached."""
+        path = urlparse(url).path
+        for pattern, ttl in self.ttl_rules:
+            if pattern.search(path):
+                return ttl if ttl > 0 else None
+        return None
+
+    @staticmethod
+    def key(url, params=None, headers=None):
+        authorization = next((value for name, value in (headers or {}).items() if name.lower() == 'authorization'), '')
+        query = urlencode(sorted(params.items())) if isinstance(params, dict) else str(params or '')
+        return hashlib.sha1(f"{url}?{query}\n{authorization}".encode('utf-8')).hexdigest()
+
+    def prepare(self, method, url, params=None, headers=None):
+        """Returns a CacheLookup for a cacheable GET, or None when the request bypasses the cache."""
+        if not self.enabled or method.upper() != 'GET':
+            return None
+        ttl = self.ttl_for(url)
+        if ttl is None:
+            return None
+        key = self.key(url, params, headers)
+        headers = dict(headers or {})
+        no_cache = any(name.lower() == 'cache-control' and 'no-cache' in str(value).lower() for name, value in headers.items())
+        entry = None if no_cache else self.get(key)
+        if entry is not None and not entry.is_fresh():
+            headers.update(entry.validators())
+        lookup = CacheLookup(key, url, ttl, entry, headers)
+        if lookup.hit:
+            self._count('hits')
+        return lookup
+
+    def complete(self, lookup, status_code, headers, content):
+        """Records the response to a prepared GET; returns the entry to serve instead on 304, else None."""
+        if status_code == 304 and lookup.entry is not None:
+            entry = CacheEntry(lookup.url, lookup.entry.status_code, lookup.entry.headers, lookup.entry.content, lookup.ttl)
+            self.put(lookup.key, entry)
+            self._count('revalidated')
+            return entry
+        self._count('misses')
+        if status_code == 200:
+            kept = {name: value for name, value in headers.items() if name.lower() not in DROPPED_HEADERS}
+            self.put(lookup.key, CacheEntry(lookup.url, status_code, kept, content, lookup.ttl))
+        return None
+
+    def _count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def get(self, key):
+        """Returns the stored entry for key from memory or disk, fresh or not, or None."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                return entry
+        entry = self._read_disk(key)
+        if entry is not None:
+            self._remember(key, entry)
+        return entry
+
+    def put(self, key, entry):
+        self._remember(key, entry)
+        self._write_disk(key, entry)
+
+    def _remember(self, key, entry):
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous.size
+            self.entries[key] = entry
+            self.bytes += entry.size
+            self._evict()
+
+    def _evict(self):
+        while self.entries and (len(self.entries) > self.max_entries or self.bytes > self.max_bytes):
+            _, entry = self.entries.popitem(last=False)
+            self.bytes -= entry.size
+            self.stats['evictions'] += 1
+
+    def _disk_paths(self, key):
+        return os.path.join(self.disk_dir, f"{key}.json"), os.path.join(self.disk_dir, f"{key}.body")
+
+    def _disk_lock(self, key):
+        with self.lock:
+            return self.disk_locks.setdefault(key, threading.Lock())
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        meta_path, body_path = self._disk_paths(key)
+        try:
+            with self._disk_lock(key):
+                with open(meta_path, encoding='utf-8') as meta_file:
+                    meta = json.load(meta_file)
+                with open(body_path, 'rb') as body_file:
+                    content = body_file.read()
+        except (OSError, ValueError):
+            return None
+        return CacheEntry(meta['url'], meta['status_code'], meta['headers'], content, meta['ttl'], meta['stored_at'])
+
+    def _write_disk(self, key, entry):
+        if not self.disk_dir:
+            return
+        os.makedirs(self.disk_dir, exist_ok=True)
+        meta_path, body_path = self._disk_paths(key)
+        # Body, then metadata, under the entry's lock, so a reader never pairs new metadata with an old body
+        with self._disk_lock(key):
+            self._replace_file(body_path, entry.content)
+            self._replace_file(meta_path, json.dumps(entry.to_meta()).encode('utf-8'))
+
+    def _replace_file(self, path, content):
+        """Writes content to a uniquely named temporary file beside path and renames it over path."""
+        with tempfile.NamedTemporaryFile(dir=self.disk_dir, prefix=os.path.basename(path) + '.', suffix='.tmp', delete=False) as temp_file:
+            temp_file.write(content)
+        try:
+            os.replace(temp_file.name, path)
+        except OSError:
+            os.remove(temp_file.name)
+            raise
+
+    def summary(self):
+        """Returns the hit/miss counters with entry count, stored bytes and hit ratio."""
+        with self.lock:
+            stats = dict(self.stats, entries=len(self.entries), bytes=self.bytes)
+        lookups = stats['hits'] + stats['revalidated'] + stats['misses']
+        stats['hit_ratio'] = (stats['hits'] + stats['revalidated']) / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        """Drops every entry from memory and disk and resets the counters."""
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+            self.stats = dict.fromkeys(self.stats, 0)
+            if self.disk_dir and os.path.isdir(self.disk_dir):
+                for name in os.listdir(self.disk_dir):
+                    if name.endswith(('.json', '.body', '.tmp')):
+                        os.remove(os.path.join(self.disk_dir, name))
@@ -0,0 +1,141 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+import requests
+
+from resty_bulk import add_where_condition, top_level_keyword
+from resty_query import PageFetchError, fetch_page_json, iter_pages, iter_query_pages_parallel, parse_query_locator, DEFAULT_QUERY_WORKERS
+from resty_trace import wrap_context
+
+#------------------------------------------------------
+# Salesforce RESTY - PK chunking of large REST queries into parallel Id ranges
+# Author: Mohan Chinnappan
+# Copyleft software. Maintain the author name in your copies/modifications
+#------------------------------------------------------
+
+DEFAULT_CHUNK_SIZE = 50000
+# The Id sample only needs the first Id of each chunk; small batches keep those page reads cheap
+SAMPLE_BATCH_SIZE = 200
+
+_CHUNK_DONE = object()
+
+
+class ChunkFetchError(requests.RequestException):
+    """Raised when one Id-range chunk still fails after retries; the other chunks are stopped."""
+
+    def __init__(self, chunk_query, error):
+        super().__init__(f"{error} (chunk: {chunk_query})")
+        self.chunk_query = chunk_query
+        self.error = error
+
+
+def is_chunkable(soql_query):
+    """Tells whether splitting by Id keeps the result the same: no aggregates, ORDER BY, LIMIT or OFFSET."""
+    if top_level_keyword(soql_query, 'FROM') < 0:
+        return False
+    return all(top_level_keyword(soql_query, keyword) < 0 for keyword in ('GROUP BY', 'ORDER BY', 'LIMIT', 'OFFSET'))
+
+
+def id_range_query(soql_query, low=None, high=None):
+    """Restricts a query to Ids in [low, high); a missing bound leaves that end open."""
+    conditions = []
+    if low is not None:
+        conditions.append(f"Id >= '{low}'")
+    if high is not None:
+        conditions.append(f"Id < '{high}'")
+    return add_where_condition(soql_query, ' AND '.join(conditions)) if conditions else soql_query
+
+
+def sample_boundaries(client, headers, instance_url, endpoint_path, soql_query, chunk_size=DEFAULT_CHUNK_SIZE, workers=DEFAULT_QUERY_WORKERS):
+    """Returns (totalSize, boundary Ids): the Id starting every chunk_size-th record of the query in Id order.
+
+    Runs SELECT Id with the query's FROM/WHERE ordered by Id, then reads only the first record of the
+    locator pages at each chunk offset, so sampling costs one small page per chunk.
+    """
+    sample = f"SELECT Id {soql_query[top_level_keyword(soql_query, 'FROM'):].strip()} ORDER BY Id"
+    sample_headers = dict(headers, **{'Sforce-Query-Options': f"batchSize={SAMPLE_BATCH_SIZE}"})
+    first_page = fetch_page_json(client, urljoin(instance_url, endpoint_path), sample_headers, {'q': sample})
+    total_size = first_page.get('totalSize', 0)
+    records = first_page.get('records', [])
+    offsets = list(range(chunk_size, total_size, chunk_size))
+    boundaries = [records[offset]['Id'] for offset in offsets if offset < len(records)]
+    locator = parse_query_locator(first_page.get('nextRecordsUrl'))
+    remaining = [offset for offset in offsets if offset >= len(records)]
+    if remaining and locator is not None:
+        prefix, locator_id, _ = locator
+        page_urls = [f"{prefix}{locator_id}-{offset}" for offset in remaining]
+        for page in iter_query_pages_parallel(client, sample_headers, instance_url, page_urls, workers):
+            if page.get('records'):
+                boundaries.append(page['records'][0]['Id'])
+    # Records deleted while sampling can repeat a boundary; equal bounds would make an empty chunk
+    return total_size, sorted(set(boundaries))
+
+
+def plan_chunks(client, headers, instance_url, endpoint_path, soql_query, chunk_size=DEFAULT_CHUNK_SIZE, workers=DEFAULT_QUERY_WORKERS):
+    """Returns (totalSize, chunk queries) covering the query's records in Id ranges of about chunk_size.
+
+    The first and last ranges are open, so records created after sampling still land in a chunk. A
+    query that cannot be split, or that fits in one chunk, comes back as a single-element list.
+    """
+    if not is_chunkable(soql_query):
+        return None, [soql_query]
+    total_size, boundaries = sample_boundaries(client, headers, instance_url, endpoint_path, soql_query, chunk_size, workers)
+    if not boundaries:
+        return total_size, [soql_query]
+    bounds = [None] + boundaries + [None]
+    return total_size, [id_range_query(soql_query, low, high) for low, high in zip(bounds, bounds[1:])]
+
+
+def iter_chunk_pages(client, headers, instance_url, endpoint_path, chunk_queries, workers=DEFAULT_QUERY_WORKERS):
+    """Runs chunk queries, all pages each, on up to workers threads and yields (records, response JSON) as pages arrive.
+
+    Pages from different chunks interleave, so records do not come in Id order. At most two pages per
+    worker wait in memory. A chunk that fails raises ChunkFetchError, or the chunk's own exception when it
+    is not a request error, and stops the others; closing the generator stops them too.
+    """
+    workers = max(1, min(workers, client.pool_size, len(chunk_queries)))
+    pages = queue.Queue(maxsize=workers * 2)
+    stop = threading.Event()
+    query_url = urljoin(instance_url, endpoint_path)
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run_chunk(chunk_query):
+        try:
+            for page in iter_pages(client, query_url, headers, instance_url, endpoint_path, True, chunk_query):
+                if not put(page):
+                    return
+        except (PageFetchError, requests.RequestException) as e:
+            put(ChunkFetchError(chunk_query, e.error if isinstance(e, PageFetchError) else e))
+        except Exception as e:
+            # Anything else is passed on as is, so it is raised to the consumer instead of lost in the worker
+            put(e)
+        finally:
+            # Always counted, so the consumer never waits for a chunk that is gone
+            put(_CHUNK_DONE)
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        for chunk_query in chunk_queries:
+            executor.submit(wrap_context(run_chunk), chunk_query)
+        remaining = len(chunk_queries)
+        while remaining:
+            item = pages.get()
+            if item is _CHUNK_DONE:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
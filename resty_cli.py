@@ -0,0 +1,292 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urljoin
+
+import requests
+
+from resty_async import SyncRestyClient
+from resty_bulk import BulkJobError, api_version_from_path
+from resty_cache import ResponseCache
+from resty_client import RestyClient, load_auth_credentials, send_record_request, DEFAULT_POOL_SIZE
+from resty_engine import iter_spec_pages, schema_resolver
+from resty_flatten import query_fields
+from resty_limits import RateLimiter, DEFAULT_RATE, DEFAULT_BURST, DEFAULT_RESERVE_PERCENT
+from resty_query import PageFetchError, determine_record_key, DEFAULT_QUERY_WORKERS
+from resty_retry import RetryPolicy, DEFAULT_MAX_ATTEMPTS
+from resty_schema import SchemaCache
+from resty_sinks import export_sink, EXPORT_FORMATS
+from resty_trace import Tracer, span
+
+#------------------------------------------------------
+# Salesforce RESTY - headless command line runner for batches of requests
+# Author: Mohan Chinnappan
+# Copyleft software. Maintain the author name in your copies/modifications
+#------------------------------------------------------
+
+SPEC_EXAMPLE = '''\
+Each line of SPEC_FILE is one JSON request, for example:
+  {"id": "accounts", "path": "/services/data/v{version}/query", "query": "SELECT Id, Name FROM Account", "format": "Parquet"}
+  {"id": "contacts", "path": "/services/data/v{version}/query", "query": "SELECT Id FROM Contact", "engine": "Auto", "output": "contacts.csv.gz"}
+  {"id": "limits", "path": "/services/data/v{version}/limits"}
+  {"id": "new-account", "method": "POST", "path": "/services/data/v{version}/sobjects/Account", "payload": {"Name": "Acme"}}
+
+Keys: id, method (GET), path ({version} is replaced), query, all_pages (true), engine (REST, Bulk API 2.0
+or Auto), workers, chunk_size (Id-range chunks for REST queries), payload, format (one of the export
+formats) and output (a file name under --output-dir; its extension picks the format when none is given).
+Query results stream to the output file page by page; other responses are saved as JSON, with the records
+of every page of a paged GET (nextPageUrl) in one file unless all_pages is false.
+'''
+
+
+class _RecordingClient:
+    """Wraps a shared client and counts the status codes of the responses one spec receives."""
+
+    def __init__(self, client):
+        self.client = client
+        self.lock = threading.Lock()
+        self.status_codes = Counter()
+        self.requests = 0
+
+    def request(self, method, url, **kwargs):
+        response = self.client.request(method, url, **kwargs)
+        with self.lock:
+            self.requests += 1
+            self.status_codes[str(response.status_code)] += 1
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request('PATCH', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+def log(message):
+    print(f"{datetime.now().strftime('%H:%M:%S')} {message}", file=sys.stderr, flush=True)
+
+
+def load_specs(spec_file):
+    """Reads request specs from a JSONL file, skipping blank lines and # comments, and gives each an id."""
+    specs = []
+    with open(spec_file, encoding='utf-8') as lines:
+        for number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                spec = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{spec_file}:{number}: {e}") from e
+            if not spec.get('path'):
+                raise ValueError(f"{spec_file}:{number}: a spec needs a path")
+            spec.setdefault('id', spec.get('request_id') or f"request-{len(specs) + 1}")
+            specs.append(spec)
+    ids = Counter(spec['id'] for spec in specs)
+    duplicates = [spec_id for spec_id, count in ids.items() if count > 1]
+    if duplicates:
+        raise ValueError(f"Duplicate spec ids: {', '.join(duplicates)}")
+    return specs
+
+
+def format_for(spec):
+    """Returns the export format of a query spec: its format key, else the one matching its output extension, else CSV."""
+    if spec.get('format'):
+        if spec['format'] not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported format {spec['format']}; choose one of {', '.join(EXPORT_FORMATS)}")
+        return spec['format']
+    output = spec.get('output', '')
+    # Longest extension first, so .csv.gz is not taken for .gz or .csv
+    for export_format, (extension, _) in sorted(EXPORT_FORMATS.items(), key=lambda item: -len(item[1][0])):
+        if output.endswith(extension):
+            return export_format
+    return 'CSV'
+
+
+def output_path(spec, output_dir, extension):
+    return os.path.join(output_dir, spec.get('output') or f"{spec['id']}{extension}")
+
+
+def run_spec(spec, client, headers, instance_url, default_api_version, output_dir, schema_cache, tracers=None):
+    """Runs one spec and returns its summary entry; failures are recorded in the entry instead of raised.
+
+    Each spec is traced on its own Tracer; its summed phase and step times go into the entry as timings_ms,
+    and the tracer is appended to tracers when a list is given.
+    """
+    tracer = Tracer()
+    with tracer.activate():
+        summary = _run_spec(spec, client, headers, instance_url, default_api_version, output_dir, schema_cache)
+    summary['timings_ms'] = {name: round(millis, 1) for name, millis in tracer.breakdown().items()}
+    if tracers is not None:
+        tracers.append(tracer)
+    return summary
+
+
+def _run_spec(spec, client, headers, instance_url, default_api_version, output_dir, schema_cache):
+    recorder = _RecordingClient(client)
+    method = spec.get('method', 'GET').upper()
+    endpoint_path = spec['path'].replace('{version}', str(spec.get('api_version', default_api_version)))
+    api_version = api_version_from_path(endpoint_path, default_api_version)
+    report = lambda message: log(f"[{spec['id']}] {message}")
+    summary = {'id': spec['id'], 'method': method, 'path': endpoint_path, 'status': 'ok', 'started': datetime.now(timezone.utc).isoformat(),
+               'records': 0, 'pages': 0, 'output': None, 'error': None}
+    started = time.perf_counter()
+    first_page = None
+    try:
+        workers = int(spec.get('workers', DEFAULT_QUERY_WORKERS))
+        if method == 'GET' and spec.get('query'):
+            export_format = format_for(spec)
+            summary['format'] = export_format
+            summary['output'] = output_path(spec, output_dir, EXPORT_FORMATS[export_format][0])
+            resolve_schema = None
+            if spec.get('typed', True):
+                resolve_schema = schema_resolver(recorder, headers, instance_url, api_version, spec['query'], schema_cache, report)
+            sink = export_sink(export_format, summary['output'], resolve_schema=resolve_schema, fields=query_fields(spec['query']))
+            with sink:
+                for records, _ in iter_spec_pages(recorder, headers, instance_url, api_version, endpoint_path, spec, workers, report):
+                    if first_page is None:
+                        first_page = time.perf_counter() - started
+                    with span(sink.span_name, records=len(records)):
+                        sink.write(records)
+                    summary['pages'] += 1
+            summary['records'] = sink.count
+        elif method == 'GET':
+            # Every page of a paged resource (nextPageUrl) goes into one JSON file with the records of all pages
+            response_json, records = None, []
+            for page_records, page_json in iter_spec_pages(recorder, headers, instance_url, api_version, endpoint_path, spec, workers, report):
+                if first_page is None:
+                    first_page = time.perf_counter() - started
+                response_json = response_json if response_json is not None else page_json
+                if isinstance(page_records, list):
+                    records.extend(page_records)
+                summary['pages'] += 1
+            if summary['pages'] > 1:
+                response_json = dict(response_json, **{determine_record_key(endpoint_path, response_json): records, 'nextPageUrl': None})
+                summary['records'] = len(records)
+            summary['output'] = output_path(spec, output_dir, '.json')
+            with open(summary['output'], 'w', encoding='utf-8') as output_file:
+                json.dump(response_json, output_file, indent=2)
+        else:
+            response_json = send_record_request(recorder, method, urljoin(instance_url, endpoint_path), headers, spec.get('payload'))
+            first_page = time.perf_counter() - started
+            summary['output'] = output_path(spec, output_dir, '.json')
+            with open(summary['output'], 'w', encoding='utf-8') as output_file:
+                json.dump(response_json, output_file, indent=2)
+    except (BulkJobError, ValueError, OSError, requests.RequestException) as e:
+        summary['status'] = 'error'
+        summary['error'] = str(e.error if isinstance(e, PageFetchError) else e)
+    except Exception as e:
+        # Anything else fails this spec only; the others still run and the summary is still written
+        summary['status'] = 'error'
+        summary['error'] = f"{type(e).__name__}: {e}"
+    summary['seconds'] = round(time.perf_counter() - started, 3)
+    summary['first_page_seconds'] = round(first_page, 3) if first_page is not None else None
+    summary['requests'] = recorder.requests
+    summary['status_codes'] = dict(recorder.status_codes)
+    if summary['output'] and os.path.exists(summary['output']):
+        summary['bytes'] = os.path.getsize(summary['output'])
+    log(f"[{spec['id']}] {summary['status']}: {summary['records']:,} records in {summary['seconds']}s"
+        + (f" - {summary['error']}" if summary['error'] else ''))
+    return summary
+
+
+def build_client(instance_url, args):
+    limiter = RateLimiter()
+    limiter.configure(rate=args.rate, burst=max(int(args.rate), DEFAULT_BURST), reserve_percent=args.reserve, enabled=not args.no_throttle)
+    retry_policy = RetryPolicy(max_attempts=args.max_attempts)
+    client_class = SyncRestyClient if args.http_engine == 'httpx' else RestyClient
+    return client_class(instance_url, pool_size=args.pool_size, limiter=limiter, retry_policy=retry_policy, cache=ResponseCache())
+
+
+def run(args):
+    """Runs every spec with up to args.parallel at a time and returns the summary dict."""
+    with open(args.auth, encoding='utf-8') as auth_file:
+        auth_credentials = load_auth_credentials(auth_file)
+    instance_url = auth_credentials['instance_url'].strip()
+    if not instance_url.startswith(('http://', 'https://')):
+        instance_url = 'https://' + instance_url
+    api_version = args.api_version or auth_credentials['api_version']
+    headers = {
+        'Authorization': f'Bearer {auth_credentials["access_token"]}',
+        'Content-Type': 'application/json'
+    }
+    specs = load_specs(args.spec_file)
+    os.makedirs(args.output_dir, exist_ok=True)
+    client = build_client(instance_url, args)
+    schema_cache = SchemaCache()
+    tracers = []
+    started = time.perf_counter()
+    log(f"Running {len(specs)} requests against {instance_url}, {args.parallel} at a time")
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.parallel)) as executor:
+            results = list(executor.map(lambda spec: run_spec(spec, client, headers, instance_url, api_version, args.output_dir, schema_cache, tracers), specs))
+    finally:
+        if hasattr(client, 'close'):
+            client.close()
+    if args.trace:
+        # One OTLP resource per spec, each its own trace
+        with open(args.trace, 'w', encoding='utf-8') as trace_file:
+            json.dump({'resourceSpans': [resource for tracer in tracers for resource in tracer.to_otlp('resty_cli')['resourceSpans']]}, trace_file)
+    return {
+        'instance_url': instance_url,
+        'api_version': api_version,
+        'finished': datetime.now(timezone.utc).isoformat(),
+        'seconds': round(time.perf_counter() - started, 3),
+        'succeeded': sum(result['status'] == 'ok' for result in results),
+        'failed': sum(result['status'] != 'ok' for result in results),
+        'requests': results
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m resty_cli', description="Run a file of Salesforce REST requests without the browser.",
+                                     epilog=SPEC_EXAMPLE, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('spec_file', help="JSONL file with one request spec per line")
+    parser.add_argument('--auth', default='auth.json', help="auth.json from 'sf org display --json' (default: auth.json)")
+    parser.add_argument('--api-version', help="API version for {version} in paths (default: from auth.json)")
+    parser.add_argument('--output-dir', default='resty_output', help="Directory for result files (default: resty_output)")
+    parser.add_argument('--summary', help="Write the JSON summary here instead of stdout")
+    parser.add_argument('--parallel', type=int, default=4, help="Requests run at the same time (default: 4)")
+    parser.add_argument('--pool-size', type=int, default=DEFAULT_POOL_SIZE, help=f"Pooled keep-alive connections (default: {DEFAULT_POOL_SIZE})")
+    parser.add_argument('--http-engine', choices=['requests', 'httpx'], default='requests')
+    parser.add_argument('--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS, help=f"Attempts per request, with retries on transient errors (default: {DEFAULT_MAX_ATTEMPTS})")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help=f"Max requests per second (default: {DEFAULT_RATE})")
+    parser.add_argument('--reserve', type=float, default=DEFAULT_RESERVE_PERCENT, help=f"Percent of the daily API limit left untouched (default: {DEFAULT_RESERVE_PERCENT})")
+    parser.add_argument('--no-throttle', action='store_true', help="Do not throttle requests")
+    parser.add_argument('--trace', help="Also write every request's timing spans to this file as OTLP/JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        summary = run(args)
+    except (OSError, ValueError) as e:
+        log(f"Error: {e}")
+        return 2
+    text = json.dumps(summary, indent=2)
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as summary_file:
+            summary_file.write(text)
+    else:
+        print(text)
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+import json
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from resty_trace import current_tracer, install_timed_pools, start_http_phases, stop_http_phases
+
+#------------------------------------------------------
+# Salesforce RESTY - pooled HTTP client
+# Author: Mohan Chinnappan
+# Copyleft software. Maintain the author name in your copies/modifications
+#------------------------------------------------------
+
+DEFAULT_POOL_SIZE = 10
+
+
+def load_auth_credentials(auth_file):
+    """Loads Salesforce credentials and API version from an auth.json file with nested result structure."""
+    auth_data = json.load(auth_file)
+    # Access the 'result' object
+    result = auth_data.get('result', {})
+    access_token = result.get('accessToken')
+    instance_url = result.get('instanceUrl')
+    api_version = result.get('apiVersion', '60.0')  # Default to 60.0 if missing
+
+    if not access_token or not instance_url:
+        raise ValueError("Missing required credentials (accessToken or instanceUrl) in auth.json under 'result'")
+
+    return {
+        'access_token': access_token,
+        'instance_url': instance_url,
+        'api_version': api_version
+    }
+
+
+class SalesforceAPIError(requests.HTTPError):
+    """Raised when Salesforce answers with a status code the caller did not expect."""
+
+    def __init__(self, response):
+        self.status_code = response.status_code
+        super().__init__(f"{response.status_code} {response.text}", response=response)
+
+
+def raise_for_status(response, expected=(200,)):
+    """Raises SalesforceAPIError unless the response status is one of expected."""
+    if response.status_code not in expected:
+        raise SalesforceAPIError(response)
+    return response
+
+
+RECORD_SUCCESS_CODES = {'POST': (200, 201), 'PATCH': (204,), 'DELETE': (204,)}
+
+
+def send_record_request(client, method, url, headers, payload=None):
+    """Sends a single-record POST, PATCH or DELETE and returns its JSON result, raising SalesforceAPIError on failure."""
+    method = method.upper()
+    body = payload if method != 'DELETE' else None
+    response = raise_for_status(client.request(method, url, headers=headers, json=body), RECORD_SUCCESS_CODES[method])
+    if method == 'POST':
+        return response.json()
+    if method == 'PATCH':
+        return response.json() if response.content else {"message": "Update successful"}
+    return {"message": "Delete successful"}
+
+
+def cached_response(entry):
+    """Builds a requests.Response from a resty_cache.CacheEntry."""
+    response = requests.Response()
+    response.status_code = entry.status_code
+    response.headers = CaseInsensitiveDict({**entry.headers, 'X-Resty-Cache': 'hit'})
+    response._content = entry.content
+    response.url = entry.url
+    response.encoding = 'utf-8'
+    return response
+
+
+class RestyClient:
+    """Keep-alive HTTP client for one Salesforce instance backed by a pooled requests.Session."""
+
+    def __init__(self, instance_url, pool_size=DEFAULT_POOL_SIZE, keep_alive=True, timeout=None, limiter=None, retry_policy=None, cache=None):
+        self.instance_url = instance_url.rstrip('/')
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        # Optional resty_limits.RateLimiter shared by every request to this instance
+        self.limiter = limiter
+        # Optional resty_retry.RetryPolicy applied to every request
+        self.retry_policy = retry_policy
+        # Optional resty_cache.ResponseCache consulted for GETs of metadata endpoints
+        self.cache = cache
+        self.session = requests.Session()
+        # One adapter per scheme; pool_maxsize bounds the warm connections kept per host
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        # Connections time connect, TLS, send and time to first byte for resty_trace
+        install_timed_pools(adapter)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        if not keep_alive:
+            self.session.headers['Connection'] = 'close'
+
+    def request(self, method, url, idempotent=None, **kwargs):
+        """Sends a request over the pooled session, applying the response cache, client timeout, throttling and retry policy.
+
+        idempotent overrides the retry policy's method-based guess of whether resending is safe. While a
+        resty_trace.Tracer is active the request is recorded as a span with its connect, TLS, send, time to
+        first byte, download and wait phases.
+        """
+        tracer = current_tracer.get()
+        if tracer is None:
+            return self._request(method, url, idempotent, **kwargs)
+        start = time.perf_counter_ns()
+        start_http_phases()
+        attributes = {}
+        try:
+            response = self._request(method, url, idempotent, **kwargs)
+            attributes['http.status_code'] = response.status_code
+            attributes['resty.cache'] = response.headers.get('X-Resty-Cache', 'miss')
+            return response
+        except requests.RequestException as e:
+            attributes['error'] = str(e)
+            raise
+        finally:
+            end = time.perf_counter_ns()
+            phases = stop_http_phases()
+            # The body is read after the headers arrive; everything from the last header read on is download
+            last_headers = max((phase_end for phase, _, phase_end in phases if phase == 'ttfb'), default=None)
+            if last_headers is not None:
+                phases.append(('download', last_headers, end))
+            tracer.add_http(method.upper(), url, start, end, phases, attributes)
+
+    def _request(self, method, url, idempotent=None, **kwargs):
+        lookup = self.cache.prepare(method, url, kwargs.get('params'), kwargs.get('headers')) if self.cache is not None else None
+        if lookup is None:
+            return self._send(method, url, idempotent, **kwargs)
+        if lookup.hit:
+            return cached_response(lookup.entry)
+        kwargs['headers'] = lookup.headers
+        response = self._send(method, url, idempotent, **kwargs)
+        entry = self.cache.complete(lookup, response.status_code, response.headers, response.content)
+        return cached_response(entry) if entry is not None else response
+
+    def _send(self, method, url, idempotent=None, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        policy = self.retry_policy
+        attempt = 0
+        while True:
+            attempt += 1
+            if self.limiter is not None:
+                self.limiter.acquire()
+            try:
+                response = self.session.request(method.upper(), url, **kwargs)
+            except requests.RequestException as e:
+                if policy is None or not policy.should_retry_error(method, e, attempt, idempotent):
+                    raise
+                time.sleep(policy.backoff(attempt))
+                continue
+            if self.limiter is not None:
+                self.limiter.observe_response(response)
+            if response.status_code >= 400 and policy is not None and policy.should_retry_response(method, response, attempt, idempotent):
+                time.sleep(policy.backoff(attempt, response))
+                continue
+            return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request('PATCH', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+    def close(self):
+        """Closes every pooled connection held by the session."""
+        self.session.close()
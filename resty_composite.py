@@ -0,0 +1,244 @@
+import math
+import re
+from urllib.parse import urljoin
+
+import pandas as pd
+
+from resty_client import raise_for_status
+from resty_query import iter_in_order
+
+#------------------------------------------------------
+# Salesforce RESTY - sObject Collections and Composite helpers
+# Author: Mohan Chinnappan
+# Copyleft software. Maintain the author name in your copies/modifications
+#------------------------------------------------------
+
+COLLECTION_LIMIT = 200
+BATCH_LIMIT = 25
+COMPOSITE_LIMIT = 25
+GRAPH_NODE_LIMIT = 500
+DEFAULT_DML_WORKERS = 4
+
+COLLECTION_OPERATIONS = ('create', 'update', 'upsert', 'delete')
+# Rows listed by name in a validation error before the rest are only counted
+MAX_LISTED_ROWS = 10
+
+
+def chunked(items, size):
+    """Splits a list into consecutive lists of at most size items."""
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def frame_records(df):
+    """Turns a DataFrame into record dicts, leaving out blank and missing values."""
+    records = []
+    for row in df.to_dict('records'):
+        records.append({
+            key: value for key, value in row.items()
+            if value != '' and not (isinstance(value, float) and math.isnan(value))
+        })
+    return records
+
+
+def validate_collection_records(operation, records):
+    """Raises ValueError listing the rows (1-based) that update or delete cannot run on because they have no Id."""
+    if operation not in ('update', 'delete'):
+        return
+    missing = [row for row, record in enumerate(records, start=1) if not record.get('Id')]
+    if missing:
+        listed = ', '.join(str(row) for row in missing[:MAX_LISTED_ROWS])
+        more = f" and {len(missing) - MAX_LISTED_ROWS} more" if len(missing) > MAX_LISTED_ROWS else ''
+        raise ValueError(f"{operation} needs an Id on every record; {len(missing)} rows have none: {listed}{more}")
+
+
+def _with_type(record, sobject):
+    """Adds the attributes.type entry sObject Collections needs for create, update and upsert."""
+    if 'attributes' in record:
+        return record
+    return {'attributes': {'type': sobject}, **record}
+
+
+def collection_request(client, headers, instance_url, api_version, operation, sobject, records, all_or_none=False, external_id_field=None):
+    """Runs one sObject Collections call for up to 200 records and returns the per-record results."""
+    base_url = urljoin(instance_url, f"/services/data/v{api_version}/composite/sobjects")
+    if operation == 'delete':
+        params = {'ids': ','.join(record['Id'] for record in records), 'allOrNone': str(all_or_none).lower()}
+        response = client.delete(base_url, headers=headers, params=params)
+    else:
+        body = {'allOrNone': all_or_none, 'records': [_with_type(record, sobject) for record in records]}
+        if operation == 'create':
+            response = client.post(base_url, headers=headers, json=body)
+        elif operation == 'update':
+            response = client.patch(base_url, headers=headers, json=body)
+        elif operation == 'upsert':
+            response = client.patch(f"{base_url}/{sobject}/{external_id_field}", headers=headers, json=body)
+        else:
+            raise ValueError(f"Unsupported collection operation: {operation}")
+    return raise_for_status(response).json()
+
+
+def run_collections(client, headers, instance_url, api_version, operation, sobject, records, all_or_none=False,
+                    external_id_field=None, workers=DEFAULT_DML_WORKERS, on_chunk=None):
+    """Runs DML over any number of records in 200-record sObject Collections calls, several at a time.
+
+    Returns one result per input record, in input order. all_or_none applies to each 200-record chunk.
+    on_chunk, if given, is called with the number of records done after each chunk.
+    """
+    if operation not in COLLECTION_OPERATIONS:
+        raise ValueError(f"Unsupported collection operation: {operation}")
+    if operation == 'upsert' and not external_id_field:
+        raise ValueError("An external ID field is required for upsert")
+    validate_collection_records(operation, records)
+
+    def run(chunk):
+        return collection_request(client, headers, instance_url, api_version, operation, sobject, chunk, all_or_none, external_id_field)
+
+    results = []
+    for chunk_results in iter_in_order(run, chunked(records, COLLECTION_LIMIT), min(workers, client.pool_size)):
+        results.extend(chunk_results)
+        if on_chunk is not None:
+            on_chunk(len(results))
+    return results
+
+
+def batch_request(client, headers, instance_url, api_version, subrequests, halt_on_error=False):
+    """Sends up to 25 independent subrequests in one /composite/batch call and returns their results."""
+    url = urljoin(instance_url, f"/services/data/v{api_version}/composite/batch")
+    body = {'haltOnError': halt_on_error, 'batchRequests': subrequests}
+    return raise_for_status(client.post(url, headers=headers, json=body)).json().get('results', [])
+
+
+def run_composite_batch(client, headers, instance_url, api_version, subrequests, halt_on_error=False, workers=DEFAULT_DML_WORKERS):
+    """Runs any number of subrequests in 25-request /composite/batch calls, several at a time, keeping input order."""
+
+    def run(chunk):
+        return batch_request(client, headers, instance_url, api_version, chunk, halt_on_error)
+
+    results = []
+    for chunk_results in iter_in_order(run, chunked(subrequests, BATCH_LIMIT), min(workers, client.pool_size)):
+        results.extend(chunk_results)
+    return results
+
+
+def collection_results_frame(records, results):
+    """Pairs each input record with its id, success flag and error messages in one DataFrame."""
+    rows = []
+    for record, result in zip(records, results):
+        errors = result.get('errors') or []
+        rows.append({
+            'id': result.get('id') or record.get('Id'),
+            'success': result.get('success'),
+            'created': result.get('created'),
+            'errors': '; '.join(f"{error.get('statusCode')}: {error.get('message')}" for error in errors),
+            **{key: value for key, value in record.items() if key != 'attributes'}
+        })
+    return pd.DataFrame(rows)
+
+
+# Matches @{referenceId.field} and @{referenceId.records[0].Id} style references
+REFERENCE_PATTERN = re.compile(r'@\{([A-Za-z0-9_]+)[.\[]')
+
+
+class CompositeRequestBuilder:
+    """Collects dependent subrequests that pass results forward with @{referenceId.field} references.
+
+    The same steps can be sent as one /composite request (up to 25 subrequests) or as a single
+    /composite/graph graph (up to 500 nodes).
+    """
+
+    def __init__(self, api_version, all_or_none=True):
+        self.api_version = api_version
+        self.all_or_none = all_or_none
+        self.subrequests = []
+
+    @staticmethod
+    def ref(reference_id, field='id'):
+        """Returns the @{referenceId.field} expression for an earlier step's result."""
+        return f"@{{{reference_id}.{field}}}"
+
+    def sobject_url(self, sobject, record_id=None):
+        url = f"/services/data/v{self.api_version}/sobjects/{sobject}"
+        return f"{url}/{record_id}" if record_id else url
+
+    def add(self, method, url, reference_id, body=None):
+        """Appends a subrequest, checking that its references point at earlier steps."""
+        known = {subrequest['referenceId'] for subrequest in self.subrequests}
+        if not reference_id or reference_id in known:
+            raise ValueError(f"Reference ID must be unique and non-empty: {reference_id!r}")
+        for used in REFERENCE_PATTERN.findall(f"{url} {body}" if body is not None else url):
+            if used not in known:
+                raise ValueError(f"Step {reference_id!r} refers to {used!r}, which is not an earlier step")
+        subrequest = {'method': method.upper(), 'url': url, 'referenceId': reference_id}
+        if body is not None:
+            subrequest['body'] = body
+        self.subrequests.append(subrequest)
+        return self.ref(reference_id)
+
+    def create(self, sobject, reference_id, fields):
+        return self.add('POST', self.sobject_url(sobject), reference_id, fields)
+
+    def update(self, sobject, record_id, reference_id, fields):
+        return self.add('PATCH', self.sobject_url(sobject, record_id), reference_id, fields)
+
+    def delete(self, sobject, record_id, reference_id):
+        return self.add('DELETE', self.sobject_url(sobject, record_id), reference_id)
+
+    def get(self, url, reference_id):
+        return self.add('GET', url, reference_id)
+
+    @classmethod
+    def from_steps(cls, api_version, steps, all_or_none=True):
+        """Builds a request from a list of {method, url, referenceId, body} dicts."""
+        builder = cls(api_version, all_or_none)
+        for step in steps:
+            builder.add(step.get('method', 'GET'), step.get('url', ''), step.get('referenceId'), step.get('body'))
+        return builder
+
+    def build(self):
+        """Returns the /composite request body."""
+        if len(self.subrequests) > COMPOSITE_LIMIT:
+            raise ValueError(f"/composite accepts at most {COMPOSITE_LIMIT} subrequests; use /composite/graph instead")
+        return {'allOrNone': self.all_or_none, 'compositeRequest': self.subrequests}
+
+    def build_graph(self, graph_id='graph1'):
+        """Returns the /composite/graph request body holding every step as one all-or-none graph."""
+        if len(self.subrequests) > GRAPH_NODE_LIMIT:
+            raise ValueError(f"A composite graph holds at most {GRAPH_NODE_LIMIT} nodes")
+        return {'graphs': [{'graphId': graph_id, 'compositeRequest': self.subrequests}]}
+
+    def send(self, client, headers, instance_url, graph=False):
+        """Sends every step in one round trip and returns the subrequest responses in step order.
+
+        Graph responses also carry their graph's graphId and isSuccessful, which composite_failures reads.
+        """
+        if graph:
+            url = urljoin(instance_url, f"/services/data/v{self.api_version}/composite/graph")
+            body = raise_for_status(client.post(url, headers=headers, json=self.build_graph())).json()
+            responses = []
+            for graph_result in body.get('graphs', []):
+                outcome = {'graphId': graph_result.get('graphId'), 'isSuccessful': graph_result.get('isSuccessful', True)}
+                responses.extend(dict(response, **outcome) for response in graph_result.get('graphResponse', {}).get('compositeResponse', []))
+            return responses
+        url = urljoin(instance_url, f"/services/data/v{self.api_version}/composite")
+        return raise_for_status(client.post(url, headers=headers, json=self.build())).json().get('compositeResponse', [])
+
+
+def composite_failures(responses):
+    """Returns the subrequest responses that failed: an error status, or a node of a graph that was rolled back."""
+    return [response for response in responses
+            if (response.get('httpStatusCode') or 500) >= 400 or response.get('isSuccessful') is False]
+
+
+def composite_results_frame(responses):
+    """Summarises composite subrequest responses as referenceId, status, id and errors."""
+    rows = []
+    for response in responses:
+        body = response.get('body')
+        errors = body if isinstance(body, list) else []
+        rows.append({
+            'referenceId': response.get('referenceId'),
+            'httpStatusCode': response.get('httpStatusCode'),
+            'id': body.get('id') if isinstance(body, dict) else None,
+            'errors': '; '.join(f"{error.get('errorCode')}: {error.get('message')}" for error in errors if isinstance(error, dict))
+        })
+    return pd.DataFrame(rows)
@@ -0,0 +1,100 @@
+from urllib.parse import urljoin
+
+import requests
+
+from resty_async import SyncRestyClient
+from resty_bulk import iter_bulk_query_pages, should_use_bulk, sobject_from_soql, DEFAULT_BULK_THRESHOLD
+from resty_chunking import iter_chunk_pages, plan_chunks
+from resty_query import iter_pages, is_locator_url
+
+#------------------------------------------------------
+# Salesforce RESTY - choosing REST, Id-range chunks or Bulk API 2.0 for a fetch
+# Author: Mohan Chinnappan
+# Copyleft software. Maintain the author name in your copies/modifications
+#------------------------------------------------------
+
+
+def _ignore(message):
+    pass
+
+
+def iter_spec_pages(client, headers, instance_url, api_version, endpoint_path, spec, workers, report=None, on_total=None, full_url=None,
+                    on_bulk_poll=None):
+    """Chooses REST, Id-range chunks or Bulk API 2.0 for a GET spec and returns its (records, response JSON) page stream.
+
+    spec holds query, all_pages (default True), engine ('REST', 'Bulk API 2.0' or 'Auto'), bulk_threshold
+    and chunk_size; Auto picks Bulk when a COUNT() probe reaches bulk_threshold. GETs that are not queries
+    page through nextPageUrl when all_pages is set. full_url starts the stream elsewhere than endpoint_path:
+    a locator URL resumes a REST query at that page, so it is never sent to Bulk or split into chunks.
+    report receives progress messages; on_total is called with the record count when the COUNT() probe or
+    the chunk plan learns it before the first page; on_bulk_poll receives the Bulk job info at every poll.
+    """
+    report = report or _ignore
+    full_url = full_url or urljoin(instance_url, endpoint_path)
+    all_pages = spec.get('all_pages', True)
+    engine = spec.get('engine', 'REST')
+    soql_query = spec.get('query')
+    is_query = bool(soql_query) and 'query' in endpoint_path.lower()
+    resuming = is_locator_url(full_url)
+    if is_query and not resuming and engine != 'REST':
+        use_bulk = engine == 'Bulk API 2.0'
+        if engine == 'Auto':
+            try:
+                use_bulk, total_size = should_use_bulk(client, headers, instance_url, api_version, soql_query, spec.get('bulk_threshold', DEFAULT_BULK_THRESHOLD))
+            except requests.RequestException:
+                use_bulk, total_size = False, None
+            report(f"COUNT() probe: {total_size if total_size is not None else 'unavailable'} records, using {'Bulk API 2.0' if use_bulk else 'REST'}")
+            if total_size is not None and on_total is not None:
+                on_total(total_size)
+        if use_bulk:
+            if on_bulk_poll is None:
+                on_bulk_poll = lambda job_info: report(f"Bulk job {job_info.get('id')}: {job_info.get('state')}, "
+                                                       f"{job_info.get('numberRecordsProcessed', 0)} records processed")
+            query_all = 'queryall' in endpoint_path.lower()
+            return iter_bulk_query_pages(client, headers, instance_url, api_version, soql_query, query_all, workers=workers, on_poll=on_bulk_poll)
+    if is_query and not resuming and all_pages and spec.get('chunk_size'):
+        try:
+            total_size, chunk_queries = plan_chunks(client, headers, instance_url, endpoint_path, soql_query, int(spec['chunk_size']), workers)
+        except requests.RequestException as e:
+            report(f"Could not sample Id boundaries; running the query as one: {e}")
+            total_size, chunk_queries = None, [soql_query]
+        if total_size is None and len(chunk_queries) == 1:
+            report("ORDER BY, LIMIT, OFFSET and GROUP BY queries are not split into Id ranges")
+        if len(chunk_queries) > 1:
+            report(f"Split {total_size:,} records into {len(chunk_queries)} Id-range chunks, {min(workers, len(chunk_queries))} at a time")
+            if on_total is not None:
+                # Each chunk's totalSize counts that chunk only
+                on_total(total_size)
+            return iter_chunk_pages(client, headers, instance_url, endpoint_path, chunk_queries, workers)
+    if all_pages and workers > 1 and is_query:
+        report(f"Fetching remaining pages with {workers} workers")
+    if isinstance(client, SyncRestyClient):
+        return client.iter_pages(full_url, headers, instance_url, endpoint_path, all_pages, soql_query, workers)
+    return iter_pages(client, full_url, headers, instance_url, endpoint_path, all_pages, soql_query, workers)
+
+
+def schema_resolver(client, headers, instance_url, api_version, soql_query, schema_cache, report=None):
+    """Returns a resolve_schema callback for the typed sinks that describes the records' sObject.
+
+    Records without attributes (Bulk CSV, spooled parts) fall back to the FROM object of the query.
+    Dotted relationship columns are typed by describing the related sObject when first needed. A failed
+    describe is reported and leaves the columns untyped instead of failing the fetch. The outcome is
+    remembered, so several sinks sharing the callback describe and report only once.
+    """
+    report = report or _ignore
+    fallback = sobject_from_soql(soql_query) if soql_query else None
+    resolved = {}
+
+    def resolve(sobject=None):
+        sobject = sobject or fallback
+        if not sobject or sobject == 'AggregateResult':
+            return None
+        if sobject not in resolved:
+            try:
+                resolved[sobject] = schema_cache.get(client, headers, instance_url, api_version, sobject).with_related(resolve)
+            except (requests.RequestException, ValueError) as e:
+                report(f"Could not describe {sobject}; leaving the columns untyped: {e}")
+                resolved[sobject] = None
+        return resolved[sobject]
+
+    return resolve
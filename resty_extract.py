@@ -0,0 +1,224 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+from resty_query import PageFetchError
+from resty_sinks import strip_attributes
+
+#------------------------------------------------------
+# Salesforce RESTY - resumable extracts spooled to disk
+# Author: Mohan Chinnappan
+# Copyleft software. Maintain the author name in your copies/modifications
+#------------------------------------------------------
+
+DEFAULT_SPOOL_DIR = os.path.join(tempfile.gettempdir(), 'resty_extracts')
+CHECKPOINT_FILE = 'checkpoint.json'
+# Salesforce drops a query locator that is not read for about 15 minutes
+LOCATOR_IDLE_SECONDS = 15 * 60
+
+try:
+    import pyarrow  # noqa: F401
+    SPOOL_FORMATS = ('jsonl', 'parquet')
+except ImportError:
+    SPOOL_FORMATS = ('jsonl',)
+
+
+def extract_id(instance_url, endpoint_path, soql_query=None, query_engine='REST'):
+    """Returns a stable id for an extract so a rerun of the same request finds its checkpoint."""
+    key = json.dumps([instance_url.rstrip('/'), endpoint_path, (soql_query or '').strip(), query_engine])
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+
+def _write_atomic(path, write):
+    """Writes a file through a temporary sibling so a crash never leaves a half-written file behind."""
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+class ExtractCheckpoint:
+    """Spools an extract to numbered part files and records where to continue after a crash or rerun.
+
+    Every page is written as its own JSONL or Parquet part before checkpoint.json is updated, so the
+    checkpoint never points past data that is not on disk. For REST extracts the checkpoint holds the
+    nextRecordsUrl (or nextPageUrl) of the last spooled page; for Bulk API 2.0 extracts it holds the job
+    id, the number of result chunks spooled and the Sforce-Locator of the next chunk. A REST query locator
+    expires after about LOCATOR_IDLE_SECONDS unread, so an older REST checkpoint is resumed through
+    resume_rest_pages, which reruns the query and skips the records already spooled.
+    """
+
+    def __init__(self, directory, spool_format='jsonl'):
+        if spool_format not in SPOOL_FORMATS:
+            raise ValueError(f"Unsupported spool format: {spool_format}")
+        self.directory = directory
+        self.path = os.path.join(directory, CHECKPOINT_FILE)
+        self.state = {
+            'source': None,
+            'format': spool_format,
+            'next_url': None,
+            'job_id': None,
+            'result_chunk': 0,
+            'result_locator': None,
+            'parts': [],
+            'records': 0,
+            'done': False,
+            'updated': None
+        }
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as checkpoint_file:
+                self.state.update(json.load(checkpoint_file))
+
+    @classmethod
+    def open(cls, instance_url, endpoint_path, soql_query=None, query_engine='REST', spool_dir=DEFAULT_SPOOL_DIR, spool_format='jsonl'):
+        """Returns the checkpoint of this extract, loading an earlier one when it exists."""
+        return cls(os.path.join(spool_dir, extract_id(instance_url, endpoint_path, soql_query, query_engine)), spool_format)
+
+    @property
+    def started(self):
+        return self.state['source'] is not None
+
+    @property
+    def locator_expired(self):
+        """True when a REST checkpoint's next URL has most likely expired: not read for LOCATOR_IDLE_SECONDS."""
+        return self.state['source'] == 'rest' and time.time() - (self.state['updated'] or 0) > LOCATOR_IDLE_SECONDS
+
+    @property
+    def resumable(self):
+        """True when an earlier run stopped part way and left somewhere to continue from."""
+        return self.started and not self.state['done']
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.state['updated'] = time.time()
+
+        def write(path):
+            with open(path, 'w', encoding='utf-8') as checkpoint_file:
+                json.dump(self.state, checkpoint_file, indent=2)
+
+        _write_atomic(self.path, write)
+
+    def start_bulk(self, job_info):
+        """Remembers the Bulk API 2.0 job as soon as it exists, so a rerun polls it instead of creating another."""
+        if not self.started and job_info.get('id'):
+            self.state.update(source='bulk', job_id=job_info['id'])
+            self.save()
+
+    def _write_part(self, records):
+        name = f"part-{len(self.state['parts']):05d}.{self.state['format']}"
+        path = os.path.join(self.directory, name)
+        records = [strip_attributes(record) for record in records]
+
+        def write(tmp_path):
+            if self.state['format'] == 'parquet':
+                pd.DataFrame(records).to_parquet(tmp_path, index=False)
+            else:
+                with open(tmp_path, 'w', encoding='utf-8') as part_file:
+                    for record in records:
+                        part_file.write(json.dumps(record))
+                        part_file.write('\n')
+
+        os.makedirs(self.directory, exist_ok=True)
+        _write_atomic(path, write)
+        return name
+
+    def write_page(self, records, response_json, all_pages=True):
+        """Spools one page and moves the checkpoint past it; a REST page without a next URL completes the extract."""
+        if records:
+            self.state['parts'].append(self._write_part(records))
+            self.state['records'] += len(records)
+        if self.state['source'] == 'bulk':
+            self.state['result_chunk'] = response_json.get('resultChunk', self.state['result_chunk'] + 1)
+            self.state['result_locator'] = response_json.get('resultLocator')
+        else:
+            self.state['source'] = 'rest'
+            self.state['next_url'] = response_json.get('nextRecordsUrl') or response_json.get('nextPageUrl')
+            self.state['done'] = not all_pages or not self.state['next_url']
+        self.save()
+
+    def finish(self):
+        self.state['done'] = True
+        self.save()
+
+    def spool(self, pages, all_pages=True):
+        """Passes (records, response JSON) pages through after spooling each one; marks the extract done at the end."""
+        for records, response_json in pages:
+            self.write_page(records, response_json, all_pages)
+            yield records, response_json
+        self.finish()
+
+    def iter_frames(self):
+        """Yields one DataFrame per spooled part, in page order."""
+        for name in self.state['parts']:
+            path = os.path.join(self.directory, name)
+            if name.endswith('.parquet'):
+                yield pd.read_parquet(path)
+            else:
+                yield pd.read_json(path, lines=True, dtype=False)
+
+    def frame(self):
+        """Reads every spooled part back into one DataFrame."""
+        frames = list(self.iter_frames())
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    def discard(self):
+        """Deletes the spooled parts and the checkpoint so the next run starts from zero."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def is_expired_locator(error):
+    """Tells whether a failed page was refused because its query locator expired or is unknown."""
+    if isinstance(error, PageFetchError):
+        error = error.error
+    response = getattr(error, 'response', None)
+    text = response.text if response is not None else str(error)
+    return 'INVALID_QUERY_LOCATOR' in text
+
+
+def skip_records(pages, count):
+    """Drops the first count records of a (records, response JSON) page stream; pages still come through, emptied."""
+    try:
+        for records, response_json in pages:
+            if count:
+                skipped = min(count, len(records))
+                records, count = records[skipped:], count - skipped
+            yield records, response_json
+    finally:
+        if hasattr(pages, 'close'):
+            pages.close()
+
+
+def resume_rest_pages(resume, restart, records_done, report=None):
+    """Continues a REST extract from its checkpoint, rerunning the query when the stored locator has expired.
+
+    resume() returns the page stream from the checkpoint's next URL and restart() the stream of the whole
+    query. When the first resumed page fails with INVALID_QUERY_LOCATOR, the query runs again from the
+    start and its first records_done records, already spooled, are skipped. That relies on the query
+    returning records in the same order, so records created or deleted since the first run can shift
+    the result by as many; an ORDER BY on a unique field keeps it exact.
+    """
+    pages = resume()
+    try:
+        try:
+            first = next(pages)
+        except StopIteration:
+            return
+        except PageFetchError as e:
+            if not is_expired_locator(e):
+                raise
+            if report is not None:
+                report(f"The query locator has expired; rerunning the query and skipping the {records_done:,} records already spooled")
+            pages = skip_records(restart(), records_done)
+            first = None
+        if first is not None:
+            yield first
+        yield from pages
+    finally:
+        if hasattr(pages, 'close'):
+            pages.close()
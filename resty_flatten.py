@@ -0,0 +1,257 @@
+import re
+
+import pandas as pd
+
+#------------------------------------------------------
+# Salesforce RESTY - flattening of relationship fields and subqueries
+# Author: Mohan Chinnappan
+# Copyleft software. Maintain the author name in your copies/modifications
+#------------------------------------------------------
+
+PARENT_ROW = '_parent_row'
+PARENT_ID = '_parent_id'
+# Functions whose result comes back under the field name, unless aliased
+FIELD_FUNCTIONS = ('tolabel', 'convertcurrency', 'format', 'converttimezone')
+
+
+def _present(value):
+    # Frames read back from disk hold NaN where a relationship was null
+    return value is not None and not (isinstance(value, float) and value != value)
+
+
+def _is_subquery(value):
+    return isinstance(value, dict) and 'records' in value and 'totalSize' in value
+
+
+def _split_select_list(select_list):
+    """Splits a select list on its top-level commas, keeping subqueries and TYPEOF ... END together."""
+    items, depth, typeof, start = [], 0, False, 0
+    for match in re.finditer(r'\(|\)|,|\bTYPEOF\b|\bEND\b', select_list, re.IGNORECASE):
+        token = match.group(0).upper()
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+        elif depth == 0 and token == 'TYPEOF':
+            typeof = True
+        elif depth == 0 and token == 'END':
+            typeof = False
+        elif depth == 0 and token == ',' and not typeof:
+            items.append(select_list[start:match.start()].strip())
+            start = match.end()
+    items.append(select_list[start:].strip())
+    return [item for item in items if item]
+
+
+def _top_level_from(soql_query):
+    """Returns the index of the outermost FROM, or -1."""
+    depth = 0
+    for match in re.finditer(r'\(|\)|\bFROM\b', soql_query, re.IGNORECASE):
+        token = match.group(0)
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+        elif depth == 0:
+            return match.start()
+    return -1
+
+
+def _add_path(fields, path):
+    names = path.split('.')
+    for name in names[:-1]:
+        found = next((key for key in fields if key.lower() == name.lower()), name)
+        if not isinstance(fields.get(found), dict):
+            fields[found] = {}
+        fields = fields[found]
+    if not any(key.lower() == names[-1].lower() for key in fields):
+        fields[names[-1]] = None
+
+
+def query_fields(soql_query):
+    """Returns the field layout of a SOQL select list, or None when it cannot be mapped to record keys.
+
+    The layout maps each selected name to None for a field, to a nested layout for a parent relationship
+    (Account.Name gives {'Account': {'Name': None}}, TYPEOF lists every field of its branches) and to a
+    one-element list holding the subquery's layout for a subquery. Flattening uses it for pages where a
+    relationship or subquery is null on every record, so their columns do not depend on the data.
+    Aggregate and GROUP BY queries return None: their records are flat and named by alias.
+    """
+    match = re.match(r'\s*SELECT\s', soql_query or '', re.IGNORECASE)
+    from_index = _top_level_from(soql_query) if match else -1
+    if from_index < 0:
+        return None
+    tail = soql_query[from_index:]
+    if re.search(r'\bGROUP\s+BY\b', re.sub(r'\([^()]*\)', '', tail), re.IGNORECASE):
+        return None
+    fields = {}
+    for item in _split_select_list(soql_query[match.end():from_index]):
+        if item.startswith('('):
+            inner = item[1:item.rindex(')')] if ')' in item else item[1:]
+            relationship = re.search(r'\bFROM\s+(\w+)', inner, re.IGNORECASE)
+            if relationship is None:
+                return None
+            fields[relationship.group(1)] = [query_fields(inner)]
+            continue
+        typeof = re.match(r'TYPEOF\s+([\w.]+)\s+(.*)\bEND$', item, re.IGNORECASE | re.DOTALL)
+        if typeof:
+            branches = re.split(r'\bWHEN\s+\w+\s+THEN\b|\bELSE\b', typeof.group(2), flags=re.IGNORECASE)
+            for branch in branches:
+                for field in _split_select_list(branch):
+                    _add_path(fields, f"{typeof.group(1)}.{field}")
+            continue
+        function = re.match(r'(\w+)\s*\(\s*([\w.]+)\s*\)\s*(\w+)?$', item)
+        if function:
+            if function.group(1).lower() not in FIELD_FUNCTIONS:
+                # COUNT(), SUM() and the other aggregates
+                return None
+            _add_path(fields, function.group(3) or function.group(2))
+            continue
+        if re.match(r'FIELDS\s*\(', item, re.IGNORECASE):
+            # Top-level fields only; their keys come with every record
+            continue
+        path = re.match(r'([\w.]+)(?:\s+\w+)?$', item)
+        if path is None:
+            return None
+        _add_path(fields, path.group(1))
+    return fields
+
+
+def _shape(fields, name):
+    """Returns what the layout says name is (None, dict or list), or False when the layout does not know it."""
+    if not fields:
+        return False
+    return next((value for key, value in fields.items() if key.lower() == name.lower()), False)
+
+
+def layout_depth(fields):
+    """Returns how many parent relationships deep a query_fields layout goes (0 for plain fields)."""
+    return max((1 + layout_depth(shape) for shape in (fields or {}).values() if isinstance(shape, dict)), default=0)
+
+
+def _nested_deeper(value, level):
+    """Tells whether a dict holds dicts nested more than level levels below it."""
+    return any(isinstance(item, dict) and (level == 0 or _nested_deeper(item, level - 1)) for item in value.values())
+
+
+def _subquery_names(records, fields):
+    """Returns the top-level keys holding subquery results, from the layout and from the first record that has each."""
+    names = {name for name, shape in (fields or {}).items() if isinstance(shape, list)}
+    for name in (records[0] if records else {}):
+        if name not in names and name != 'attributes':
+            sample = next((record.get(name) for record in records if _present(record.get(name))), None)
+            if _is_subquery(sample):
+                names.add(name)
+    return names
+
+
+def _arrange(paths, fields, nested=False):
+    """Orders dotted column paths for the frame, dropping the bare column of a relationship that has dotted ones.
+
+    Top-level names keep the data's order. Inside a relationship the layout's fields come first in select
+    order, followed by any others the data has, and a field the layout names but no record has is added,
+    so a relationship that is null on every record still becomes its dotted columns.
+    """
+    groups = {}
+    for path in paths:
+        head, _, rest = path.partition('.')
+        groups.setdefault(head, []).append(rest)
+    heads = list(groups)
+    if nested and fields:
+        known = {head.lower(): head for head in heads}
+        heads = [known.pop(name.lower(), name) for name, shape in fields.items() if not isinstance(shape, list)] + \
+                [head for head in heads if head.lower() in known]
+    arranged = []
+    for head in heads:
+        shape = _shape(fields, head)
+        dotted = [rest for rest in groups.get(head, []) if rest]
+        if dotted or isinstance(shape, dict):
+            arranged.extend(f"{head}.{path}" for path in _arrange(dotted, shape if isinstance(shape, dict) else None, True))
+        else:
+            arranged.append(head)
+    return arranged
+
+
+def flatten_records(records, start=0, child_starts=None, convert=None, fields=None):
+    """Flattens a list of record dicts with pandas.json_normalize into a DataFrame plus one linked DataFrame per subquery.
+
+    Parent relationships become dotted columns (Owner.Name) and the 'attributes' metadata is dropped.
+    fields is the query's layout from query_fields: it sets json_normalize's max_level (one level more
+    than its relationships, for compound address and location fields) and, when a relationship is null
+    on every record of the page, still gives its dotted columns, so every page of one query has the same
+    columns. convert(column, series) may type any column, dotted ones included, and returns the series
+    itself to leave it as it is, e.g. resty_schema.SObjectSchema.column.
+
+    Subquery results become child frames whose _parent_row column holds the parent's index label and
+    _parent_id the parent's Id, when selected. Only the child records inlined in the response are
+    included. Frames are indexed from start, and each child frame from its entry in child_starts, which
+    is advanced so that frames of consecutive pages line up.
+    """
+    child_starts = child_starts if child_starts is not None else {}
+    subqueries = _subquery_names(records, fields)
+    max_level = layout_depth(fields) + 1 if fields else None
+    if max_level is not None and not any(_nested_deeper(record, max_level) for record in records):
+        # The limit would change nothing, and pandas deep-copies every record when one is given
+        max_level = None
+    flat = pd.json_normalize(records, sep='.', max_level=max_level) if records else pd.DataFrame()
+    paths = [column for column in flat.columns
+             if 'attributes' not in column.split('.') and column.split('.')[0] not in subqueries]
+    arranged = _arrange(paths, fields)
+    frame = flat.reindex(columns=arranged)
+    for path in arranged:
+        if path not in flat.columns:
+            frame[path] = pd.Series([None] * len(records), dtype=object)
+        elif convert is not None:
+            column = frame[path]
+            converted = convert(path, column)
+            if converted is not column:
+                frame[path] = converted
+    frame.index = pd.RangeIndex(start, start + len(records))
+
+    children = {}
+    parent_ids = frame['Id'].tolist() if 'Id' in frame.columns else None
+    for path in (name for name in (records[0] if records else ()) if name in subqueries):
+        child_fields = _shape(fields, path)
+        rows, parent_rows = [], []
+        for position, record in enumerate(records):
+            value = record.get(path)
+            if _is_subquery(value):
+                child_records = list(value['records']) if value.get('records') is not None else []
+                rows.extend(child_records)
+                parent_rows.extend([start + position] * len(child_records))
+        child_start = child_starts.get(path, 0)
+        grandchild_starts = {key[len(path) + 1:]: count for key, count in child_starts.items() if key.startswith(f"{path}.")}
+        child_frame, grandchildren = flatten_records(rows, child_start, grandchild_starts, fields=child_fields[0] if isinstance(child_fields, list) else None)
+        child_starts[path] = child_start + len(rows)
+        for key, count in grandchild_starts.items():
+            child_starts[f"{path}.{key}"] = count
+        child_frame.insert(0, PARENT_ROW, parent_rows)
+        if parent_ids is not None:
+            child_frame.insert(1, PARENT_ID, [parent_ids[row - start] for row in parent_rows])
+        children[path] = child_frame
+        for key, grandchild_frame in grandchildren.items():
+            children[f"{path}.{key}"] = grandchild_frame
+    return frame, children
+
+
+def flatten_frame(df, child_starts=None, fields=None):
+    """Flattens a DataFrame whose cells still hold relationship dicts or subquery results; see flatten_records."""
+    start = df.index[0] if len(df) and isinstance(df.index, pd.RangeIndex) else 0
+    return flatten_records(df.to_dict('records'), start, child_starts, fields=fields)
+
+
+def concat_children(child_chunks):
+    """Concatenates per-page child frames, given as a list of {relationship: frame} dicts."""
+    pieces = {}
+    for children in child_chunks:
+        for path, frame in children.items():
+            pieces.setdefault(path, []).append(frame)
+    return {path: frames[0] if len(frames) == 1 else pd.concat(frames) for path, frames in pieces.items()}
+
+
+def explode_children(frame, children, relationship):
+    """Joins one child frame onto its parents: one row per child record, parents without children kept once."""
+    child = children[relationship].drop(columns=[PARENT_ID], errors='ignore')
+    child = child.rename(columns={column: f"{relationship}.{column}" for column in child.columns if column != PARENT_ROW})
+    exploded = frame.merge(child, how='left', left_index=True, right_on=PARENT_ROW)
+    return exploded.drop(columns=[PARENT_ROW]).reset_index(drop=True)
@@ -0,0 +1,312 @@
+import os
+import pickle
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from resty_bulk import bulk_ingest
+from resty_composite import collection_results_frame, run_collections
+from resty_engine import iter_spec_pages, schema_resolver
+from resty_flatten import query_fields
+from resty_query import PageFetchError
+from resty_sinks import TypedDataFrameSink, export_sink
+
+#------------------------------------------------------
+# Salesforce RESTY - background jobs for long fetches and DML
+# Author: Mohan Chinnappan
+# Copyleft software. Maintain the author name in your copies/modifications
+#------------------------------------------------------
+
+DEFAULT_JOB_WORKERS = 4
+# Finished jobs kept per owner (browser session) before the oldest are forgotten
+DEFAULT_KEEP_FINISHED = 20
+MAX_JOB_MESSAGES = 100
+ACTIVE_STATES = ('queued', 'running')
+
+
+class JobCancelled(Exception):
+    """Raised inside a job's work when its cancel was requested; the runner marks the job cancelled."""
+
+
+class Job:
+    """State of one background job, written by its worker thread and read by the UI.
+
+    Progress is pages and records done, with total records when known (totalSize, the COUNT() probe, the
+    chunk plan or the Bulk job). Work checks check_cancelled() between pages or chunks, so a cancel takes
+    effect once the request in flight returns. The result stays in memory until the owner collects it,
+    then release() drops it, or spill() moves it to a temporary file that load_result() reads back.
+    """
+
+    def __init__(self, kind, label, owner=None, details=None):
+        self.id = uuid.uuid4().hex[:8]
+        self.kind = kind
+        self.label = label
+        self.owner = owner
+        self.details = details or {}
+        self.state = 'queued'
+        self.pages = 0
+        self.records = 0
+        self.total = None
+        self.messages = []
+        self.result = None
+        self.result_path = None
+        self.error = None
+        self.tracer = None
+        self.collected = False
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.cancel_event = threading.Event()
+        self.future = None
+
+    @property
+    def active(self):
+        return self.state in ACTIVE_STATES
+
+    def progress(self, pages=None, records=None, total=None):
+        if pages is not None:
+            self.pages = pages
+        if records is not None:
+            self.records = records
+        if total is not None:
+            self.total = total
+
+    def fraction(self):
+        """Returns records done / total between 0 and 1, or None while the total is unknown."""
+        if self.state == 'done':
+            return 1.0
+        if not self.total:
+            return None
+        return min(self.records / self.total, 1.0)
+
+    def log(self, message):
+        self.messages.append((time.time(), message))
+        del self.messages[:-MAX_JOB_MESSAGES]
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled(f"Job {self.id} was cancelled")
+
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def spill(self, directory=None):
+        """Moves the result out of memory into a temporary pickle file, removed again by release()."""
+        if self.result is None:
+            return
+        fd, path = tempfile.mkstemp(prefix=f"resty-job-{self.id}-", suffix='.pkl', dir=directory)
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(self.result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.result, self.result_path = None, path
+
+    def load_result(self):
+        """Returns the result, read back from its spill file when it was spilled, or None once released."""
+        if self.result is not None or self.result_path is None:
+            return self.result
+        try:
+            with open(self.result_path, 'rb') as f:
+                return pickle.load(f)
+        except OSError:
+            return None
+
+    def release(self):
+        """Drops the result and deletes its spill file."""
+        self.result = None
+        if self.result_path is not None:
+            try:
+                os.remove(self.result_path)
+            except OSError:
+                pass
+            self.result_path = None
+
+
+class JobRunner:
+    """Runs jobs on a bounded thread pool shared by every session of the app, keeping their state for the UI.
+
+    submit(kind, label, fn, ...) calls fn(job, ...) on a worker; its return value becomes job.result. A
+    tracer passed to submit is active while the job runs, so its HTTP phases and steps are recorded there.
+    Jobs belong to the owner they were submitted with: get, cancel and remove given an owner only see that
+    owner's jobs, keep_finished applies per owner, and forget(owner) drops all of them when a session ends.
+    Results of forgotten and pruned jobs are released.
+    """
+
+    def __init__(self, max_workers=DEFAULT_JOB_WORKERS, keep_finished=DEFAULT_KEEP_FINISHED):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='resty-job')
+        self.keep_finished = keep_finished
+        self.lock = threading.Lock()
+        self.jobs_by_id = OrderedDict()
+
+    def submit(self, kind, label, fn, *args, owner=None, details=None, tracer=None, **kwargs):
+        job = Job(kind, label, owner, details)
+        job.tracer = tracer
+        with self.lock:
+            self.jobs_by_id[job.id] = job
+        job.future = self.executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancel_event.is_set():
+            job.state, job.finished = 'cancelled', time.time()
+            return
+        job.state, job.started = 'running', time.time()
+        try:
+            if job.tracer is not None:
+                with job.tracer.activate():
+                    job.result = fn(job, *args, **kwargs)
+            else:
+                job.result = fn(job, *args, **kwargs)
+            job.state = 'done'
+        except JobCancelled:
+            job.state = 'cancelled'
+            job.log("Cancelled")
+        except Exception as e:
+            job.state = 'failed'
+            job.error = str(e.error if isinstance(e, PageFetchError) else e)
+            job.log(f"Failed: {job.error}")
+        finally:
+            job.finished = time.time()
+            with self.lock:
+                forgotten = job.id not in self.jobs_by_id
+            if forgotten:
+                # Its owner went away while it ran; nobody will collect the result
+                job.release()
+            else:
+                self._prune(job.owner)
+
+    def cancel(self, job_id, owner=None):
+        """Asks a job to stop; a job still waiting for a worker is cancelled at once."""
+        job = self.get(job_id, owner)
+        if job is None or not job.active:
+            return False
+        job.cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            job.state, job.finished = 'cancelled', time.time()
+        return True
+
+    def get(self, job_id, owner=None):
+        """Returns the job, or None when it is unknown or belongs to another owner than the given one."""
+        with self.lock:
+            job = self.jobs_by_id.get(job_id)
+        return job if job is not None and (owner is None or job.owner == owner) else None
+
+    def jobs(self, owner=None):
+        """Returns the jobs of owner (every job when None), newest first."""
+        with self.lock:
+            jobs = list(self.jobs_by_id.values())
+        return [job for job in reversed(jobs) if owner is None or job.owner == owner]
+
+    def remove(self, job_id, owner=None):
+        """Forgets a finished job and releases its result."""
+        with self.lock:
+            job = self.jobs_by_id.get(job_id)
+            if job is None or job.active or (owner is not None and job.owner != owner):
+                return False
+            del self.jobs_by_id[job_id]
+        job.release()
+        return True
+
+    def forget(self, owner):
+        """Cancels and forgets every job of owner, releasing their results; running ones release theirs when they stop."""
+        with self.lock:
+            jobs = [job for job in self.jobs_by_id.values() if job.owner == owner]
+            for job in jobs:
+                del self.jobs_by_id[job.id]
+        for job in jobs:
+            job.cancel_event.set()
+            if not job.active or (job.future is not None and job.future.cancel()):
+                job.release()
+
+    def _prune(self, owner):
+        with self.lock:
+            finished = [job for job in self.jobs_by_id.values() if not job.active and job.owner == owner]
+            pruned = finished[:max(0, len(finished) - self.keep_finished)]
+            for job in pruned:
+                del self.jobs_by_id[job.id]
+        for job in pruned:
+            job.release()
+
+    def shutdown(self):
+        for job in self.jobs():
+            job.cancel_event.set()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def job_reporter(job):
+    """Returns a progress message callback that logs on the job and stops it when cancelled."""
+    def report(message):
+        job.check_cancelled()
+        job.log(message)
+    return report
+
+
+def fetch_job(job, client, headers, instance_url, api_version, endpoint_path, spec, workers, schema_cache=None, export_format=None, export_path=None):
+    """Streams a GET or query into a typed DataFrame, and an export file when export_path is given.
+
+    spec holds the settings read by resty_engine.iter_spec_pages (query, all_pages, engine, bulk_threshold,
+    chunk_size, typed). Returns {'df', 'children', 'last_response', 'records', 'export_path'}.
+    """
+    report = job_reporter(job)
+    resolve_schema = None
+    if spec.get('query') and spec.get('typed', True) and schema_cache is not None:
+        resolve_schema = schema_resolver(client, headers, instance_url, api_version, spec['query'], schema_cache, report)
+    fields = query_fields(spec.get('query'))
+    frame_sink = TypedDataFrameSink(resolve_schema=resolve_schema, fields=fields)
+    sinks = [frame_sink]
+    if export_path:
+        sinks.append(export_sink(export_format, export_path, resolve_schema=resolve_schema, fields=fields))
+    last_response = None
+    pages = iter_spec_pages(client, headers, instance_url, api_version, endpoint_path, spec, workers, report, lambda total: job.progress(total=total))
+    try:
+        for records, last_response in pages:
+            job.check_cancelled()
+            for sink in sinks:
+                sink.write(records)
+            if job.total is None:
+                total = last_response.get('totalSize', last_response.get('numberRecordsProcessed'))
+                job.progress(total=total if isinstance(total, int) else None)
+            job.progress(pages=job.pages + 1, records=frame_sink.count)
+    finally:
+        # Closing the stream stops parallel page and chunk workers when the job ends early
+        if hasattr(pages, 'close'):
+            pages.close()
+        for sink in sinks:
+            sink.close()
+    job.log(f"{frame_sink.count:,} records in {job.pages} pages")
+    return {'df': frame_sink.frame(), 'children': frame_sink.children(), 'last_response': last_response, 'records': frame_sink.count,
+            'export_path': export_path}
+
+
+def collections_job(job, client, headers, instance_url, api_version, operation, sobject, records, all_or_none=False, external_id_field=None, workers=None):
+    """Runs sObject Collections DML as a job; returns the per-record results frame."""
+    job.progress(total=len(records))
+
+    def on_chunk(done):
+        job.progress(pages=job.pages + 1, records=done)
+        job.check_cancelled()
+
+    kwargs = {'workers': workers} if workers else {}
+    results = run_collections(client, headers, instance_url, api_version, operation, sobject, records, all_or_none, external_id_field,
+                              on_chunk=on_chunk, **kwargs)
+    return {'results': collection_results_frame(records, results)}
+
+
+def ingest_job(job, client, headers, instance_url, api_version, sobject, operation, df, external_id_field=None, max_bytes=None, workers=None):
+    """Runs a Bulk API 2.0 ingest as a job; returns the job infos and the successful, failed and unprocessed frames.
+
+    A cancel stops polling and downloading; ingest jobs already uploaded keep running in the org.
+    """
+    job.progress(total=len(df))
+
+    def on_poll(job_info):
+        job.check_cancelled()
+        job.log(f"Bulk job {job_info.get('id')}: {job_info.get('state')}, {job_info.get('numberRecordsProcessed', 0)} records processed")
+
+    kwargs = {key: value for key, value in (('max_bytes', max_bytes), ('workers', workers)) if value}
+    job_infos, frames = bulk_ingest(client, headers, instance_url, api_version, sobject, operation, df, external_id_field, on_poll=on_poll, **kwargs)
+    job.progress(pages=len(job_infos), records=sum(int(info.get('numberRecordsProcessed') or 0) for info in job_infos))
+    return {'job_infos': job_infos, 'frames': frames}
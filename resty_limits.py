@@ -0,0 +1,139 @@
+import re
+import threading
+import time
+from urllib.parse import urljoin
+
+import requests
+
+from resty_client import raise_for_status
+
+#------------------------------------------------------
+# Salesforce RESTY - API budget tracking and throttling
+# Author: Mohan Chinnappan
+# Copyleft software. Maintain the author name in your copies/modifications
+#------------------------------------------------------
+
+DEFAULT_RATE = 20.0
+DEFAULT_BURST = 20
+DEFAULT_RESERVE_PERCENT = 10.0
+# Below this many requests of headroom above the reserve the rate is scaled down
+DEFAULT_SLOWDOWN_WINDOW = 1000
+MIN_RATE = 0.5
+
+LIMIT_INFO_PATTERN = re.compile(r'api-usage=(\d+)/(\d+)')
+
+
+class ApiBudgetExhausted(requests.RequestException):
+    """Raised instead of sending a request that would eat into the reserved part of the daily API quota."""
+
+
+def parse_limit_info(header):
+    """Parses 'api-usage=used/max' from a Sforce-Limit-Info header, returning (used, max) or None."""
+    match = LIMIT_INFO_PATTERN.search(header or '')
+    if not match:
+        return None
+    return int(match.group(1)), int(match.group(2))
+
+
+def fetch_api_limits(client, headers, instance_url, api_version):
+    """Returns (used, max) daily API requests from the /limits resource, never from a cached response."""
+    url = urljoin(instance_url, f"/services/data/v{api_version}/limits")
+    headers = dict(headers or {}, **{'Cache-Control': 'no-cache'})
+    daily = raise_for_status(client.get(url, headers=headers)).json().get('DailyApiRequests', {})
+    maximum = daily.get('Max', 0)
+    return maximum - daily.get('Remaining', maximum), maximum
+
+
+class RateLimiter:
+    """Token bucket that also tracks the org's daily API usage and never spends a configured reserve.
+
+    Usage comes from the Sforce-Limit-Info header of every response (or /limits). As the remaining
+    headroom above the reserve shrinks below slowdown_window, the refill rate is scaled down so
+    parallel and bulk modes slow before they reach the reserve; at the reserve requests are refused.
+    enabled only switches the token bucket off; the reserve is always enforced.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, reserve_percent=DEFAULT_RESERVE_PERCENT,
+                 slowdown_window=DEFAULT_SLOWDOWN_WINDOW, enabled=True):
+        self.lock = threading.RLock()
+        self.used = None
+        self.maximum = None
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.configure(rate, burst, reserve_percent, slowdown_window, enabled)
+
+    def configure(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, reserve_percent=DEFAULT_RESERVE_PERCENT,
+                  slowdown_window=DEFAULT_SLOWDOWN_WINDOW, enabled=True):
+        """Updates the throttling settings without losing the observed usage."""
+        with self.lock:
+            self.rate = max(float(rate), MIN_RATE)
+            self.burst = max(int(burst), 1)
+            self.reserve_percent = reserve_percent
+            self.slowdown_window = max(int(slowdown_window), 1)
+            self.enabled = enabled
+            self.tokens = min(self.tokens, self.burst)
+
+    def observe(self, used, maximum):
+        """Records the latest daily API usage."""
+        with self.lock:
+            self.used, self.maximum = used, maximum
+
+    def observe_response(self, response):
+        """Records usage from a response's Sforce-Limit-Info header, if present."""
+        usage = parse_limit_info(response.headers.get('Sforce-Limit-Info'))
+        if usage is not None:
+            self.observe(*usage)
+
+    @property
+    def reserve(self):
+        return int(self.maximum * self.reserve_percent / 100) if self.maximum else 0
+
+    @property
+    def remaining(self):
+        """Daily API requests left, or None until usage has been observed."""
+        if self.maximum is None:
+            return None
+        return self.maximum - self.used
+
+    @property
+    def available(self):
+        """Daily API requests that may still be spent before touching the reserve, or None if unknown."""
+        if self.remaining is None:
+            return None
+        return max(self.remaining - self.reserve, 0)
+
+    def current_rate(self):
+        """Refill rate after scaling down for a shrinking budget."""
+        available = self.available
+        if available is None or available >= self.slowdown_window:
+            return self.rate
+        return max(self.rate * available / self.slowdown_window, MIN_RATE)
+
+    def take(self):
+        """Takes one token and returns how many seconds the caller must wait before sending.
+
+        Raises ApiBudgetExhausted when the remaining daily budget has reached the reserve.
+        """
+        with self.lock:
+            if self.available == 0:
+                raise ApiBudgetExhausted(
+                    f"Daily API budget reserve reached: {self.remaining} of {self.maximum} requests left, "
+                    f"{self.reserve} reserved for other integrations"
+                )
+            # Count the request against the known usage until the response reports the real figure
+            if self.used is not None:
+                self.used += 1
+            if not self.enabled:
+                return 0.0
+            rate = self.current_rate()
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / rate
+
+    def acquire(self):
+        """Blocks until a request may be sent."""
+        delay = self.take()
+        if delay > 0:
+            time.sleep(delay)
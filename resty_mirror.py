@@ -0,0 +1,365 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urljoin
+
+import pandas as pd
+
+from resty_bulk import add_where_condition, sobject_from_soql, top_level_keyword
+from resty_client import raise_for_status
+from resty_flatten import flatten_records
+from resty_sinks import RecordSink
+
+#------------------------------------------------------
+# Salesforce RESTY - local SQLite/DuckDB mirror with incremental sync
+# Author: Mohan Chinnappan
+# Copyleft software. Maintain the author name in your copies/modifications
+#------------------------------------------------------
+
+try:
+    import duckdb
+    MIRROR_ENGINES = ('SQLite', 'DuckDB')
+except ImportError:
+    duckdb = None
+    MIRROR_ENGINES = ('SQLite',)
+
+DEFAULT_MIRROR_PATH = os.path.join(os.path.expanduser('~'), '.resty', 'mirror.db')
+SYNC_TABLE = '_resty_sync'
+# A full load fills this table and replaces the sObject's own only once every page has arrived
+STAGING_PREFIX = '_resty_stage_'
+WATERMARK_FIELD = 'SystemModstamp'
+# Re-read this much before the watermark, for transactions that committed after a later SystemModstamp was seen
+OVERLAP = timedelta(minutes=1)
+# getDeleted only reaches back this far (15 days by default, 30 at most) and needs a window of a minute or more
+DELETED_RETENTION = timedelta(days=15)
+DELETED_MIN_WINDOW = timedelta(minutes=1)
+SQL_TYPES = {bool: 'BOOLEAN', int: 'DOUBLE', float: 'DOUBLE'}
+DELETE_BATCH = 500
+
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def parse_datetime(value):
+    """Parses a Salesforce datetime (REST +0000 or Bulk Z suffix) into an aware UTC datetime."""
+    timestamp = pd.Timestamp(value)
+    return (timestamp.tz_convert('UTC') if timestamp.tzinfo else timestamp.tz_localize('UTC')).to_pydatetime()
+
+
+def soql_datetime(value):
+    """Formats a datetime as a SOQL datetime literal, e.g. 2024-05-01T12:00:00Z."""
+    return value.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _selects(select_list, field):
+    return re.search(r'(?<![.\w])' + field + r'(?![.\w])', select_list, re.IGNORECASE) is not None
+
+
+def staging_table(sobject):
+    return STAGING_PREFIX + sobject
+
+
+def mirror_query(soql_query):
+    """Adds Id and SystemModstamp to the SELECT list when missing, since the mirror keys and watermarks on them.
+
+    Queries with LIMIT or OFFSET are refused: their deltas could not tell a changed record from one outside the limit.
+    """
+    from_index = top_level_keyword(soql_query, 'FROM')
+    match = re.match(r'\s*SELECT\s+', soql_query, re.IGNORECASE)
+    if from_index < 0 or match is None:
+        raise ValueError("Mirroring needs a SELECT ... FROM query")
+    if any(top_level_keyword(soql_query, keyword) >= 0 for keyword in ('LIMIT', 'OFFSET')):
+        raise ValueError("Mirroring needs every matching record; remove LIMIT and OFFSET from the query")
+    select_list = soql_query[match.end():from_index]
+    missing = [field for field in ('Id', WATERMARK_FIELD) if not _selects(select_list, field)]
+    if not missing:
+        return soql_query
+    return f"{soql_query[:match.end()]}{', '.join(missing)}, {soql_query[match.end():]}"
+
+
+def delta_query(soql_query, since):
+    """Restricts a query to records with SystemModstamp after since, oldest change first.
+
+    The query's own WHERE is kept; its ORDER BY, LIMIT and OFFSET are dropped, since a delta has to read every change.
+    """
+    ends = [index for index in (top_level_keyword(soql_query, keyword) for keyword in ('ORDER BY', 'LIMIT', 'OFFSET')) if index >= 0]
+    soql_query = soql_query[:min(ends)].rstrip() if ends else soql_query
+    return f"{add_where_condition(soql_query, f'{WATERMARK_FIELD} > {soql_datetime(since)}')} ORDER BY {WATERMARK_FIELD}"
+
+
+def fetch_deleted(client, headers, instance_url, api_version, sobject, start, end):
+    """Calls getDeleted for start..end and returns (deleted Ids, latestDateCovered, earliestDateAvailable)."""
+    url = urljoin(instance_url, f"/services/data/v{api_version}/sobjects/{sobject}/deleted/")
+    params = {'start': start.strftime('%Y-%m-%dT%H:%M:%S+00:00'), 'end': end.strftime('%Y-%m-%dT%H:%M:%S+00:00')}
+    body = raise_for_status(client.get(url, headers=headers, params=params)).json()
+    ids = [entry['id'] for entry in body.get('deletedRecords', [])]
+    latest = body.get('latestDateCovered')
+    earliest = body.get('earliestDateAvailable')
+    return ids, parse_datetime(latest) if latest else end, parse_datetime(earliest) if earliest else None
+
+
+def _sql_value(value):
+    if value is None or (isinstance(value, float) and value != value) or value == '':
+        # Bulk API CSV results carry nulls as empty strings
+        return None
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+class ObjectMirror:
+    """Embedded SQLite (or DuckDB) database with one table per mirrored sObject, upserted by Id.
+
+    Relationship fields become dotted columns ("Owner.Name") and subquery results are kept as JSON text.
+    Columns are added as new fields show up. The _resty_sync table records, per sObject, the query it
+    mirrors, the SystemModstamp watermark and how far getDeleted has been applied. transaction() groups
+    statements that must land together, such as swapping in a fully loaded table with its sync state.
+    """
+
+    def __init__(self, path=DEFAULT_MIRROR_PATH, engine='SQLite'):
+        if engine not in MIRROR_ENGINES:
+            raise ValueError(f"Unsupported mirror engine: {engine}")
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.engine = engine
+        self.lock = threading.RLock()
+        self.in_transaction = False
+        if engine == 'DuckDB':
+            self.connection = duckdb.connect(path)
+        else:
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+        self._execute(f"CREATE TABLE IF NOT EXISTS {SYNC_TABLE} (sobject VARCHAR PRIMARY KEY, soql VARCHAR, watermark VARCHAR, "
+                      "deleted_through VARCHAR, synced_at VARCHAR, mode VARCHAR, upserted BIGINT, deleted BIGINT)")
+
+    def _execute(self, sql, params=(), many=False):
+        with self.lock:
+            cursor = self.connection.executemany(sql, params) if many else self.connection.execute(sql, params)
+            rows = cursor.fetchall() if cursor.description else []
+            if self.engine == 'SQLite' and not self.in_transaction:
+                self.connection.commit()
+            return rows
+
+    @contextmanager
+    def transaction(self):
+        """Runs the statements made inside as one transaction, rolled back if any of them fails."""
+        with self.lock:
+            self.connection.execute('BEGIN TRANSACTION')
+            self.in_transaction = True
+            try:
+                yield
+            except BaseException:
+                self.connection.rollback()
+                raise
+            else:
+                self.connection.commit()
+            finally:
+                self.in_transaction = False
+
+    def columns(self, table):
+        """Returns the column names of table, or an empty list when it does not exist."""
+        if self.engine == 'DuckDB':
+            rows = self._execute("SELECT column_name FROM information_schema.columns WHERE table_name = ? ORDER BY ordinal_position", (table,))
+            return [row[0] for row in rows]
+        return [row[1] for row in self._execute(f"PRAGMA table_info({quote(table)})")]
+
+    def _ensure_columns(self, table, frame):
+        existing = {column.lower() for column in self.columns(table)}
+        types = {}
+        for column in frame.columns:
+            sample = next((value for value in frame[column] if _sql_value(value) is not None), None)
+            types[column] = SQL_TYPES.get(type(sample), 'VARCHAR')
+        if not existing:
+            definitions = ', '.join(f"{quote(column)} {types[column]}" for column in frame.columns if column != 'Id')
+            self._execute(f"CREATE TABLE {quote(table)} (\"Id\" VARCHAR PRIMARY KEY{', ' if definitions else ''}{definitions})")
+            return
+        for column in frame.columns:
+            if column.lower() not in existing:
+                self._execute(f"ALTER TABLE {quote(table)} ADD COLUMN {quote(column)} {types[column]}")
+
+    def upsert(self, sobject, records, fields=None):
+        """Inserts records into the sObject's table, replacing the stored copy of any Id already there.
+
+        fields is the query's layout (resty_flatten.query_fields), so a relationship that is null on
+        every record of the page becomes its dotted columns rather than a column of its own.
+        """
+        if not records:
+            return 0
+        frame, children = flatten_records(records, fields=fields)
+        if 'Id' not in frame.columns:
+            raise ValueError("Mirrored records need an Id field")
+        for path in (path for path in children if '.' not in path):
+            # Keep each subquery's records as JSON alongside its parent
+            frame[path] = [json.dumps(value['records']) if isinstance(value, dict) else None
+                           for value in (record.get(path) for record in records)]
+        self._ensure_columns(sobject, frame)
+        columns = list(frame.columns)
+        names = ', '.join(quote(column) for column in columns)
+        updates = ', '.join(f"{quote(column)} = excluded.{quote(column)}" for column in columns if column != 'Id')
+        conflict = f"ON CONFLICT (\"Id\") DO {'UPDATE SET ' + updates if updates else 'NOTHING'}"
+        rows = [tuple(_sql_value(value) for value in row) for row in zip(*(frame[column].tolist() for column in columns))]
+        if self.engine == 'DuckDB':
+            # DuckDB's executemany runs row by row; a registered frame upserts the page in one statement
+            page = pd.DataFrame(rows, columns=columns, dtype=object)
+            with self.lock:
+                self.connection.register('_resty_page', page)
+                try:
+                    self.connection.execute(f"INSERT INTO {quote(sobject)} ({names}) SELECT {names} FROM _resty_page {conflict}")
+                finally:
+                    self.connection.unregister('_resty_page')
+        else:
+            self._execute(f"INSERT INTO {quote(sobject)} ({names}) VALUES ({', '.join('?' * len(columns))}) {conflict}", rows, many=True)
+        return len(rows)
+
+    def delete(self, sobject, ids):
+        """Deletes the given Ids from the sObject's table; returns how many were asked for."""
+        if not ids or not self.columns(sobject):
+            return 0
+        for start in range(0, len(ids), DELETE_BATCH):
+            batch = ids[start:start + DELETE_BATCH]
+            self._execute(f"DELETE FROM {quote(sobject)} WHERE \"Id\" IN ({', '.join('?' * len(batch))})", batch)
+        return len(ids)
+
+    def state(self, sobject):
+        """Returns the sync state of sobject as a dict, or None before its first sync."""
+        rows = self._execute(f"SELECT soql, watermark, deleted_through, synced_at, mode, upserted, deleted FROM {SYNC_TABLE} WHERE sobject = ?", (sobject,))
+        if not rows:
+            return None
+        return dict(zip(('soql', 'watermark', 'deleted_through', 'synced_at', 'mode', 'upserted', 'deleted'), rows[0]))
+
+    def save_state(self, sobject, state):
+        self._execute(f"DELETE FROM {SYNC_TABLE} WHERE sobject = ?", (sobject,))
+        self._execute(f"INSERT INTO {SYNC_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                      (sobject, state['soql'], state['watermark'], state['deleted_through'], state['synced_at'], state['mode'], state['upserted'], state['deleted']))
+
+    def reset(self, sobject):
+        """Drops the sObject's table and sync state so the next sync is a full load."""
+        self._execute(f"DROP TABLE IF EXISTS {quote(sobject)}")
+        self.drop_staging(sobject)
+        self._execute(f"DELETE FROM {SYNC_TABLE} WHERE sobject = ?", (sobject,))
+
+    def drop_staging(self, sobject):
+        """Drops what a failed full load left in the sObject's staging table."""
+        self._execute(f"DROP TABLE IF EXISTS {quote(staging_table(sobject))}")
+
+    def replace(self, sobject, table, state):
+        """Makes table, filled by a full load, the sObject's table and saves its sync state, in one transaction.
+
+        A full load that found no records leaves no table behind; the sObject's table is then just dropped.
+        """
+        loaded = table != sobject and bool(self.columns(table))
+        with self.transaction():
+            if table != sobject:
+                self._execute(f"DROP TABLE IF EXISTS {quote(sobject)}")
+            if loaded:
+                self._execute(f"ALTER TABLE {quote(table)} RENAME TO {quote(sobject)}")
+            self.save_state(sobject, state)
+
+    def row_count(self, sobject):
+        return self._execute(f"SELECT COUNT(*) FROM {quote(sobject)}")[0][0] if self.columns(sobject) else 0
+
+    def sync_status(self):
+        """Returns one row per mirrored sObject with its state and row count."""
+        rows = self._execute(f"SELECT sobject, watermark, deleted_through, synced_at, mode, upserted, deleted FROM {SYNC_TABLE} ORDER BY sobject")
+        frame = pd.DataFrame(rows, columns=['sobject', 'watermark', 'deleted_through', 'synced_at', 'mode', 'upserted', 'deleted'])
+        frame['rows'] = [self.row_count(sobject) for sobject in frame['sobject']]
+        return frame
+
+    def query(self, sql):
+        """Runs SQL against the mirror and returns the result as a DataFrame."""
+        with self.lock:
+            if self.engine == 'DuckDB':
+                return self.connection.execute(sql).df()
+            return pd.read_sql_query(sql, self.connection)
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+class MirrorSink(RecordSink):
+    """Upserts each page into an ObjectMirror and tracks the highest SystemModstamp seen.
+
+    A staged sink (a full load) writes to the sObject's staging table, which finish_sync swaps in.
+    """
+
+    span_name = 'mirror upsert'
+
+    def __init__(self, mirror, sobject, fields=None, staged=False):
+        super().__init__()
+        self.mirror = mirror
+        self.sobject = sobject
+        self.fields = fields
+        self.table = staging_table(sobject) if staged else sobject
+        self.watermark = None
+
+    def write(self, records):
+        super().write(records)
+        if not records:
+            return
+        self.mirror.upsert(self.table, records, self.fields)
+        stamps = [record.get(WATERMARK_FIELD) for record in records if record.get(WATERMARK_FIELD)]
+        if stamps:
+            # One page comes from one API, so its timestamps share a format and compare as strings
+            latest = parse_datetime(max(stamps))
+            if self.watermark is None or latest > self.watermark:
+                self.watermark = latest
+
+
+def plan_sync(mirror, soql_query, full_reload=False):
+    """Works out the next sync of the query's sObject: returns (sobject, SOQL to run, previous state or None).
+
+    The first sync, a changed query or full_reload loads everything into a fresh staging table (write it
+    with a staged MirrorSink); the mirrored table is only replaced by finish_sync, so a failed load keeps
+    it. Otherwise only records modified since the watermark (less OVERLAP) are queried.
+    """
+    sobject = sobject_from_soql(soql_query)
+    if sobject is None:
+        raise ValueError("Could not find the sObject in the query's FROM clause")
+    soql_query = mirror_query(soql_query.strip())
+    previous = mirror.state(sobject)
+    if full_reload or previous is None or previous['soql'] != soql_query or not previous['watermark']:
+        mirror.drop_staging(sobject)
+        return sobject, soql_query, None
+    return sobject, delta_query(soql_query, parse_datetime(previous['watermark']) - OVERLAP), previous
+
+
+def finish_sync(client, headers, instance_url, api_version, mirror, sobject, soql_query, sink, started_at, previous):
+    """Swaps in a full load, or applies getDeleted since the previous sync, and saves the new sync state; returns it with any warning.
+
+    Deletions older than getDeleted's retention cannot be fetched; the warning then suggests a full reload.
+    """
+    soql_query = mirror_query(soql_query.strip())
+    watermark = sink.watermark or (parse_datetime(previous['watermark']) if previous else None)
+    state = {
+        'soql': soql_query,
+        'watermark': soql_datetime(watermark) if watermark else None,
+        'deleted_through': soql_datetime(started_at),
+        'synced_at': soql_datetime(started_at),
+        'mode': 'delta' if previous else 'full',
+        'upserted': sink.count,
+        'deleted': 0
+    }
+    if previous is None:
+        mirror.replace(sobject, sink.table, state)
+        return state, None
+    warning = None
+    start = parse_datetime(previous['deleted_through'] or previous['synced_at']) - OVERLAP
+    end = datetime.now(timezone.utc)
+    if end - start < DELETED_MIN_WINDOW:
+        start = end - DELETED_MIN_WINDOW
+    if end - start > DELETED_RETENTION:
+        start = end - DELETED_RETENTION
+        warning = f"The last sync is older than getDeleted's {DELETED_RETENTION.days}-day window; run a full reload to drop records deleted before it."
+    ids, latest, earliest = fetch_deleted(client, headers, instance_url, api_version, sobject, start, end)
+    if earliest is not None and earliest > start:
+        warning = f"getDeleted only covers deletions since {soql_datetime(earliest)}; run a full reload to drop records deleted before that."
+    state['deleted'] = mirror.delete(sobject, ids)
+    state['deleted_through'] = soql_datetime(latest)
+    mirror.save_state(sobject, state)
+    return state, warning
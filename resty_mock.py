@@ -0,0 +1,620 @@
+import argparse
+import csv
+import io
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+#------------------------------------------------------
+# Salesforce RESTY - local mock Salesforce REST server for benchmarks and offline runs
+# Author: Mohan Chinnappan
+# Copyleft software. Maintain the author name in your copies/modifications
+#------------------------------------------------------
+
+DEFAULT_PORT = 8765
+DEFAULT_API_VERSION = '62.0'
+DEFAULT_RECORDS = 10000
+DEFAULT_PAGE_SIZE = 2000
+DEFAULT_RECORD_WIDTH = 10
+DEFAULT_BULK_CHUNK_SIZE = 50000
+DAILY_API_LIMIT = 15000000
+INDUSTRIES = ('Agriculture', 'Banking', 'Energy', 'Healthcare', 'Retail', 'Technology')
+BASE_FIELDS = (
+    ('Id', 'id'), ('Name', 'string'), ('Industry', 'picklist'), ('AnnualRevenue', 'currency'), ('NumberOfEmployees', 'int'),
+    ('IsActive__c', 'boolean'), ('CreatedDate', 'datetime'), ('SystemModstamp', 'datetime'), ('OwnerId', 'reference')
+)
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+KEY_PREFIXES = {'Account': '001', 'Contact': '003', 'Opportunity': '006', 'Lead': '00Q', 'Case': '500'}
+
+
+class MockError(Exception):
+    """A Salesforce style error response: raised inside a handler, sent as [{errorCode, message}]."""
+
+    def __init__(self, status, error_code, message):
+        super().__init__(message)
+        self.status = status
+        self.error_code = error_code
+
+
+def sf_datetime(moment):
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.000+0000')
+
+
+def parse_sf_datetime(text):
+    return datetime.fromisoformat(text.replace('Z', '+00:00').replace('.000+0000', '+00:00').replace('+0000', '+00:00'))
+
+
+def select_fields(soql_query):
+    """Returns the top-level fields of a SOQL SELECT list; subqueries and functions other than COUNT() are skipped."""
+    match = re.match(r'\s*SELECT\s+(.*?)\s+FROM\s', soql_query, re.IGNORECASE | re.DOTALL)
+    if not match:
+        raise MockError(400, 'MALFORMED_QUERY', f"unexpected token in: {soql_query}")
+    fields, depth, current = [], 0, ''
+    for char in match.group(1):
+        depth += (char == '(') - (char == ')')
+        if char == ',' and depth == 0:
+            fields.append(current.strip())
+            current = ''
+        else:
+            current += char
+    fields.append(current.strip())
+    return [field for field in fields if field and not field.startswith('(')]
+
+
+class MockOrg:
+    """In-memory org behind the mock server: a generated record set per sObject plus records created through the API.
+
+    Generated records are built on demand from their index, so a million-row org costs no memory until
+    pages are served. Every knob of a benchmark run lives here: rows per sObject, REST page size, custom
+    text fields per record, per-request latency with jitter, the share of requests answered with a 503,
+    the share of DML records rejected, and how many polls a Bulk job stays InProgress.
+    """
+
+    def __init__(self, records=DEFAULT_RECORDS, page_size=DEFAULT_PAGE_SIZE, record_width=DEFAULT_RECORD_WIDTH, latency=0.0, jitter=0.0,
+                 error_rate=0.0, record_error_rate=0.0, job_polls=1, bulk_chunk_size=DEFAULT_BULK_CHUNK_SIZE, seed=0):
+        self.records = records
+        self.page_size = page_size
+        self.record_width = record_width
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.record_error_rate = record_error_rate
+        self.job_polls = job_polls
+        self.bulk_chunk_size = bulk_chunk_size
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.requests_by_path = {}
+        self.cursors = {}
+        self.jobs = {}
+        self.created = {}
+        self.updated = {}
+        self.deleted = {}
+        self.next_id = 0
+
+    # --- records -------------------------------------------------------------------------------------
+
+    def field_names(self):
+        return [name for name, _ in BASE_FIELDS] + [f"Text_{n}__c" for n in range(1, self.record_width + 1)]
+
+    def describe(self, sobject):
+        fields = [{'name': name, 'type': kind, 'nillable': name != 'Id', 'label': name,
+                   'picklistValues': [{'value': value, 'active': True} for value in INDUSTRIES] if kind == 'picklist' else []}
+                  for name, kind in BASE_FIELDS]
+        fields += [{'name': f"Text_{n}__c", 'type': 'string', 'nillable': True, 'label': f"Text {n}", 'picklistValues': []}
+                   for n in range(1, self.record_width + 1)]
+        return {'name': sobject, 'label': sobject, 'keyPrefix': KEY_PREFIXES.get(sobject, 'a00'), 'queryable': True, 'fields': fields}
+
+    @staticmethod
+    def record_id(sobject, index):
+        # Zero padded so string order matches index order, as Id-range chunking expects
+        return f"{KEY_PREFIXES.get(sobject, 'a00')}{index:015d}"
+
+    def generate(self, sobject, index):
+        modstamp = EPOCH + timedelta(minutes=index)
+        record = {
+            'attributes': {'type': sobject, 'url': f"/services/data/v{DEFAULT_API_VERSION}/sobjects/{sobject}/{self.record_id(sobject, index)}"},
+            'Id': self.record_id(sobject, index),
+            'Name': f"{sobject} {index}",
+            'Industry': INDUSTRIES[index % len(INDUSTRIES)],
+            'AnnualRevenue': index * 1000.5,
+            'NumberOfEmployees': index % 5000,
+            'IsActive__c': index % 3 != 0,
+            'CreatedDate': sf_datetime(modstamp),
+            'SystemModstamp': sf_datetime(modstamp),
+            'OwnerId': f"005{index % 50:015d}",
+            'Owner': {'attributes': {'type': 'User'}, 'Name': f"Owner {index % 50}"}
+        }
+        for n in range(1, self.record_width + 1):
+            record[f"Text_{n}__c"] = f"value {n} of record {index}"
+        return record
+
+    def record(self, sobject, record_id):
+        """Returns the current version of a record, or None if it never existed or was deleted."""
+        if record_id in self.deleted:
+            return None
+        if record_id in self.created:
+            record = self.created[record_id]
+        else:
+            prefix, digits = record_id[:3], record_id[3:]
+            if prefix != KEY_PREFIXES.get(sobject, 'a00') or not digits.isdigit() or int(digits) >= self.records:
+                return None
+            record = self.generate(sobject, int(digits))
+        if record_id in self.updated:
+            record = dict(record, **self.updated[record_id])
+        return record
+
+    def all_ids(self, sobject):
+        ids = [self.record_id(sobject, index) for index in range(self.records)]
+        ids += sorted(record_id for record_id, record in self.created.items() if record['attributes']['type'] == sobject)
+        return [record_id for record_id in ids if record_id not in self.deleted]
+
+    def sobject_of(self, record_id):
+        if record_id in self.created:
+            return self.created[record_id]['attributes']['type']
+        return next((sobject for sobject, prefix in KEY_PREFIXES.items() if record_id.startswith(prefix)), 'Account')
+
+    def _new_id(self, sobject):
+        with self.lock:
+            self.next_id += 1
+            # Created Ids sort after every generated one
+            return f"{KEY_PREFIXES.get(sobject, 'a00')}9{self.next_id:014d}"
+
+    def _rejected(self):
+        return self.record_error_rate and self.random.random() < self.record_error_rate
+
+    def create(self, sobject, fields):
+        if self._rejected():
+            return {'id': None, 'success': False, 'errors': [{'statusCode': 'FIELD_CUSTOM_VALIDATION_EXCEPTION', 'message': 'Rejected by the mock', 'fields': []}]}
+        record_id = self._new_id(sobject)
+        now = sf_datetime(datetime.now(timezone.utc))
+        self.created[record_id] = dict({key: value for key, value in fields.items() if key != 'attributes'},
+                                       attributes={'type': sobject}, Id=record_id, CreatedDate=now, SystemModstamp=now)
+        return {'id': record_id, 'success': True, 'errors': []}
+
+    def update(self, sobject, record_id, fields):
+        if self.record(sobject, record_id) is None:
+            return {'id': record_id, 'success': False, 'errors': [{'statusCode': 'ENTITY_IS_DELETED', 'message': 'entity is deleted', 'fields': []}]}
+        if self._rejected():
+            return {'id': record_id, 'success': False, 'errors': [{'statusCode': 'FIELD_CUSTOM_VALIDATION_EXCEPTION', 'message': 'Rejected by the mock', 'fields': []}]}
+        changes = {key: value for key, value in fields.items() if key not in ('attributes', 'Id')}
+        self.updated[record_id] = dict(self.updated.get(record_id, {}), SystemModstamp=sf_datetime(datetime.now(timezone.utc)), **changes)
+        return {'id': record_id, 'success': True, 'errors': []}
+
+    def delete(self, sobject, record_id):
+        if self.record(sobject, record_id) is None:
+            return {'id': record_id, 'success': False, 'errors': [{'statusCode': 'ENTITY_IS_DELETED', 'message': 'entity is deleted', 'fields': []}]}
+        self.deleted[record_id] = sf_datetime(datetime.now(timezone.utc))
+        return {'id': record_id, 'success': True, 'errors': []}
+
+    # --- queries -------------------------------------------------------------------------------------
+
+    def run_query(self, soql_query):
+        """Returns (sObject, selected fields, matching Ids, COUNT() query?) for the subset of SOQL the mock understands.
+
+        Understood: the SELECT list, FROM, Id range and SystemModstamp conditions, ORDER BY Id and LIMIT;
+        anything else in WHERE is ignored.
+        """
+        match = re.search(r'\sFROM\s+(\w+)', soql_query, re.IGNORECASE)
+        if not match:
+            raise MockError(400, 'MALFORMED_QUERY', f"unexpected token in: {soql_query}")
+        sobject = match.group(1)
+        fields = select_fields(soql_query)
+        is_count = [field.upper() for field in fields] == ['COUNT()']
+        ids = self.all_ids(sobject)
+        for operator, value in re.findall(r"\bId\s*(>=|<|>|<=|=)\s*'(\w+)'", soql_query):
+            ids = [record_id for record_id in ids if {'>=': record_id >= value, '<': record_id < value, '>': record_id > value,
+                                                       '<=': record_id <= value, '=': record_id == value}[operator]]
+        for operator, value in re.findall(r'\bSystemModstamp\s*(>=|>|<|<=)\s*(\d{4}-\d\d-\d\dT[\d:.]+(?:Z|[+-]\d\d:?\d\d))', soql_query):
+            bound = parse_sf_datetime(value)
+            ids = [record_id for record_id in ids
+                   if {'>=': lambda stamp: stamp >= bound, '>': lambda stamp: stamp > bound,
+                       '<': lambda stamp: stamp < bound, '<=': lambda stamp: stamp <= bound}[operator](parse_sf_datetime(self.record(sobject, record_id)['SystemModstamp']))]
+        limit = re.search(r'\bLIMIT\s+(\d+)', soql_query, re.IGNORECASE)
+        if limit:
+            ids = ids[:int(limit.group(1))]
+        return sobject, fields, ids, is_count
+
+    def project(self, record, fields):
+        """Keeps only the selected fields of a record; dotted fields keep their parent relationship object."""
+        if not fields or any(field.upper().startswith('FIELDS(') for field in fields):
+            return record
+        projected = {'attributes': record['attributes']}
+        for field in fields:
+            name = field.split('.')[0]
+            if name in record:
+                projected[name] = record[name]
+            elif '.' not in field:
+                projected[name] = None
+        return projected
+
+    def open_cursor(self, soql_query, batch_size=None):
+        sobject, fields, ids, is_count = self.run_query(soql_query)
+        if is_count:
+            return {'totalSize': len(ids), 'done': True, 'records': []}
+        with self.lock:
+            locator = f"01g{len(self.cursors):015d}"
+            self.cursors[locator] = (sobject, fields, ids, batch_size or self.page_size)
+        return self.cursor_page(locator, 0)
+
+    def cursor_page(self, locator, offset):
+        if locator not in self.cursors:
+            raise MockError(400, 'INVALID_QUERY_LOCATOR', 'invalid query locator')
+        sobject, fields, ids, batch_size = self.cursors[locator]
+        page = [self.project(self.record(sobject, record_id), fields) for record_id in ids[offset:offset + batch_size]
+                if record_id not in self.deleted]
+        body = {'totalSize': len(ids), 'done': offset + batch_size >= len(ids), 'records': page}
+        if not body['done']:
+            body['nextRecordsUrl'] = f"/services/data/v{DEFAULT_API_VERSION}/query/{locator}-{offset + batch_size}"
+        return body
+
+    def csv_rows(self, sobject, fields, ids):
+        columns = [field for field in fields if field.upper() != 'COUNT()'] or self.field_names()
+        out = io.StringIO()
+        writer = csv.writer(out, lineterminator='\n')
+        writer.writerow(columns)
+        for record_id in ids:
+            record = self.record(sobject, record_id)
+            row = []
+            for column in columns:
+                value = record
+                for part in column.split('.'):
+                    value = value.get(part) if isinstance(value, dict) else None
+                row.append('' if value is None else str(value).lower() if isinstance(value, bool) else value)
+            writer.writerow(row)
+        return out.getvalue()
+
+    # --- dispatch ------------------------------------------------------------------------------------
+
+    def handle(self, method, path, query=None, headers=None, body=None):
+        """Answers one REST call and returns (status, body, content type, extra headers); body is JSON-able, text or None.
+
+        Composite requests call back into handle for each subrequest.
+        """
+        query = query or {}
+        headers = headers or {}
+        match = re.match(r'/services/data(?:/v(\d+\.\d+))?(/.*)?$', path.rstrip('/'))
+        if not match:
+            raise MockError(404, 'NOT_FOUND', f"The requested resource does not exist: {path}")
+        version, resource = match.group(1), match.group(2) or ''
+        if version is None:
+            return 200, [{'label': 'Mock', 'url': f"/services/data/v{DEFAULT_API_VERSION}", 'version': DEFAULT_API_VERSION}], None, None
+        parts = [unquote(part) for part in resource.strip('/').split('/') if part]
+        if not parts:
+            return 200, {name: f"/services/data/v{version}/{name}" for name in ('query', 'queryAll', 'sobjects', 'limits', 'composite', 'jobs')}, None, None
+        if parts[0] == 'limits':
+            return 200, {'DailyApiRequests': {'Max': DAILY_API_LIMIT, 'Remaining': DAILY_API_LIMIT - self.request_count}}, None, None
+        if parts[0] in ('query', 'queryAll'):
+            if len(parts) == 2:
+                locator, _, offset = parts[1].rpartition('-')
+                return 200, self.cursor_page(locator, int(offset)), None, None
+            batch = re.search(r'batchSize=(\d+)', headers.get('Sforce-Query-Options', ''))
+            return 200, self.open_cursor(query.get('q', ''), int(batch.group(1)) if batch else None), None, None
+        if parts[0] == 'sobjects':
+            return self.handle_sobjects(method, parts[1:], query, headers, body)
+        if parts[0] == 'composite':
+            return self.handle_composite(method, version, parts[1:], query, body)
+        if parts[0] == 'jobs' and len(parts) > 1:
+            return self.handle_jobs(method, version, parts[1], parts[2:], query, body)
+        raise MockError(404, 'NOT_FOUND', f"The requested resource does not exist: {path}")
+
+    def handle_sobjects(self, method, parts, query, headers, body):
+        if not parts:
+            return 200, {'sobjects': [{'name': name, 'keyPrefix': prefix, 'queryable': True} for name, prefix in KEY_PREFIXES.items()]}, None, None
+        sobject = parts[0]
+        if len(parts) == 1:
+            if method == 'POST':
+                result = self.create(sobject, body or {})
+                if not result['success']:
+                    return 400, [{'errorCode': error['statusCode'], 'message': error['message']} for error in result['errors']], None, None
+                return 201, result, None, None
+            return 200, {'objectDescribe': {'name': sobject}, 'recentItems': []}, None, None
+        if parts[1] == 'describe':
+            etag = f'"{sobject}-{self.record_width}"'
+            if headers.get('If-None-Match') == etag:
+                return 304, None, None, {'ETag': etag}
+            return 200, self.describe(sobject), None, {'ETag': etag}
+        if parts[1] == 'deleted':
+            deleted = [{'id': record_id, 'deletedDate': stamp} for record_id, stamp in self.deleted.items()
+                       if record_id.startswith(KEY_PREFIXES.get(sobject, 'a00'))]
+            end = query.get('end', sf_datetime(datetime.now(timezone.utc)))
+            return 200, {'deletedRecords': deleted, 'earliestDateAvailable': sf_datetime(EPOCH),
+                         'latestDateCovered': sf_datetime(parse_sf_datetime(end))}, None, None
+        record_id = parts[1]
+        if method == 'GET':
+            record = self.record(sobject, record_id)
+            if record is None:
+                raise MockError(404, 'NOT_FOUND', 'The requested resource does not exist')
+            return 200, record, None, None
+        result = self.update(sobject, record_id, body or {}) if method == 'PATCH' else self.delete(sobject, record_id)
+        if not result['success']:
+            status = 404 if result['errors'][0]['statusCode'] == 'ENTITY_IS_DELETED' else 400
+            return status, [{'errorCode': error['statusCode'], 'message': error['message']} for error in result['errors']], None, None
+        return 204, None, None, None
+
+    def handle_composite(self, method, version, parts, query, body):
+        if parts and parts[0] == 'sobjects':
+            if method == 'DELETE':
+                return 200, [self.delete(self.sobject_of(record_id), record_id) for record_id in query.get('ids', '').split(',') if record_id], None, None
+            records = (body or {}).get('records', [])
+            if method == 'POST' or len(parts) > 2:
+                # Upserts by external Id always insert: the mock keeps no external Id index
+                return 200, [self.create(record.get('attributes', {}).get('type', 'Account'), record) for record in records], None, None
+            return 200, [self.update(self.sobject_of(record.get('Id', '')), record.get('Id', ''), record) for record in records], None, None
+        if parts and parts[0] == 'batch':
+            results = []
+            for subrequest in (body or {}).get('batchRequests', []):
+                # Batch subrequest URLs are relative to /services/data, e.g. v62.0/sobjects/Account/001...
+                url = re.sub(r'^/?(services/data/)?v\d+\.\d+/', '', subrequest['url'])
+                status, result = self.subrequest(subrequest['method'], f"/services/data/v{version}/{url}", subrequest.get('richInput'))
+                results.append({'statusCode': status, 'result': result})
+            return 200, {'hasErrors': any(result['statusCode'] >= 400 for result in results), 'results': results}, None, None
+        if parts and parts[0] == 'graph':
+            graphs = [{'graphId': graph['graphId'], **self.run_composite(graph['compositeRequest'])} for graph in (body or {}).get('graphs', [])]
+            return 200, {'graphs': [{'graphId': graph['graphId'], 'isSuccessful': graph['ok'], 'graphResponse': {'compositeResponse': graph['compositeResponse']}}
+                                    for graph in graphs]}, None, None
+        return 200, {'compositeResponse': self.run_composite((body or {}).get('compositeRequest', []))['compositeResponse']}, None, None
+
+    def run_composite(self, subrequests):
+        """Runs composite subrequests in order, resolving @{reference.field}; the first failure rolls back nothing but marks the rest."""
+        results, outputs, ok = [], {}, True
+
+        def resolve(value):
+            if isinstance(value, str):
+                return re.sub(r'@\{(\w+)\.(\w+)\}', lambda ref: str((outputs.get(ref.group(1)) or {}).get(ref.group(2), '')), value)
+            if isinstance(value, dict):
+                return {key: resolve(item) for key, item in value.items()}
+            if isinstance(value, list):
+                return [resolve(item) for item in value]
+            return value
+
+        for subrequest in subrequests:
+            if not ok:
+                results.append({'body': [{'errorCode': 'PROCESSING_HALTED', 'message': 'The transaction was rolled back'}],
+                                'httpHeaders': {}, 'httpStatusCode': 400, 'referenceId': subrequest['referenceId']})
+                continue
+            status, result = self.subrequest(subrequest['method'], resolve(subrequest['url']), resolve(subrequest.get('body')))
+            outputs[subrequest['referenceId']] = result if isinstance(result, dict) else {}
+            ok = status < 400
+            results.append({'body': result, 'httpHeaders': {}, 'httpStatusCode': status, 'referenceId': subrequest['referenceId']})
+        return {'ok': ok, 'compositeResponse': results}
+
+    def subrequest(self, method, url, body):
+        parsed = urlparse(url)
+        try:
+            status, result, _, _ = self.handle(method.upper(), parsed.path, {key: values[-1] for key, values in parse_qs(parsed.query).items()}, {}, body)
+        except MockError as e:
+            return e.status, [{'errorCode': e.error_code, 'message': str(e)}]
+        return status, result
+
+    def handle_jobs(self, method, version, job_type, parts, query, body):
+        if not parts:
+            if method != 'POST':
+                return 200, {'done': True, 'records': [job['info'] for job in self.jobs.values() if job['type'] == job_type]}, None, None
+            with self.lock:
+                job_id = f"750{len(self.jobs) + 1:015d}"
+            info = {'id': job_id, 'operation': (body or {}).get('operation'), 'object': (body or {}).get('object'), 'apiVersion': float(version),
+                    'createdDate': sf_datetime(datetime.now(timezone.utc)), 'contentType': 'CSV'}
+            job = {'type': job_type, 'info': info, 'polls': 0, 'data': ''}
+            if job_type == 'query':
+                job['query'] = self.run_query((body or {}).get('query', ''))
+                info.update(state='UploadComplete', object=job['query'][0])
+            else:
+                info['state'] = 'Open'
+            self.jobs[job_id] = job
+            return 200, info, None, None
+        job = self.jobs.get(parts[0])
+        if job is None or job['type'] != job_type:
+            raise MockError(404, 'NOT_FOUND', 'Job not found')
+        info = job['info']
+        if len(parts) == 1:
+            if method == 'PATCH':
+                state = (body or {}).get('state')
+                if state == 'UploadComplete' and job_type == 'ingest':
+                    job['results'] = self.run_ingest(info, job['data'])
+                info['state'] = state
+                return 200, info, None, None
+            if method == 'DELETE':
+                del self.jobs[parts[0]]
+                return 204, None, None, None
+            if info['state'] in ('UploadComplete', 'InProgress'):
+                job['polls'] += 1
+                info['state'] = 'JobComplete' if job['polls'] > self.job_polls else 'InProgress'
+                if info['state'] == 'JobComplete':
+                    info['numberRecordsProcessed'] = len(job['query'][2]) if job_type == 'query' else len(job['results']['successfulResults'])
+                    if job_type == 'ingest':
+                        info['numberRecordsFailed'] = len(job['results']['failedResults'])
+            return 200, info, None, None
+        if job_type == 'ingest' and parts[1] == 'batches':
+            job['data'] = body or ''
+            return 201, None, None, None
+        if job_type == 'ingest':
+            rows = job.get('results', {}).get(parts[1].replace('unprocessedrecords', 'unprocessedRecords'))
+            if rows is None:
+                raise MockError(404, 'NOT_FOUND', 'No such result set')
+            return 200, rows_csv(rows), 'text/csv', None
+        if info['state'] != 'JobComplete':
+            raise MockError(400, 'INVALIDJOBSTATE', 'The job is not complete')
+        sobject, fields, ids, _ = job['query']
+        if parts[1] == 'resultPages':
+            if float(version) < 62.0:
+                raise MockError(404, 'NOT_FOUND', 'The requested resource does not exist')
+            size = int(query.get('maxRecords', self.bulk_chunk_size))
+            return 200, {'resultPages': [{'resultLink': f"/services/data/v{version}/jobs/query/{parts[0]}/results?locator={offset}&maxRecords={size}"}
+                                         for offset in range(0, max(len(ids), 1), size)], 'nextRecordsUrl': None}, None, None
+        offset = int(query.get('locator') or 0)
+        size = int(query.get('maxRecords', self.bulk_chunk_size))
+        chunk = ids[offset:offset + size]
+        next_locator = str(offset + size) if offset + size < len(ids) else 'null'
+        return 200, self.csv_rows(sobject, fields, chunk), 'text/csv', {'Sforce-Locator': next_locator, 'Sforce-NumberOfRecords': str(len(chunk))}
+
+    def run_ingest(self, info, data):
+        reader = csv.DictReader(io.StringIO(data))
+        results = {'successfulResults': [], 'failedResults': [], 'unprocessedRecords': []}
+        for row in reader:
+            if info['operation'] in ('insert', 'upsert') and not (info['operation'] == 'upsert' and row.get('Id')):
+                result = self.create(info['object'], row)
+                created = 'true'
+            elif info['operation'] in ('delete', 'hardDelete'):
+                result = self.delete(info['object'], row.get('Id', ''))
+                created = 'false'
+            else:
+                result = self.update(info['object'], row.get('Id', ''), row)
+                created = 'false'
+            if result['success']:
+                results['successfulResults'].append(dict({'sf__Id': result['id'], 'sf__Created': created}, **row))
+            else:
+                results['failedResults'].append(dict({'sf__Id': result['id'] or '', 'sf__Error': f"{result['errors'][0]['statusCode']}:{result['errors'][0]['message']}"}, **row))
+        return results
+
+
+def rows_csv(rows):
+    if not rows:
+        return ''
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=list(rows[0].keys()), lineterminator='\n', quoting=csv.QUOTE_ALL)
+    writer.writeheader()
+    writer.writerows(rows)
+    return out.getvalue()
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """HTTP/1.1 keep-alive front end of MockOrg; adds latency, injects 503s and reports usage in Sforce-Limit-Info."""
+
+    protocol_version = 'HTTP/1.1'
+    org = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send(self, status, body, content_type=None, extra_headers=None):
+        if body is None:
+            payload = b''
+        elif isinstance(body, str):
+            payload = body.encode('utf-8')
+        else:
+            payload = json.dumps(body).encode('utf-8')
+            content_type = content_type or 'application/json;charset=UTF-8'
+        self.send_response(status)
+        if payload or status not in (204, 304):
+            self.send_header('Content-Type', content_type or 'application/json;charset=UTF-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('Sforce-Limit-Info', f"api-usage={self.org.request_count}/{DAILY_API_LIMIT}")
+        for key, value in (extra_headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def dispatch(self):
+        org = self.org
+        parsed = urlparse(self.path)
+        with org.lock:
+            org.request_count += 1
+            org.requests_by_path[parsed.path] = org.requests_by_path.get(parsed.path, 0) + 1
+            delay = org.latency + (org.random.uniform(0, org.jitter) if org.jitter else 0)
+            fail = org.error_rate and org.random.random() < org.error_rate
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        if delay:
+            time.sleep(delay)
+        if self.headers.get('Authorization') is None:
+            return self.send(401, [{'errorCode': 'INVALID_SESSION_ID', 'message': 'Session expired or invalid'}])
+        if fail:
+            return self.send(503, [{'errorCode': 'SERVER_UNAVAILABLE', 'message': 'Injected failure'}], extra_headers={'Retry-After': '0'})
+        body = None
+        if raw:
+            text = raw.decode('utf-8')
+            body = text if 'csv' in (self.headers.get('Content-Type') or '') else json.loads(text)
+        query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+        try:
+            status, result, content_type, extra_headers = org.handle(self.command, parsed.path, query, self.headers, body)
+        except MockError as e:
+            return self.send(e.status, [{'errorCode': e.error_code, 'message': str(e)}])
+        except (ValueError, KeyError, TypeError) as e:
+            return self.send(400, [{'errorCode': 'JSON_PARSER_ERROR', 'message': str(e)}])
+        self.send(status, result, content_type, extra_headers)
+
+    do_GET = do_POST = do_PATCH = do_PUT = do_DELETE = dispatch
+
+
+class MockServer:
+    """Runs a MockOrg behind a threaded HTTP server on a background thread; usable as a context manager."""
+
+    def __init__(self, org=None, host='127.0.0.1', port=0):
+        self.org = org or MockOrg()
+        handler = type('BoundMockHandler', (MockHandler,), {'org': self.org})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def auth_json(self, api_version=DEFAULT_API_VERSION):
+        """Returns an 'sf org display --json' style document pointing at this server, for the app and resty_cli."""
+        return {'status': 0, 'result': {'accessToken': 'MOCK!token', 'instanceUrl': self.url, 'apiVersion': api_version, 'username': 'mock@example.com'}}
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name='resty-mock', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m resty_mock', description="Serve a mock Salesforce REST API for benchmarks and offline runs.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--records', type=int, default=DEFAULT_RECORDS, help=f"Records per sObject (default: {DEFAULT_RECORDS})")
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE, help=f"Records per REST query page (default: {DEFAULT_PAGE_SIZE})")
+    parser.add_argument('--record-width', type=int, default=DEFAULT_RECORD_WIDTH, help=f"Extra text fields per record (default: {DEFAULT_RECORD_WIDTH})")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Up to this many more seconds, at random")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of requests answered with 503 SERVER_UNAVAILABLE")
+    parser.add_argument('--record-error-rate', type=float, default=0.0, help="Share of DML records rejected")
+    parser.add_argument('--job-polls', type=int, default=1, help="Polls a Bulk API 2.0 job stays InProgress (default: 1)")
+    parser.add_argument('--bulk-chunk-size', type=int, default=DEFAULT_BULK_CHUNK_SIZE, help="Records per Bulk query result chunk")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--auth', help="Also write an auth.json for this server here")
+    return parser.parse_args(argv)
+
+
+def org_from_args(args):
+    return MockOrg(records=args.records, page_size=args.page_size, record_width=args.record_width, latency=args.latency, jitter=args.jitter,
+                   error_rate=args.error_rate, record_error_rate=args.record_error_rate, job_polls=args.job_polls,
+                   bulk_chunk_size=args.bulk_chunk_size, seed=args.seed)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    server = MockServer(org_from_args(args), args.host, args.port)
+    if args.auth:
+        with open(args.auth, 'w', encoding='utf-8') as auth_file:
+            json.dump(server.auth_json(), auth_file, indent=2)
+    print(f"Mock Salesforce at {server.url} ({args.records:,} records per sObject)", flush=True)
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import io
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from resty_bulk import api_version_from_path
+from resty_client import load_auth_credentials
+from resty_engine import iter_spec_pages, schema_resolver
+from resty_flatten import query_fields
+from resty_query import PageFetchError
+from resty_sinks import TypedDataFrameSink
+
+#------------------------------------------------------
+# Salesforce RESTY - one request fanned out across many orgs
+# Author: Mohan Chinnappan
+# Copyleft software. Maintain the author name in your copies/modifications
+#------------------------------------------------------
+
+DEFAULT_PROFILES_DIR = os.path.join(os.path.expanduser('~'), '.resty', 'orgs')
+DEFAULT_ORG_WORKERS = 64
+ORG_COLUMN = 'org'
+
+
+def load_profiles(directory):
+    """Reads every *.json 'sf org display --json' output in directory, in file name order.
+
+    Returns (profiles, skipped). Each profile holds the credentials of load_auth_credentials plus 'name'
+    (the org alias, else the username, else the file name) and 'path'; skipped lists (file name, reason)
+    for files that are not usable auth files.
+    """
+    profiles, skipped, names = [], [], set()
+    for file_name in sorted(os.listdir(directory)):
+        if not file_name.lower().endswith('.json'):
+            continue
+        path = os.path.join(directory, file_name)
+        try:
+            with open(path, 'rb') as auth_file:
+                data = auth_file.read()
+            credentials = load_auth_credentials(io.BytesIO(data))
+            result = json.loads(data).get('result', {})
+        except (OSError, ValueError) as e:
+            skipped.append((file_name, str(e)))
+            continue
+        instance_url = credentials['instance_url'].strip()
+        if not instance_url.startswith(('http://', 'https://')):
+            instance_url = 'https://' + instance_url
+        name = result.get('alias') or result.get('username') or os.path.splitext(file_name)[0]
+        if name in names:
+            name = f"{name} ({file_name})"
+        names.add(name)
+        profiles.append(dict(credentials, instance_url=instance_url, name=name, path=path))
+    return profiles, skipped
+
+
+def org_headers(profile):
+    return {
+        'Authorization': f'Bearer {profile["access_token"]}',
+        'Content-Type': 'application/json'
+    }
+
+
+def fetch_org(profile, client, endpoint_path, spec, workers=1, schema_cache=None):
+    """Runs one GET or query spec (see resty_engine.iter_spec_pages) against one org into a typed DataFrame.
+
+    {version} in endpoint_path becomes the org's API version from its auth file. Returns
+    {'df', 'children', 'last_response', 'records', 'pages', 'messages'}.
+    """
+    messages = []
+    endpoint_path = endpoint_path.replace('{version}', str(profile['api_version']))
+    api_version = api_version_from_path(endpoint_path, profile['api_version'])
+    headers = org_headers(profile)
+    resolve_schema = None
+    if spec.get('query') and spec.get('typed', True) and schema_cache is not None:
+        resolve_schema = schema_resolver(client, headers, profile['instance_url'], api_version, spec['query'], schema_cache, messages.append)
+    sink = TypedDataFrameSink(resolve_schema=resolve_schema, fields=query_fields(spec.get('query')))
+    last_response, pages = None, 0
+    with sink:
+        for records, last_response in iter_spec_pages(client, headers, profile['instance_url'], api_version, endpoint_path, spec, workers, messages.append):
+            sink.write(records)
+            pages += 1
+    return {'df': sink.frame(), 'children': sink.children(), 'last_response': last_response, 'records': sink.count, 'pages': pages,
+            'messages': messages}
+
+
+def _timed(run, profile):
+    started = time.perf_counter()
+    try:
+        return run(profile), None, time.perf_counter() - started
+    except Exception as e:
+        return None, e.error if isinstance(e, PageFetchError) else e, time.perf_counter() - started
+
+
+def fan_out(profiles, run, workers=DEFAULT_ORG_WORKERS):
+    """Calls run(profile) for every profile, up to workers orgs at a time.
+
+    Yields (profile, result, error, seconds) as each org finishes, so one slow or failing org neither
+    holds up the others nor stops the run; error is the exception run raised, else None.
+    """
+    if not profiles:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(profiles))), thread_name_prefix='resty-org') as executor:
+        futures = {executor.submit(_timed, run, profile): profile for profile in profiles}
+        for future in as_completed(futures):
+            result, error, seconds = future.result()
+            yield futures[future], result, error, seconds
+
+
+def merge_org_frames(frames):
+    """Concatenates per-org frames, keyed by org name, into one frame with the org as its first column.
+
+    Rows keep their per-org row numbers as index, so subquery child frames merged the same way still
+    link to their parents by (org, _parent_row). Picklist columns whose categories differ between orgs
+    are made categorical again over the union of values.
+    """
+    frames = {name: frame for name, frame in frames.items() if not frame.empty}
+    if not frames:
+        return pd.DataFrame()
+    merged = pd.concat(frames, names=[ORG_COLUMN, None]).reset_index(level=0)
+    for column in merged.columns:
+        categorical = any(isinstance(frame[column].dtype, pd.CategoricalDtype) for frame in frames.values() if column in frame)
+        if categorical and not isinstance(merged[column].dtype, pd.CategoricalDtype):
+            merged[column] = merged[column].astype('category')
+    merged[ORG_COLUMN] = merged[ORG_COLUMN].astype('category')
+    return merged
+
+
+def merge_org_children(children_by_org):
+    """Merges the subquery child frames of every org the way merge_org_frames merges the parents."""
+    relationships = {relationship for children in children_by_org.values() for relationship in children}
+    return {relationship: merge_org_frames({name: children[relationship] for name, children in children_by_org.items() if relationship in children})
+            for relationship in sorted(relationships)}
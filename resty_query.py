@@ -0,0 +1,169 @@
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+
+import requests
+
+from resty_client import raise_for_status
+from resty_trace import span, wrap_context
+
+#------------------------------------------------------
+# Salesforce RESTY - SOQL query paging helpers
+# Author: Mohan Chinnappan
+# Copyleft software. Maintain the author name in your copies/modifications
+#------------------------------------------------------
+
+DEFAULT_QUERY_WORKERS = 4
+
+# nextRecordsUrl looks like /services/data/v60.0/query/01gXX0000000001-2000
+LOCATOR_PATTERN = re.compile(r'^(?P<prefix>.*/query(?:All)?/)(?P<locator>[^/]+)-(?P<offset>\d+)$')
+
+_EXHAUSTED = object()
+
+
+class PageFetchError(requests.RequestException):
+    """Raised when a page still fails after retries; resume_url is the page the loop can restart from."""
+
+    def __init__(self, resume_url, error):
+        super().__init__(f"{error} (resume from {resume_url})")
+        self.resume_url = resume_url
+        self.error = error
+
+
+def fetch_page_json(client, url, headers, params=None):
+    """GETs one page and returns its JSON body, raising PageFetchError with the page URL on any failure."""
+    try:
+        response = raise_for_status(client.get(url, headers=headers, params=params))
+        with span('JSON decode'):
+            return response.json()
+    except (requests.RequestException, ValueError) as e:
+        raise PageFetchError(url, e) from e
+
+
+def is_locator_url(url):
+    """Tells whether url points at a query locator page rather than the /query resource itself."""
+    return parse_query_locator(urlparse(url).path) is not None
+
+
+def parse_query_locator(next_records_url):
+    """Splits a nextRecordsUrl into (prefix, locator id, offset), or returns None if it is not a locator URL."""
+    match = LOCATOR_PATTERN.match(next_records_url or '')
+    if not match:
+        return None
+    return match.group('prefix'), match.group('locator'), int(match.group('offset'))
+
+
+def locator_page_urls(next_records_url, total_size, current_offset=0):
+    """Lists every remaining page URL of a query; the batch size is the step from current_offset to the next locator offset."""
+    parsed = parse_query_locator(next_records_url)
+    if parsed is None:
+        return None
+    prefix, locator, next_offset = parsed
+    batch_size = next_offset - current_offset
+    if batch_size <= 0:
+        return None
+    return [f"{prefix}{locator}-{offset}" for offset in range(next_offset, total_size, batch_size)]
+
+
+def locator_offset(url):
+    """Returns the record offset of a locator page URL, or 0 for the first page of a query."""
+    parsed = parse_query_locator(urlparse(url).path)
+    return parsed[2] if parsed else 0
+
+
+def determine_record_key(endpoint_path, response_json):
+    """Determines the key to use for accessing records based on the endpoint."""
+    endpoint_key = endpoint_path.split('/')[-1]
+    if endpoint_key in response_json:
+        return endpoint_key
+    return next(iter(response_json.keys()), 'records')
+
+
+def iter_in_order(fn, items, workers):
+    """Yields fn(item) for each item in input order while running up to workers calls concurrently.
+
+    At most two results per worker are in flight or waiting to be consumed, so memory stays bounded
+    by the worker count rather than the number of items.
+    """
+    workers = max(1, workers)
+    # Workers record into the caller's tracer
+    fn = wrap_context(fn)
+    pending = deque()
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            for item in items:
+                pending.append(executor.submit(fn, item))
+                if len(pending) >= workers * 2:
+                    break
+            while pending:
+                result = pending.popleft().result()
+                item = next(items, _EXHAUSTED)
+                if item is not _EXHAUSTED:
+                    pending.append(executor.submit(fn, item))
+                yield result
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def iter_query_pages_parallel(client, headers, instance_url, page_urls, workers=DEFAULT_QUERY_WORKERS):
+    """Yields the JSON bodies of the given locator page URLs in page order while fetching them concurrently."""
+    if not page_urls:
+        return
+
+    def fetch_page(page_url):
+        return fetch_page_json(client, urljoin(instance_url, page_url), headers)
+
+    # Never run more workers than the client keeps pooled connections for
+    yield from iter_in_order(fetch_page, page_urls, min(workers, client.pool_size, len(page_urls)))
+
+
+def iter_pages(client, full_url, headers, instance_url, endpoint_path, all_pages=False, soql_query=None, parallel_workers=1):
+    """Yields (records, response JSON) for each page of a GET request, following nextRecordsUrl/nextPageUrl.
+
+    Only the current page is held in memory. A page that still fails after the client's retries raises
+    PageFetchError; passing its resume_url back as full_url continues from that page.
+    """
+    is_query = 'query' in endpoint_path.lower()
+    params = {'q': soql_query} if is_query and soql_query and not is_locator_url(full_url) else None
+
+    while full_url:
+        response_json = fetch_page_json(client, full_url, headers, params)
+
+        if is_query:
+            yield response_json.get('records', []), response_json
+            next_url = response_json.get('nextRecordsUrl') if all_pages else None
+            page_urls = None
+            if next_url and parallel_workers > 1:
+                page_urls = locator_page_urls(next_url, response_json.get('totalSize', 0), locator_offset(full_url))
+            if page_urls is not None:
+                for page in iter_query_pages_parallel(client, headers, instance_url, page_urls, parallel_workers):
+                    yield page.get('records', []), page
+                return
+            params = None
+        else:
+            record_key = determine_record_key(endpoint_path, response_json)
+            yield response_json.get(record_key, []), response_json
+            next_url = response_json.get('nextPageUrl') if all_pages else None
+
+        full_url = urljoin(instance_url, next_url) if next_url else None
+
+
+def iter_records(client, full_url, headers, instance_url, endpoint_path, all_pages=False, soql_query=None, parallel_workers=1):
+    """Yields the records of a GET request one page-sized list at a time."""
+    for records, _ in iter_pages(client, full_url, headers, instance_url, endpoint_path, all_pages, soql_query, parallel_workers):
+        yield records
+
+
+def get_many(client, urls, headers, workers=DEFAULT_QUERY_WORKERS):
+    """GETs several endpoints on a thread pool; each entry is the JSON body or the exception that request raised."""
+
+    def fetch(url):
+        try:
+            return raise_for_status(client.get(url, headers=headers)).json()
+        except (requests.RequestException, ValueError) as e:
+            return e
+
+    return list(iter_in_order(fetch, urls, min(workers, client.pool_size, max(1, len(urls)))))
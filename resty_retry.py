@@ -0,0 +1,85 @@
+import random
+
+import requests
+
+#------------------------------------------------------
+# Salesforce RESTY - retry policy for transient failures
+# Author: Mohan Chinnappan
+# Copyleft software. Maintain the author name in your copies/modifications
+#------------------------------------------------------
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 30.0
+
+RETRYABLE_STATUS_CODES = (500, 502, 503, 504)
+# Salesforce rejects these before committing anything, so even POST can be sent again
+REJECTED_STATUS_CODES = (503,)
+REJECTED_ERROR_CODES = ('REQUEST_LIMIT_EXCEEDED', 'UNABLE_TO_LOCK_ROW', 'SERVER_UNAVAILABLE')
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'PATCH', 'DELETE')
+
+
+def error_codes(response):
+    """Returns the errorCode values of a Salesforce error body, or an empty list."""
+    if response.status_code < 400 or not response.content:
+        return []
+    try:
+        body = response.json()
+    except ValueError:
+        return []
+    if isinstance(body, dict):
+        body = [body]
+    if not isinstance(body, list):
+        return []
+    return [item.get('errorCode') for item in body if isinstance(item, dict) and item.get('errorCode')]
+
+
+class RetryPolicy:
+    """Decides which failed requests to send again and how long to wait in between.
+
+    Idempotent methods (GET, PATCH, DELETE, ...) are retried on connection errors, timeouts and 5xx.
+    POST is only retried when Salesforce provably did not process it: a failed connect, a 503, or an
+    UNABLE_TO_LOCK_ROW / REQUEST_LIMIT_EXCEEDED error. Pass idempotent=True on a request to treat a
+    POST as safe (e.g. a read-only composite call). Waits use exponential backoff with full jitter and
+    honour Retry-After.
+    """
+
+    def __init__(self, max_attempts=DEFAULT_MAX_ATTEMPTS, base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY, jitter=True):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    @staticmethod
+    def is_idempotent(method, idempotent=None):
+        return idempotent if idempotent is not None else method.upper() in IDEMPOTENT_METHODS
+
+    def should_retry_response(self, method, response, attempt, idempotent=None):
+        """Tells whether a response with an error status should be retried after the given attempt (1-based)."""
+        if attempt >= self.max_attempts:
+            return False
+        if response.status_code in REJECTED_STATUS_CODES:
+            return True
+        if response.status_code in (400, 403, 500) and any(code in REJECTED_ERROR_CODES for code in error_codes(response)):
+            return True
+        return response.status_code in RETRYABLE_STATUS_CODES and self.is_idempotent(method, idempotent)
+
+    def should_retry_error(self, method, error, attempt, idempotent=None):
+        """Tells whether a transport error should be retried after the given attempt (1-based)."""
+        if attempt >= self.max_attempts:
+            return False
+        # A failed connect never reached Salesforce
+        if isinstance(error, requests.ConnectTimeout):
+            return True
+        if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+            return self.is_idempotent(method, idempotent)
+        return False
+
+    def backoff(self, attempt, response=None):
+        """Returns the seconds to wait before the next attempt."""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.max_delay)
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, delay) if self.jitter else delay
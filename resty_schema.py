@@ -0,0 +1,160 @@
+import copy
+import threading
+from urllib.parse import urljoin
+
+import pandas as pd
+
+from resty_client import raise_for_status
+
+#------------------------------------------------------
+# Salesforce RESTY - describe-driven schemas and typed DataFrames
+# Author: Mohan Chinnappan
+# Copyleft software. Maintain the author name in your copies/modifications
+#------------------------------------------------------
+
+# Salesforce field type -> column kind; types not listed stay as text
+FIELD_KINDS = {
+    'int': 'int',
+    'long': 'int',
+    'double': 'float',
+    'currency': 'float',
+    'percent': 'float',
+    'boolean': 'boolean',
+    'date': 'date',
+    'datetime': 'datetime',
+    'picklist': 'category',
+}
+
+BOOLEAN_VALUES = {True: True, False: False, 'true': True, 'false': False}
+
+
+def describe_sobject(client, headers, instance_url, api_version, sobject):
+    """Returns the describe JSON of an sObject (served from the client's response cache when it has one)."""
+    url = urljoin(instance_url, f"/services/data/v{api_version}/sobjects/{sobject}/describe")
+    return raise_for_status(client.get(url, headers=headers)).json()
+
+
+def _missing(value):
+    # Bulk API CSV results carry nulls as empty strings; flattened relationships that were null hold NaN
+    return value is None or value is pd.NA or (isinstance(value, float) and value != value) or (isinstance(value, str) and value == '')
+
+
+class SObjectSchema:
+    """Field types of one sObject, used to build DataFrames column by column with proper dtypes.
+
+    Numbers become nullable Int64 / float64, booleans the nullable boolean dtype, dates and datetimes
+    datetime64 (datetimes in UTC) and picklists categoricals over the describe's picklist values.
+    Fields the describe does not know, such as aggregates, are left as they are. Dotted columns
+    (Account.Industry) are typed by the schema of the relationship's sObject, which related(sobject)
+    returns (see with_related); without it, and for polymorphic relationships, they are left as they are.
+    """
+
+    def __init__(self, name, kinds, picklists=None, relationships=None, related=None):
+        self.name = name
+        # Keyed by lower-case field name; SOQL and Bulk CSV headers do not always match the describe's case
+        self.kinds = {field.lower(): kind for field, kind in kinds.items()}
+        self.picklists = {field.lower(): values for field, values in (picklists or {}).items()}
+        # Relationship name -> the sObjects it can point to
+        self.relationships = {name.lower(): targets for name, targets in (relationships or {}).items()}
+        self.related = related
+
+    @classmethod
+    def from_describe(cls, describe):
+        kinds, picklists, relationships = {}, {}, {}
+        for field in describe.get('fields', []):
+            if field.get('relationshipName') and field.get('referenceTo'):
+                relationships[field['relationshipName']] = list(field['referenceTo'])
+            kind = FIELD_KINDS.get(field.get('type'))
+            if kind is None:
+                continue
+            kinds[field['name']] = kind
+            if kind == 'category':
+                picklists[field['name']] = [entry['value'] for entry in field.get('picklistValues', []) if entry.get('value') is not None]
+        return cls(describe.get('name'), kinds, picklists, relationships)
+
+    def with_related(self, related):
+        """Returns a copy of the schema that types dotted columns through related(sobject) -> SObjectSchema or None."""
+        schema = copy.copy(self)
+        schema.related = related
+        return schema
+
+    def _owner(self, field):
+        """Returns the schema that holds field and the field's name there, following dotted relationships; (None, field) when unknown."""
+        schema = self
+        while '.' in field:
+            relationship, field = field.split('.', 1)
+            targets = schema.relationships.get(relationship.lower())
+            if schema.related is None or targets is None or len(targets) != 1:
+                return None, field
+            schema = schema.related(targets[0])
+            if schema is None:
+                return None, field
+        return schema, field
+
+    def kind(self, field):
+        schema, field = self._owner(field)
+        return schema.kinds.get(field.lower()) if schema is not None else None
+
+    def column(self, field, values):
+        """Converts one column of raw values (a list or Series) to the dtype of its field; returns values itself when it has none."""
+        schema, field = self._owner(field)
+        if schema is not self:
+            return schema.column(field, values) if schema is not None else values
+        kind = self.kind(field)
+        if kind is None:
+            return values
+        if kind == 'boolean':
+            return pd.array([BOOLEAN_VALUES.get(value) for value in values], dtype='boolean')
+        values = [None if _missing(value) else value for value in values]
+        if kind == 'int':
+            return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').astype('Int64').array
+        if kind == 'float':
+            return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').astype('float64').array
+        if kind == 'date':
+            return pd.to_datetime(pd.Series(values, dtype=object), format='%Y-%m-%d', errors='coerce').array
+        if kind == 'datetime':
+            return pd.to_datetime(pd.Series(values, dtype=object), format='ISO8601', utc=True, errors='coerce').array
+        # Picklists: the describe's values first, then anything inactive or unrestricted seen in the data
+        known = self.picklists.get(field.lower(), [])
+        categories = known + sorted({value for value in values if value is not None} - set(known))
+        return pd.Categorical(values, categories=categories)
+
+    def frame(self, records):
+        """Builds a DataFrame from record dicts one column at a time, in the order fields first appear."""
+        fields = {}
+        for record in records:
+            for field in record:
+                fields.setdefault(field, None)
+        return pd.DataFrame({field: self.column(field, [record.get(field) for record in records]) for field in fields})
+
+    def coerce_frame(self, df, fields=None):
+        """Converts the typed columns (or just fields) of an already built DataFrame, e.g. one read back from spooled parts."""
+        df = df.copy()
+        for field in fields if fields is not None else df.columns:
+            if self.kind(field) is not None:
+                values = df[field].astype(object).where(df[field].notna(), None).tolist()
+                df[field] = self.column(field, values)
+        return df
+
+
+class SchemaCache:
+    """Parsed SObjectSchemas per instance, API version and sObject, so describe is parsed once per object."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.schemas = {}
+
+    def get(self, client, headers, instance_url, api_version, sobject):
+        """Returns the schema of sobject, describing it on first use."""
+        key = (instance_url.rstrip('/'), api_version, sobject.lower())
+        with self.lock:
+            schema = self.schemas.get(key)
+        if schema is None:
+            schema = SObjectSchema.from_describe(describe_sobject(client, headers, instance_url, api_version, sobject))
+            with self.lock:
+                self.schemas[key] = schema
+        return schema
+
+    def clear(self):
+        with self.lock:
+            self.schemas.clear()
@@ -0,0 +1,134 @@
+import hashlib
+import io
+import json
+import time
+import uuid
+from collections import OrderedDict
+
+from resty_client import load_auth_credentials
+
+#------------------------------------------------------
+# Salesforce RESTY - per-session cache of credentials, client and results across reruns
+# Author: Mohan Chinnappan
+# Copyleft software. Maintain the author name in your copies/modifications
+#------------------------------------------------------
+
+DEFAULT_RESULT_CACHE_MB = 256
+
+
+def frame_bytes(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+def spec_key(**spec):
+    """Returns a stable key for a request spec: every setting that changes which records come back or how they are typed."""
+    return json.dumps(spec, sort_keys=True, default=str)
+
+
+class SessionCache:
+    """Remembers what one browser session already has, so a widget change does not repeat work.
+
+    Holds the credentials parsed from the uploaded auth.json (re-parsed only when the file changes),
+    the HTTP client for the current connection settings, and finished GET results keyed by spec_key.
+    Results are kept least recently used first and evicted once their DataFrames, child frames and
+    memoized export files exceed max_bytes; a result larger than the cap on its own is not kept.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_RESULT_CACHE_MB * 1024 * 1024):
+        # Identifies the session's background jobs; kept when the cache is cleared
+        self.owner = uuid.uuid4().hex
+        self.max_bytes = max_bytes
+        self.credentials_key = None
+        self.credentials = None
+        self.client_key = None
+        self.client = None
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._evict()
+
+    def credentials_for(self, auth_file):
+        """Returns the parsed credentials of an uploaded auth.json, parsing it only when its content changed.
+
+        Switching to another org or user drops the cached results, which belong to the previous login.
+        """
+        data = auth_file.getvalue()
+        key = hashlib.sha256(data).hexdigest()
+        if key != self.credentials_key:
+            credentials = load_auth_credentials(io.BytesIO(data))
+            if self.credentials is not None and credentials != self.credentials:
+                self.invalidate()
+            self.credentials_key, self.credentials = key, credentials
+        return self.credentials
+
+    def client_for(self, key, factory):
+        """Returns the client built by factory for these connection settings, building a new one only when they change."""
+        if key != self.client_key:
+            self.client, self.client_key = factory(), key
+        return self.client
+
+    def get(self, key):
+        entry = self.results.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.results.move_to_end(key)
+        return entry
+
+    def put(self, key, df, children, last_response, **details):
+        """Stores a finished result and returns its entry, or None when it alone exceeds the cap."""
+        self.results.pop(key, None)
+        size = frame_bytes(df) + sum(frame_bytes(child) for child in children.values()) + len(json.dumps(last_response, default=str))
+        if size > self.max_bytes:
+            return None
+        entry = dict(details, df=df, children=children, last_response=last_response, exports={}, bytes=size, stored=time.time())
+        self.results[key] = entry
+        self._evict()
+        return entry
+
+    def export(self, entry, name, build):
+        """Returns the export file bytes stored under name on the entry, building them once with build() and counting them against the cap."""
+        if name not in entry['exports']:
+            data = build()
+            if entry['bytes'] + len(data) > self.max_bytes:
+                return data
+            entry['exports'][name] = data
+            entry['bytes'] += len(data)
+            self._evict(keep=entry)
+        return entry['exports'][name]
+
+    def invalidate(self, instance_url=None, key=None):
+        """Drops one result, every result from instance_url, or with no arguments all results; returns how many were dropped.
+
+        A result matches instance_url through its instance_url detail, or its instance_urls when it merges several orgs.
+        """
+        doomed = [k for k, entry in self.results.items()
+                  if (key is None or k == key) and (instance_url is None or instance_url == entry.get('instance_url')
+                                                    or instance_url in entry.get('instance_urls', ()))]
+        for k in doomed:
+            del self.results[k]
+        return len(doomed)
+
+    def clear(self):
+        """Forgets everything, including the parsed credentials and the client."""
+        self.invalidate()
+        self.credentials_key = self.credentials = None
+        self.client_key = self.client = None
+        self.hits = self.misses = 0
+
+    def total_bytes(self):
+        return sum(entry['bytes'] for entry in self.results.values())
+
+    def _evict(self, keep=None):
+        while self.total_bytes() > self.max_bytes:
+            oldest = next((k for k, entry in self.results.items() if entry is not keep), None)
+            if oldest is None:
+                return
+            del self.results[oldest]
+
+    def summary(self):
+        return {'results': len(self.results), 'bytes': self.total_bytes(), 'max_bytes': self.max_bytes, 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,400 @@
+import gzip
+import io
+import json
+from abc import ABC, abstractmethod
+
+import pandas as pd
+
+from resty_flatten import concat_children, flatten_records
+from resty_trace import span
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+#------------------------------------------------------
+# Salesforce RESTY - incremental record sinks
+# Author: Mohan Chinnappan
+# Copyleft software. Maintain the author name in your copies/modifications
+#------------------------------------------------------
+
+
+COMPRESSIONS = ('gzip', 'zstd') if zstandard is not None else ('gzip',)
+
+
+def open_text(path, compression=None):
+    """Opens path for writing UTF-8 text, compressed with gzip or zstd when asked."""
+    if compression == 'gzip':
+        return gzip.open(path, 'wt', encoding='utf-8', newline='')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ValueError("zstd compression needs the zstandard package")
+        return io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(open(path, 'wb')), encoding='utf-8', newline='')
+    if compression is not None:
+        raise ValueError(f"Unsupported compression: {compression}")
+    return open(path, 'w', newline='', encoding='utf-8')
+
+
+def strip_attributes(record):
+    """Returns the record without the Salesforce 'attributes' metadata key."""
+    if isinstance(record, dict) and 'attributes' in record:
+        return {key: value for key, value in record.items() if key != 'attributes'}
+    return record
+
+
+class RecordSink:
+    """Base class for consumers that receive records one page at a time."""
+
+    span_name = 'sink write'
+
+    def __init__(self):
+        self.count = 0
+
+    def write(self, records):
+        """Consumes one page of records."""
+        self.count += len(records)
+
+    def close(self):
+        """Flushes and releases anything the sink holds open."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ListSink(RecordSink):
+    """Collects every record into a list, matching the original fetch_data return value."""
+
+    span_name = 'collect records'
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def write(self, records):
+        super().write(records)
+        self.records.extend(records)
+
+
+class _FileSink(RecordSink):
+    """Writes to a path it opens itself, optionally compressed, or to an already open text stream it leaves open."""
+
+    def __init__(self, target, compression=None):
+        super().__init__()
+        if isinstance(target, str):
+            self.file = open_text(target, compression)
+            self._owns_file = True
+        else:
+            self.file = target
+            self._owns_file = False
+
+    def close(self):
+        if not self._owns_file:
+            self.file.flush()
+        elif not self.file.closed:
+            self.file.close()
+
+
+def _check_columns(columns, fixed):
+    extra = [column for column in columns if column not in set(fixed)]
+    if extra:
+        raise ValueError(f"Page has columns the output was not started with: {', '.join(extra)}; "
+                         "pass the query's fields (resty_flatten.query_fields) to fix the columns up front")
+
+
+class CSVSink(_FileSink):
+    """Streams records to CSV with relationship fields as dotted columns and subquery results left out.
+
+    The header comes from the first page that has records; later pages are written in its columns.
+    fields is the query's layout (resty_flatten.query_fields), so that a relationship null on every
+    record of the first page still gets its dotted columns. A later page with a column the header does
+    not have raises ValueError rather than losing its values.
+    """
+
+    span_name = 'CSV encode'
+
+    def __init__(self, target, compression=None, fields=None):
+        super().__init__(target, compression)
+        self.fields = fields
+        self.columns = None
+
+    def write(self, records):
+        super().write(records)
+        if not records:
+            return
+        frame, _ = flatten_records(records, fields=self.fields)
+        header = self.columns is None
+        if header:
+            self.columns = list(frame.columns)
+        else:
+            _check_columns(frame.columns, self.columns)
+        frame.reindex(columns=self.columns).to_csv(self.file, header=header, index=False)
+
+
+class JSONLSink(_FileSink):
+    """Streams records to JSON Lines, one record per line."""
+
+    span_name = 'JSONL encode'
+
+    def write(self, records):
+        super().write(records)
+        for record in records:
+            self.file.write(json.dumps(strip_attributes(record)))
+            self.file.write('\n')
+
+
+class DataFrameSink(RecordSink):
+    """Builds one small flattened DataFrame per page and concatenates them once the stream ends.
+
+    Relationship fields become dotted columns; subquery results are collected as linked child frames
+    (see resty_flatten), available from children(). fields is the query's layout, as for CSVSink.
+    """
+
+    span_name = 'DataFrame build'
+
+    def __init__(self, fields=None):
+        super().__init__()
+        self.fields = fields
+        self.chunks = []
+        self.child_chunks = []
+        self.child_starts = {}
+
+    def write(self, records, convert=None):
+        start = self.count
+        super().write(records)
+        if records:
+            frame, children = flatten_records(records, start, self.child_starts, convert, self.fields)
+            self.chunks.append(frame)
+            if children:
+                self.child_chunks.append(children)
+
+    def frame(self):
+        """Returns the concatenated DataFrame, releasing the per-page chunks."""
+        if not self.chunks:
+            return pd.DataFrame()
+        if len(self.chunks) > 1:
+            self.chunks = [pd.concat(self.chunks)]
+        return self.chunks[0]
+
+    def children(self):
+        """Returns the child frames of every subquery, keyed by relationship name."""
+        if len(self.child_chunks) > 1:
+            self.child_chunks = [concat_children(self.child_chunks)]
+        return self.child_chunks[0] if self.child_chunks else {}
+
+
+class TypedDataFrameSink(DataFrameSink):
+    """DataFrameSink that builds typed columns from a resty_schema.SObjectSchema.
+
+    Without a schema, resolve_schema is called once with the first record's attributes.type (None for
+    Bulk CSV records) and may return a schema or None; with no schema the sink behaves like DataFrameSink.
+    """
+
+    def __init__(self, schema=None, resolve_schema=None, fields=None):
+        super().__init__(fields)
+        self.schema = schema
+        self.resolve_schema = resolve_schema
+
+    def write(self, records):
+        if self.schema is None and self.resolve_schema is not None and records:
+            self.schema = self.resolve_schema(records[0].get('attributes', {}).get('type'))
+            self.resolve_schema = None
+        super().write(records, self.schema.column if self.schema is not None else None)
+
+    def frame(self):
+        df = super().frame()
+        if self.schema is not None:
+            # Pages with different picklist values concatenate to object columns; make them categorical again
+            fields = [field for field in df.columns if self.schema.kind(field) == 'category' and not isinstance(df[field].dtype, pd.CategoricalDtype)]
+            if fields:
+                df = self.chunks[0] = self.schema.coerce_frame(df, fields)
+        return df
+
+
+class _ArrowSink(RecordSink, ABC):
+    """Base for sinks that stream flattened, describe-typed pages into an Arrow-based file.
+
+    The first page fixes the file's Arrow schema: all-null columns are widened to string and
+    categoricals stored as plain strings, since the IPC file format cannot change dictionaries between
+    batches. fields is the query's layout, as for CSVSink, so the first page already has every column of
+    the select list. Later pages are cast to that schema; a page with a column the schema does not have
+    raises ValueError rather than losing its values.
+    """
+
+    def __init__(self, path, schema=None, resolve_schema=None, fields=None):
+        if pa is None:
+            raise ImportError("Parquet and Arrow IPC export need pyarrow")
+        super().__init__()
+        self.path = path
+        self.schema = schema
+        self.resolve_schema = resolve_schema
+        self.fields = fields
+        self.arrow_schema = None
+        self.writer = None
+
+    @abstractmethod
+    def _open_writer(self, arrow_schema):
+        """Returns the writer for a file with arrow_schema; it needs write_table(table) and close()."""
+
+    def _write_table(self, table):
+        self.writer.write_table(table)
+
+    def write(self, records):
+        super().write(records)
+        if not records:
+            return
+        if self.schema is None and self.resolve_schema is not None:
+            self.schema = self.resolve_schema(records[0].get('attributes', {}).get('type'))
+            self.resolve_schema = None
+        frame, _ = flatten_records(records, convert=self.schema.column if self.schema is not None else None, fields=self.fields)
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if self.writer is None:
+            fields = []
+            for field in table.schema.remove_metadata():
+                if pa.types.is_null(field.type):
+                    field = field.with_type(pa.string())
+                elif pa.types.is_dictionary(field.type):
+                    field = field.with_type(field.type.value_type)
+                fields.append(field)
+            self.arrow_schema = pa.schema(fields)
+            self.writer = self._open_writer(self.arrow_schema)
+        self._write_table(self._conform(table))
+
+    def _conform(self, table):
+        _check_columns(table.column_names, self.arrow_schema.names)
+        columns = []
+        for field in self.arrow_schema:
+            if field.name in table.column_names:
+                column = table.column(field.name)
+                columns.append(column if column.type == field.type else column.cast(field.type))
+            else:
+                columns.append(pa.nulls(len(table), field.type))
+        return pa.Table.from_arrays(columns, schema=self.arrow_schema)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        elif self.arrow_schema is None:
+            # No records at all: still leave a valid, empty file behind
+            self.arrow_schema = pa.schema([])
+            self.writer = self._open_writer(self.arrow_schema)
+            self.close()
+
+
+class ParquetSink(_ArrowSink):
+    """Streams records into a Parquet file, one row group per page."""
+
+    span_name = 'Parquet encode'
+
+    def __init__(self, path, schema=None, resolve_schema=None, compression='zstd', fields=None):
+        super().__init__(path, schema, resolve_schema, fields)
+        self.compression = compression
+
+    def _open_writer(self, arrow_schema):
+        return pq.ParquetWriter(self.path, arrow_schema, compression=self.compression)
+
+
+class _IPCFileWriter:
+    """Arrow IPC file writer with compressed record batches that also closes the file it writes to."""
+
+    def __init__(self, path, arrow_schema, compression='zstd'):
+        self.file = pa.OSFile(path, 'wb')
+        self.writer = pa.ipc.new_file(self.file, arrow_schema, options=pa.ipc.IpcWriteOptions(compression=compression))
+
+    def write_table(self, table):
+        self.writer.write_table(table)
+
+    def close(self):
+        self.writer.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ArrowIPCSink(_ArrowSink):
+    """Streams records into an Arrow IPC (Feather v2) file, one record batch per page."""
+
+    span_name = 'Arrow IPC encode'
+
+    def _open_writer(self, arrow_schema):
+        return _IPCFileWriter(self.path, arrow_schema)
+
+
+# Download formats: label -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    'CSV': ('.csv', 'text/csv'),
+    'CSV (gzip)': ('.csv.gz', 'application/gzip'),
+    'JSONL': ('.jsonl', 'application/x-ndjson'),
+    'JSONL (gzip)': ('.jsonl.gz', 'application/gzip'),
+}
+if zstandard is not None:
+    EXPORT_FORMATS['CSV (zstd)'] = ('.csv.zst', 'application/zstd')
+    EXPORT_FORMATS['JSONL (zstd)'] = ('.jsonl.zst', 'application/zstd')
+if pa is not None:
+    EXPORT_FORMATS['Parquet'] = ('.parquet', 'application/vnd.apache.parquet')
+    EXPORT_FORMATS['Arrow IPC'] = ('.arrow', 'application/vnd.apache.arrow.file')
+
+
+def _export_compression(export_format):
+    for compression in ('gzip', 'zstd'):
+        if f"({compression})" in export_format:
+            return compression
+    return None
+
+
+def export_sink(export_format, path, schema=None, resolve_schema=None, fields=None):
+    """Returns the sink that streams records to path in one of EXPORT_FORMATS; fields is the query's layout."""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {export_format}")
+    if export_format == 'Parquet':
+        return ParquetSink(path, schema, resolve_schema, fields=fields)
+    if export_format == 'Arrow IPC':
+        return ArrowIPCSink(path, schema, resolve_schema, fields)
+    if export_format.startswith('JSONL'):
+        return JSONLSink(path, _export_compression(export_format))
+    return CSVSink(path, _export_compression(export_format), fields)
+
+
+def export_frame(df, export_format, path):
+    """Writes an already built DataFrame to path in one of EXPORT_FORMATS."""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {export_format}")
+    compression = _export_compression(export_format)
+    if export_format == 'Parquet':
+        df.to_parquet(path, index=False, compression='zstd')
+    elif export_format == 'Arrow IPC':
+        with _IPCFileWriter(path, pa.Schema.from_pandas(df, preserve_index=False)) as writer:
+            writer.write_table(pa.Table.from_pandas(df, preserve_index=False))
+    elif export_format.startswith('JSONL'):
+        df.to_json(path, orient='records', lines=True, date_format='iso', compression=compression)
+    else:
+        df.to_csv(path, index=False, compression=compression)
+
+
+def drain(pages, *sinks):
+    """Feeds each page of records to every sink and returns the last response JSON seen."""
+    response_json = None
+    try:
+        for records, response_json in pages:
+            for sink in sinks:
+                with span(sink.span_name, records=len(records)):
+                    sink.write(records)
+    finally:
+        for sink in sinks:
+            with span(sink.span_name, closing=True):
+                sink.close()
+    return response_json
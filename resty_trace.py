@@ -0,0 +1,277 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+#------------------------------------------------------
+# Salesforce RESTY - request timing spans and trace export
+# Author: Mohan Chinnappan
+# Copyleft software. Maintain the author name in your copies/modifications
+#------------------------------------------------------
+
+# Phases of one HTTP attempt, in the order they happen; wait is throttling, retry backoff and pool waits
+HTTP_PHASES = ('wait', 'connect', 'tls', 'send', 'ttfb', 'download')
+# Where each phase or internal span spends its time, for the network / Salesforce / client verdict
+PHASE_CATEGORIES = {
+    'wait': 'throttle/retry',
+    'connect': 'network',
+    'tls': 'network',
+    'send': 'network',
+    'ttfb': 'salesforce',
+    'download': 'network',
+}
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+
+current_tracer = contextvars.ContextVar('resty_tracer', default=None)
+_current_span = contextvars.ContextVar('resty_span', default=None)
+# Phase intervals of the request running on this thread, filled in by the timed urllib3 connections
+_http_phases = threading.local()
+
+
+def _new_id(length):
+    return os.urandom(length).hex()
+
+
+class Tracer:
+    """Collects timing spans for one run: HTTP requests with their phases plus decode, build and encode steps.
+
+    Spans hold perf_counter nanoseconds and are converted to wall-clock time on export. The tracer is
+    made current with activate(); worker threads and asyncio tasks pick it up through context variables.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.trace_id = _new_id(16)
+        self.spans = []
+        # Offset that turns perf_counter_ns readings into Unix epoch nanoseconds
+        self.epoch_offset = time.time_ns() - time.perf_counter_ns()
+
+    @contextmanager
+    def activate(self):
+        token = current_tracer.set(self)
+        try:
+            yield self
+        finally:
+            current_tracer.reset(token)
+
+    def add(self, name, start, end, attributes=None, kind=SPAN_KIND_INTERNAL, parent_id=None, span_id=None):
+        """Records a finished span and returns its id; parent_id defaults to the span open in this context."""
+        if parent_id is None:
+            parent_id = _current_span.get()
+        span = {
+            'span_id': span_id or _new_id(8),
+            'parent_id': parent_id,
+            'name': name,
+            'kind': kind,
+            'start': start,
+            'end': end,
+            'attributes': attributes or {},
+            'thread': threading.current_thread().name
+        }
+        with self.lock:
+            self.spans.append(span)
+        return span['span_id']
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Times the enclosed block as a span; spans opened inside it become its children."""
+        span_id = _new_id(8)
+        parent_id = _current_span.get()
+        token = _current_span.set(span_id)
+        start = time.perf_counter_ns()
+        try:
+            yield attributes
+        finally:
+            _current_span.reset(token)
+            self.add(name, start, time.perf_counter_ns(), attributes, parent_id=parent_id, span_id=span_id)
+
+    def add_http(self, method, url, start, end, phases, attributes=None):
+        """Records an HTTP request span with a child span per phase; gaps between phases are recorded as wait."""
+        attributes = dict(attributes or {}, **{'http.method': method, 'http.url': url})
+        span_id = self.add(f"{method} {url.split('?')[0].split('/services/data/')[-1]}", start, end, attributes, SPAN_KIND_CLIENT)
+        cursor = start
+        for phase, phase_start, phase_end in sorted(phases, key=lambda interval: interval[1]):
+            if phase_start > cursor:
+                self.add('wait', cursor, phase_start, parent_id=span_id)
+            self.add(phase, phase_start, phase_end, parent_id=span_id)
+            cursor = max(cursor, phase_end)
+        return span_id
+
+    def breakdown(self):
+        """Returns summed milliseconds per phase / step name; parallel work makes the sums exceed wall time."""
+        totals = {}
+        with self.lock:
+            spans = list(self.spans)
+        for span in spans:
+            if span['kind'] == SPAN_KIND_CLIENT:
+                continue
+            totals[span['name']] = totals.get(span['name'], 0.0) + (span['end'] - span['start']) / 1e6
+        return totals
+
+    def categories(self):
+        """Returns summed milliseconds for network, Salesforce (time to first byte), client work and throttle/retry waits."""
+        totals = {'network': 0.0, 'salesforce': 0.0, 'client': 0.0, 'throttle/retry': 0.0}
+        for name, millis in self.breakdown().items():
+            totals[PHASE_CATEGORIES.get(name, 'client')] += millis
+        return totals
+
+    def to_records(self):
+        """Returns the spans as plain dicts with epoch nanosecond times and durations in milliseconds."""
+        with self.lock:
+            spans = list(self.spans)
+        return [dict(span, trace_id=self.trace_id, start=span['start'] + self.epoch_offset, end=span['end'] + self.epoch_offset,
+                     duration_ms=(span['end'] - span['start']) / 1e6) for span in sorted(spans, key=lambda span: span['start'])]
+
+    def to_otlp(self, service_name='resty'):
+        """Returns the spans in the OpenTelemetry OTLP/JSON layout accepted by collectors and trace viewers."""
+        def value(item):
+            if isinstance(item, bool):
+                return {'boolValue': item}
+            if isinstance(item, int):
+                return {'intValue': str(item)}
+            if isinstance(item, float):
+                return {'doubleValue': item}
+            return {'stringValue': str(item)}
+
+        spans = [{
+            'traceId': self.trace_id,
+            'spanId': record['span_id'],
+            'parentSpanId': record['parent_id'] or '',
+            'name': record['name'],
+            'kind': record['kind'],
+            'startTimeUnixNano': str(record['start']),
+            'endTimeUnixNano': str(record['end']),
+            'attributes': [{'key': key, 'value': value(item)} for key, item in record['attributes'].items()]
+        } for record in self.to_records()]
+        return {'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': service_name}}]},
+            'scopeSpans': [{'scope': {'name': 'resty_trace'}, 'spans': spans}]
+        }]}
+
+    def to_json(self, otlp=False):
+        return json.dumps(self.to_otlp() if otlp else self.to_records(), indent=2)
+
+
+def span(name, **attributes):
+    """Times a block under the current tracer, or does nothing when no tracer is active."""
+    tracer = current_tracer.get()
+    return tracer.span(name, **attributes) if tracer is not None else nullcontext(attributes)
+
+
+def wrap_context(fn):
+    """Binds fn to a copy of the caller's context, so pool threads record into the caller's tracer."""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs)
+
+
+# requests / urllib3: connections note their phase intervals in _http_phases.intervals while a traced
+# request runs on the thread; RestyClient turns them into spans
+def start_http_phases():
+    _http_phases.intervals = []
+    return _http_phases.intervals
+
+
+def stop_http_phases():
+    intervals = getattr(_http_phases, 'intervals', None)
+    _http_phases.intervals = None
+    return intervals or []
+
+
+def _note(phase, start, end=None):
+    intervals = getattr(_http_phases, 'intervals', None)
+    if intervals is not None:
+        intervals.append((phase, start, end if end is not None else time.perf_counter_ns()))
+
+
+class _TimedConnectionMixin:
+    def _new_conn(self):
+        # DNS resolution happens inside socket creation, so it is part of connect
+        start = time.perf_counter_ns()
+        sock = super()._new_conn()
+        _note('connect', start)
+        return sock
+
+    def connect(self):
+        start = time.perf_counter_ns()
+        super().connect()
+        intervals = getattr(_http_phases, 'intervals', None)
+        if intervals is not None and isinstance(self, HTTPSConnection):
+            connect_end = next((end for phase, _, end in reversed(intervals) if phase == 'connect'), start)
+            _note('tls', max(start, connect_end))
+
+    def request(self, *args, **kwargs):
+        start = time.perf_counter_ns()
+        super().request(*args, **kwargs)
+        intervals = getattr(_http_phases, 'intervals', None)
+        if intervals is not None:
+            # Plain HTTP connects lazily inside request(); sending starts once that is done
+            opened = [end for phase, phase_start, end in intervals if phase in ('connect', 'tls') and phase_start >= start]
+            _note('send', max([start] + opened))
+
+    def getresponse(self):
+        start = time.perf_counter_ns()
+        response = super().getresponse()
+        _note('ttfb', start)
+        return response
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+def install_timed_pools(adapter):
+    """Makes a requests HTTPAdapter open connections that time connect, TLS, send and time to first byte."""
+    adapter.poolmanager.pool_classes_by_scheme = {'http': TimedHTTPConnectionPool, 'https': TimedHTTPSConnectionPool}
+    return adapter
+
+
+# httpx: the trace extension reports connection and HTTP/1.1 or HTTP/2 events as they happen
+HTTPX_PHASES = {
+    'connect_tcp': 'connect',
+    'start_tls': 'tls',
+    'send_request_headers': 'send',
+    'send_request_body': 'send',
+    'receive_response_headers': 'ttfb',
+    'receive_response_body': 'download',
+}
+
+
+def httpx_trace_recorder():
+    """Returns (intervals, trace callback) for httpx's 'trace' request extension."""
+    intervals = []
+    started = {}
+
+    async def trace(event_name, info):
+        now = time.perf_counter_ns()
+        name, _, state = event_name.rpartition('.')
+        phase = HTTPX_PHASES.get(name.rpartition('.')[2])
+        if phase is None:
+            return
+        if state == 'started':
+            started.setdefault(phase, now)
+        elif state in ('complete', 'failed') and phase in started:
+            begin = started.pop(phase)
+            # Headers and body are sent back to back; keep them as one send interval
+            if phase == 'send' and intervals and intervals[-1][0] == 'send':
+                begin = intervals.pop()[1]
+            intervals.append((phase, begin, now))
+
+    return intervals, trace
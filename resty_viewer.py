@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+#------------------------------------------------------
+# Salesforce RESTY - server-side paging, sorting and filtering of result tables
+# Author: Mohan Chinnappan
+# Copyleft software. Maintain the author name in your copies/modifications
+#------------------------------------------------------
+
+DEFAULT_PAGE_SIZE = 100
+PAGE_SIZES = (50, 100, 500, 1000)
+# Distinct values offered by a value filter; columns with more get a text filter
+MAX_FILTER_CHOICES = 200
+
+
+def filter_kind(series):
+    """Returns how a column is filtered: 'values' (picklists, booleans, few distinct values), 'range' (numbers, dates) or 'text'."""
+    if isinstance(series.dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(series.dtype):
+        return 'values'
+    if pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return 'range'
+    return 'text'
+
+
+def filter_choices(series):
+    """Returns the values offered by a value filter: the categories of a picklist, True/False, or the distinct values."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return list(series.cat.categories)
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return [True, False]
+    return sorted(series.dropna().unique().tolist(), key=str)[:MAX_FILTER_CHOICES]
+
+
+def _bound(series, value):
+    if value is None or not pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return value
+    bound = pd.Timestamp(value)
+    tz = getattr(series.dtype, 'tz', None)
+    return bound.tz_localize(tz) if tz is not None and bound.tzinfo is None else bound
+
+
+def filter_mask(series, op, value):
+    """Returns a boolean array of the rows of series that pass one filter.
+
+    op is 'contains' (case-insensitive substring of the text), 'in' (one of a tuple of values) or
+    'range' (a (low, high) tuple, inclusive, either end None); missing values never pass.
+    """
+    if op == 'contains':
+        text = series.astype('string') if not isinstance(series.dtype, pd.CategoricalDtype) else series.astype(str).where(series.notna())
+        return text.str.contains(value, case=False, regex=False).fillna(False).to_numpy(dtype=bool)
+    if op == 'in':
+        return series.isin(list(value)).to_numpy(dtype=bool)
+    if op == 'range':
+        low, high = (_bound(series, bound) for bound in value)
+        mask = series.notna()
+        if low is not None:
+            mask &= series >= low
+        if high is not None:
+            mask &= series <= high
+        return mask.fillna(False).to_numpy(dtype=bool)
+    raise ValueError(f"Unknown filter operation: {op}")
+
+
+def _sort_order(series, ascending):
+    try:
+        keys = series.reset_index(drop=True)
+        return keys.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+    except TypeError:
+        # Object columns mixing types (e.g. numbers and text from different pages) sort as text
+        keys = keys.astype(str).where(keys.notna())
+        return keys.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+
+
+class FrameView:
+    """Pages through a DataFrame after filtering and sorting it, so only one window of rows leaves the server.
+
+    filters is a tuple of (column, op, value) as accepted by filter_mask. The matching row positions in
+    sorted order are kept for the last filters and sort, so moving between pages costs only the window.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.positions_key = None
+        self.positions = None
+
+    def rows(self, filters=(), sort_by=None, ascending=True):
+        """Returns the positions of the rows passing every filter, in sorted order."""
+        key = (tuple(filters), sort_by, ascending)
+        if key != self.positions_key:
+            mask = np.ones(len(self.df), dtype=bool)
+            for column, op, value in filters:
+                mask &= filter_mask(self.df[column], op, value)
+            positions = np.flatnonzero(mask)
+            if sort_by is not None:
+                positions = positions[_sort_order(self.df[sort_by].iloc[positions], ascending)]
+            self.positions_key, self.positions = key, positions
+        return self.positions
+
+    def window(self, page=1, page_size=DEFAULT_PAGE_SIZE, filters=(), sort_by=None, ascending=True):
+        """Returns the rows of page (from 1) and how many rows pass the filters."""
+        positions = self.rows(filters, sort_by, ascending)
+        start = (page - 1) * page_size
+        return self.df.iloc[positions[start:start + page_size]], len(positions)
+
+
+def page_count(rows, page_size):
+    return max(1, -(-rows // page_size))
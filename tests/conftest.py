@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+# The resty_* modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resty_mock import MockOrg, MockServer  # noqa: E402
+
+HEADERS = {'Authorization': 'Bearer MOCK!token', 'Content-Type': 'application/json'}
+QUERY_PATH = '/services/data/v62.0/query'
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', "bench: resty_bench cases run small against resty_mock (deselect with -m 'not bench')")
+
+
+@pytest.fixture
+def mock_server():
+    """Returns a function that starts a resty_mock server for MockOrg(**settings); every server is stopped after the test."""
+    servers = []
+
+    def start(**settings):
+        server = MockServer(MockOrg(**settings)).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
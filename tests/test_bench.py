@@ -0,0 +1,30 @@
+import os
+
+import pytest
+
+from resty_bench import BENCHMARKS, METRICS, run_case
+from resty_mock import MockOrg, MockServer
+from resty_sinks import EXPORT_FORMATS
+
+# Small enough for every test run; python -m resty_bench runs the same cases at full size and compares baselines
+RECORDS = int(os.environ.get('RESTY_BENCH_RECORDS', 2000))
+OPTIONS = {'rounds': 1, 'workers': 2, 'chunk_size': max(RECORDS // 4, 1), 'record_width': 2}
+
+pytestmark = pytest.mark.bench
+
+
+@pytest.fixture(scope='module')
+def bench_url():
+    org = MockOrg(records=RECORDS, page_size=max(RECORDS // 4, 1), record_width=OPTIONS['record_width'], job_polls=0,
+                  bulk_chunk_size=max(RECORDS // 2, 1))
+    with MockServer(org) as server:
+        yield server.url
+
+
+@pytest.mark.parametrize('name', list(BENCHMARKS))
+def test_benchmark(bench_url, name):
+    if name == 'export-parquet' and 'Parquet' not in EXPORT_FORMATS:
+        pytest.skip("needs pyarrow")
+    metrics = run_case(name, bench_url, OPTIONS)
+    assert metrics['records'] == RECORDS
+    assert all(metrics[metric] is not None for metric in METRICS)
@@ -0,0 +1,124 @@
+import io
+
+import pandas as pd
+import pytest
+import requests
+
+from resty_bulk import bulk_ingest, count_query, csv_records, is_bulk_compatible, iter_csv_batches, iter_result_chunks_serial, read_ingest_file, run_ingest_job, should_use_bulk
+
+
+class Response:
+    def __init__(self, body=None, text='', headers=None, status_code=200):
+        self.body = body
+        self.text = text
+        self.headers = headers or {}
+        self.status_code = status_code
+
+    def json(self):
+        return self.body
+
+
+class CountClient:
+    """Answers the COUNT() probe with a fixed totalSize."""
+    def __init__(self, total_size):
+        self.total_size = total_size
+        self.queries = []
+
+    def get(self, url, headers=None, params=None):
+        self.queries.append(params['q'])
+        return Response({'totalSize': self.total_size, 'done': True, 'records': []})
+
+
+@pytest.mark.parametrize('query, probe', [
+    ("SELECT Id, Name FROM Account WHERE Name LIKE 'A%'", "SELECT COUNT() FROM Account WHERE Name LIKE 'A%'"),
+    ("SELECT Id FROM Account ORDER BY Name LIMIT 10", "SELECT COUNT() FROM Account LIMIT 10"),
+    ("SELECT Id FROM Account ORDER BY Name", "SELECT COUNT() FROM Account"),
+])
+def test_count_query_keeps_the_filter_and_limit(query, probe):
+    assert count_query(query) == probe
+
+
+@pytest.mark.parametrize('query, compatible', [
+    ("SELECT Id, Account.Name FROM Contact", True),
+    ("SELECT Id, (SELECT Id FROM Contacts) FROM Account", False),
+    ("SELECT Name, COUNT(Id) FROM Account GROUP BY Name", False),
+    ("SELECT Id FROM Account OFFSET 10", False),
+])
+def test_bulk_compatibility(query, compatible):
+    assert is_bulk_compatible(query) is compatible
+
+
+@pytest.mark.parametrize('total_size, use_bulk', [(49999, False), (50000, True)])
+def test_auto_switch_follows_the_count_probe(total_size, use_bulk):
+    client = CountClient(total_size)
+    assert should_use_bulk(client, {}, 'https://org.example.com', '62.0', "SELECT Id FROM Account") == (use_bulk, total_size)
+    assert client.queries == ["SELECT COUNT() FROM Account"]
+
+
+def test_subqueries_never_probe():
+    client = CountClient(10 ** 6)
+    assert should_use_bulk(client, {}, 'https://org.example.com', '62.0', "SELECT Id, (SELECT Id FROM Contacts) FROM Account") == (False, None)
+    assert client.queries == []
+
+
+def test_serial_result_chunks_follow_the_locator():
+    class ChunkClient:
+        def __init__(self):
+            self.locators = []
+
+        def get(self, url, headers=None, params=None):
+            self.locators.append(params.get('locator'))
+            next_locator = {None: 'a', 'a': 'b', 'b': 'null'}[params.get('locator')]
+            return Response(text=f"Id\n{params.get('locator')}\n", headers={'Sforce-Locator': next_locator})
+
+    client = ChunkClient()
+    chunks = list(iter_result_chunks_serial(client, {}, 'https://org.example.com/results', max_records=1))
+    assert [(csv_records(chunk)[0]['Id'], locator) for chunk, locator in chunks] == [('None', 'a'), ('a', 'b'), ('b', None)]
+    assert client.locators == [None, 'a', 'b']
+    # Resuming at a stored locator skips the chunks before it
+    resumed = list(iter_result_chunks_serial(client, {}, 'https://org.example.com/results', max_records=1, locator='b'))
+    assert [csv_records(chunk)[0]['Id'] for chunk, _ in resumed] == ['b']
+
+
+def test_ingest_csv_is_split_under_the_size_cap_with_a_header_each():
+    df = pd.DataFrame({'Name': [f"Account {index:04d}" for index in range(1000)], 'Industry': 'Energy'})
+    batches = list(iter_csv_batches(df, max_bytes=5000, rows_per_slice=100))
+    assert len(batches) > 1
+    assert all(batch.startswith(b'Name,Industry\n') for batch in batches)
+    assert all(len(batch) <= 5000 for batch in batches)
+    rows = pd.concat([pd.read_csv(io.BytesIO(batch), dtype=str) for batch in batches], ignore_index=True)
+    pd.testing.assert_frame_equal(rows, df)
+
+
+@pytest.mark.parametrize('operation, external_id_field', [('merge', None), ('upsert', None)])
+def test_ingest_rejects_bad_operations_before_any_call(operation, external_id_field):
+    with pytest.raises(ValueError):
+        bulk_ingest(None, {}, 'https://org.example.com', '62.0', 'Account', operation, pd.DataFrame({'Name': ['a']}), external_id_field)
+
+
+def test_jsonl_ingest_files_keep_their_values_as_is():
+    upload = io.BytesIO(b'{"Name": "Acme", "External_Id__c": "007"}\n{"Name": "Globex", "External_Id__c": "008"}\n')
+    upload.name = 'accounts.jsonl'
+    df = read_ingest_file(upload)
+    assert df.to_dict('records') == [{'Name': 'Acme', 'External_Id__c': '007'}, {'Name': 'Globex', 'External_Id__c': '008'}]
+
+
+def test_failed_upload_is_reported_even_when_the_abort_fails():
+    class FailingUploadClient:
+        def __init__(self):
+            self.patches = []
+
+        def post(self, url, headers=None, json=None):
+            return Response({'id': '750000000000001', 'state': 'Open'}, status_code=200)
+
+        def request(self, method, url, headers=None, data=None):
+            raise requests.ConnectionError("upload dropped")
+
+        def patch(self, url, headers=None, json=None):
+            self.patches.append(json)
+            raise requests.ConnectionError("abort dropped")
+
+    client = FailingUploadClient()
+    with pytest.raises(requests.ConnectionError, match="upload dropped"):
+        run_ingest_job(client, {}, 'https://org.example.com', '62.0', 'Account', 'insert', b'Name\nAcme\n')
+    assert client.patches == [{'state': 'Aborted'}]
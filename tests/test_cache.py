@@ -0,0 +1,134 @@
+import os
+import threading
+
+import pytest
+
+from conftest import HEADERS as MOCK_HEADERS
+from resty_async import SyncRestyClient
+from resty_cache import CacheEntry, ResponseCache
+from resty_client import RestyClient
+
+INSTANCE_URL = 'https://org.example.com'
+DESCRIBE_URL = INSTANCE_URL + '/services/data/v62.0/sobjects/Account/describe'
+HEADERS = {'Authorization': 'Bearer token'}
+
+
+def fetch(cache, url, status_code=200, content=b'{}', headers=None, request_headers=HEADERS):
+    """Runs one GET through the cache the way a client does; returns (lookup, entry served instead of the response)."""
+    lookup = cache.prepare('GET', url, headers=request_headers)
+    if lookup is None or lookup.hit:
+        return lookup, None
+    return lookup, cache.complete(lookup, status_code, headers or {'ETag': '"v1"'}, content)
+
+
+@pytest.mark.parametrize('path, ttl', [
+    ('/services/data/v62.0/sobjects/Account/describe', 3600),
+    ('/services/data/v62.0/sobjects', 900),
+    ('/services/data/v62.0/limits', 30),
+    ('/services/data/v62.0/query', None),
+    ('/services/data/v62.0/sobjects/Account/001000000000001', None),
+])
+def test_only_metadata_endpoints_are_cached(path, ttl):
+    assert ResponseCache().ttl_for(INSTANCE_URL + path) == ttl
+
+
+def test_stored_response_is_served_then_revalidated():
+    cache = ResponseCache()
+    fetch(cache, DESCRIBE_URL, content=b'{"name": "Account"}')
+    lookup, _ = fetch(cache, DESCRIBE_URL)
+    assert lookup.hit and lookup.entry.content == b'{"name": "Account"}'
+
+    lookup.entry.stored_at -= 2 * lookup.entry.ttl
+    lookup = cache.prepare('GET', DESCRIBE_URL, headers=HEADERS)
+    assert not lookup.hit
+    assert lookup.headers['If-None-Match'] == '"v1"'
+    entry = cache.complete(lookup, 304, {}, b'')
+    assert entry.content == b'{"name": "Account"}' and entry.is_fresh()
+    assert cache.summary()['revalidated'] == 1
+
+
+def test_entries_are_kept_per_user_and_skip_other_methods():
+    cache = ResponseCache()
+    fetch(cache, DESCRIBE_URL)
+    lookup, _ = fetch(cache, DESCRIBE_URL, request_headers={'Authorization': 'Bearer other'})
+    assert not lookup.hit
+    assert cache.prepare('POST', DESCRIBE_URL, headers=HEADERS) is None
+    assert ResponseCache(enabled=False).prepare('GET', DESCRIBE_URL, headers=HEADERS) is None
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ResponseCache(max_entries=2)
+    urls = [INSTANCE_URL + f"/services/data/v62.0/sobjects/{name}/describe" for name in ('Account', 'Contact', 'Lead')]
+    fetch(cache, urls[0])
+    fetch(cache, urls[1])
+    fetch(cache, urls[0])
+    fetch(cache, urls[2])
+    assert cache.summary()['evictions'] == 1
+    assert cache.prepare('GET', urls[0], headers=HEADERS).hit
+    assert cache.prepare('GET', urls[1], headers=HEADERS).entry is None
+
+
+def test_disk_tier_survives_a_new_cache(tmp_path):
+    fetch(ResponseCache(disk_dir=str(tmp_path)), DESCRIBE_URL, content=b'{"name": "Account"}')
+    lookup = ResponseCache(disk_dir=str(tmp_path)).prepare('GET', DESCRIBE_URL, headers=HEADERS)
+    assert lookup.hit and lookup.entry.content == b'{"name": "Account"}'
+    cache = ResponseCache(disk_dir=str(tmp_path))
+    cache.clear()
+    assert cache.prepare('GET', DESCRIBE_URL, headers=HEADERS).entry is None
+
+
+def test_no_cache_requests_skip_the_stored_entry_and_replace_it():
+    cache = ResponseCache()
+    fetch(cache, DESCRIBE_URL, content=b'{"v": 1}')
+    lookup, _ = fetch(cache, DESCRIBE_URL, content=b'{"v": 2}', request_headers=dict(HEADERS, **{'Cache-Control': 'no-cache'}))
+    assert not lookup.hit and 'If-None-Match' not in lookup.headers
+    assert cache.prepare('GET', DESCRIBE_URL, headers=HEADERS).entry.content == b'{"v": 2}'
+
+
+def test_concurrent_disk_writes_keep_metadata_and_body_paired(tmp_path):
+    cache = ResponseCache(disk_dir=str(tmp_path))
+    key = cache.key(DESCRIBE_URL, headers=HEADERS)
+
+    def write(n):
+        for index in range(20):
+            stored_at = n * 1000 + index
+            cache.put(key, CacheEntry(DESCRIBE_URL, 200, {}, str(stored_at).encode() * 1000, 3600, stored_at))
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    entry = ResponseCache(disk_dir=str(tmp_path)).get(key)
+    assert entry.content == str(entry.stored_at).encode() * 1000
+    assert sorted(os.listdir(tmp_path)) == [f"{key}.body", f"{key}.json"]
+
+
+@pytest.mark.parametrize('client_class', [RestyClient, SyncRestyClient])
+def test_clients_serve_hits_and_revalidate_against_the_mock(mock_server, client_class):
+    server = mock_server()
+    path = '/services/data/v62.0/sobjects/Account/describe'
+    cache = ResponseCache()
+    client = client_class(server.url, cache=cache)
+    try:
+        first = client.get(server.url + path, headers=MOCK_HEADERS)
+        second = client.get(server.url + path, headers=MOCK_HEADERS)
+        assert second.headers['X-Resty-Cache'] == 'hit'
+        assert second.json() == first.json()
+        assert server.org.requests_by_path[path] == 1
+
+        # Past its TTL the entry is revalidated with If-None-Match; the mock's 304 renews it
+        for entry in cache.entries.values():
+            entry.stored_at -= 2 * entry.ttl
+        third = client.get(server.url + path, headers=MOCK_HEADERS)
+        assert third.json() == first.json()
+        assert server.org.requests_by_path[path] == 2
+        assert cache.stats['revalidated'] == 1
+        client.get(server.url + path, headers=MOCK_HEADERS)
+        assert server.org.requests_by_path[path] == 2
+
+        # Another user never gets this user's entry
+        client.get(server.url + path, headers=dict(MOCK_HEADERS, Authorization='Bearer other'))
+        assert server.org.requests_by_path[path] == 3
+    finally:
+        client.close()
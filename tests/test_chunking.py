@@ -0,0 +1,136 @@
+import threading
+
+import pytest
+
+import resty_chunking
+from conftest import HEADERS, QUERY_PATH
+from resty_chunking import ChunkFetchError, id_range_query, is_chunkable, iter_chunk_pages, plan_chunks
+from resty_client import RestyClient
+from resty_query import PageFetchError
+from resty_retry import RetryPolicy
+
+LOCATOR = '/services/data/v62.0/query/01gXX0000000001'
+
+
+class PoolClient:
+    pool_size = 4
+
+
+class Response:
+    status_code = 200
+
+    def __init__(self, body):
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+class SampleClient(PoolClient):
+    """Serves the Id sample of total records, in locator pages of batch."""
+    def __init__(self, total, batch):
+        self.total = total
+        self.batch = batch
+        self.queries = []
+
+    def get(self, url, headers=None, params=None):
+        if params:
+            self.queries.append(params['q'])
+            offset = 0
+        else:
+            offset = int(url.rsplit('-', 1)[1])
+        body = {'totalSize': self.total, 'records': [{'Id': f"001{index:015d}"} for index in range(offset, min(offset + self.batch, self.total))]}
+        if offset + self.batch < self.total:
+            body['nextRecordsUrl'] = f"{LOCATOR}-{offset + self.batch}"
+        return Response(body)
+
+
+def fake_pages(failures):
+    """Stands in for iter_pages: two pages per chunk, or the chunk's exception after the first."""
+    def iter_pages(client, url, headers, instance_url, endpoint_path, all_pages, chunk_query):
+        yield [{'Id': f"{chunk_query}-1"}], {}
+        if chunk_query in failures:
+            raise failures[chunk_query]
+        yield [{'Id': f"{chunk_query}-2"}], {}
+    return iter_pages
+
+
+def drain_in_thread(pages):
+    """Consumes pages on a thread so that a hang fails the test instead of blocking it."""
+    outcome = {}
+
+    def run():
+        try:
+            outcome['records'] = [record['Id'] for records, _ in pages for record in records]
+        except Exception as e:
+            outcome['error'] = e
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout=10)
+    assert not thread.is_alive(), "iter_chunk_pages never finished"
+    return outcome
+
+
+def test_only_unordered_unlimited_queries_are_split():
+    assert is_chunkable("SELECT Id FROM Account WHERE Name != null")
+    for query in ("SELECT Id FROM Account ORDER BY Name", "SELECT Id FROM Account LIMIT 10", "SELECT COUNT() FROM Account GROUP BY Name",
+                  "SELECT Id FROM Account OFFSET 5"):
+        assert not is_chunkable(query)
+
+
+def test_id_ranges_keep_the_filter():
+    assert id_range_query("SELECT Id FROM Account WHERE Name = 'a'", '001A', '001B') == \
+        "SELECT Id FROM Account WHERE (Name = 'a') AND Id >= '001A' AND Id < '001B'"
+    assert id_range_query("SELECT Id FROM Account", high='001B') == "SELECT Id FROM Account WHERE Id < '001B'"
+    assert id_range_query("SELECT Id FROM Account") == "SELECT Id FROM Account"
+
+
+def test_plan_samples_one_boundary_per_chunk():
+    client = SampleClient(total=1000, batch=200)
+    total, chunks = plan_chunks(client, {}, 'https://org.example.com', '/services/data/v62.0/query', "SELECT Id, Name FROM Account", chunk_size=300)
+    assert total == 1000
+    assert client.queries == ["SELECT Id FROM Account ORDER BY Id"]
+    assert chunks == [
+        "SELECT Id, Name FROM Account WHERE Id < '001000000000000300'",
+        "SELECT Id, Name FROM Account WHERE Id >= '001000000000000300' AND Id < '001000000000000600'",
+        "SELECT Id, Name FROM Account WHERE Id >= '001000000000000600' AND Id < '001000000000000900'",
+        "SELECT Id, Name FROM Account WHERE Id >= '001000000000000900'",
+    ]
+
+
+def test_small_and_unsplittable_queries_run_as_one_chunk():
+    client = SampleClient(total=100, batch=200)
+    assert plan_chunks(client, {}, 'https://org.example.com', '/q', "SELECT Id FROM Account", chunk_size=300)[1] == ["SELECT Id FROM Account"]
+    assert plan_chunks(client, {}, 'https://org.example.com', '/q', "SELECT Id FROM Account LIMIT 5") == (None, ["SELECT Id FROM Account LIMIT 5"])
+
+
+def test_all_chunks_yield_every_page(monkeypatch):
+    monkeypatch.setattr(resty_chunking, 'iter_pages', fake_pages({}))
+    outcome = drain_in_thread(iter_chunk_pages(PoolClient(), {}, 'http://org', '/query', ['a', 'b', 'c'], 3))
+    assert sorted(outcome['records']) == ['a-1', 'a-2', 'b-1', 'b-2', 'c-1', 'c-2']
+
+
+def test_request_failure_raises_chunk_fetch_error(monkeypatch):
+    error = PageFetchError('next-url', ValueError('boom'))
+    monkeypatch.setattr(resty_chunking, 'iter_pages', fake_pages({'b': error}))
+    outcome = drain_in_thread(iter_chunk_pages(PoolClient(), {}, 'http://org', '/query', ['a', 'b', 'c'], 3))
+    assert isinstance(outcome['error'], ChunkFetchError)
+    assert outcome['error'].chunk_query == 'b'
+
+
+@pytest.mark.parametrize('error', [KeyError('Id'), RuntimeError('bug')])
+def test_other_failures_reach_the_consumer(monkeypatch, error):
+    monkeypatch.setattr(resty_chunking, 'iter_pages', fake_pages({'a': error}))
+    outcome = drain_in_thread(iter_chunk_pages(PoolClient(), {}, 'http://org', '/query', ['a', 'b'], 2))
+    assert outcome['error'] is error
+
+
+def test_mock_chunk_failure_stops_the_fetch(mock_server):
+    server = mock_server(records=500, page_size=50)
+    client = RestyClient(server.url, pool_size=4, retry_policy=RetryPolicy(max_attempts=1))
+    total_size, chunk_queries = plan_chunks(client, HEADERS, server.url, QUERY_PATH, "SELECT Id FROM Account", 100, 4)
+    assert (total_size, len(chunk_queries)) == (500, 5)
+    server.org.error_rate = 1.0
+    outcome = drain_in_thread(iter_chunk_pages(client, HEADERS, server.url, QUERY_PATH, chunk_queries, 4))
+    client.close()
+    assert isinstance(outcome['error'], ChunkFetchError)
@@ -0,0 +1,104 @@
+import csv
+import json
+
+import pytest
+
+import resty_cli
+from resty_mock import MockOrg, MockServer
+from resty_schema import SchemaCache
+
+
+class Response:
+    status_code = 201
+    text = ''
+
+    def json(self):
+        return {'id': '001000000000000001', 'success': True, 'errors': []}
+
+
+class PostClient:
+    def __init__(self):
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs.get('json')))
+        return Response()
+
+
+def run_one(spec, tmp_path, client=None):
+    return resty_cli.run_spec(spec, client, {}, 'http://127.0.0.1:1', '60.0', str(tmp_path), SchemaCache())
+
+
+def test_specs_skip_comments_and_get_ids(tmp_path):
+    path = tmp_path / 'specs.jsonl'
+    path.write_text('# nightly\n\n{"path": "/a"}\n{"id": "b", "path": "/b"}\n')
+    assert [spec['id'] for spec in resty_cli.load_specs(str(path))] == ['request-1', 'b']
+    path.write_text('{"id": "a", "path": "/a"}\n{"id": "a", "path": "/b"}\n')
+    with pytest.raises(ValueError, match='Duplicate spec ids: a'):
+        resty_cli.load_specs(str(path))
+    path.write_text('{"id": "a"}\n')
+    with pytest.raises(ValueError, match='specs.jsonl:1'):
+        resty_cli.load_specs(str(path))
+
+
+def test_format_follows_the_output_extension():
+    assert resty_cli.format_for({'output': 'accounts.csv.gz'}) == 'CSV (gzip)'
+    assert resty_cli.format_for({'output': 'accounts.jsonl'}) == 'JSONL'
+    assert resty_cli.format_for({}) == 'CSV'
+    with pytest.raises(ValueError, match='Unsupported format'):
+        resty_cli.format_for({'format': 'Excel'})
+
+
+def test_query_spec_streams_pages_to_its_output(tmp_path, monkeypatch):
+    pages = [([{'attributes': {'type': 'Account'}, 'Id': str(index)} for index in range(start, start + 2)], {}) for start in (0, 2)]
+    monkeypatch.setattr(resty_cli, 'iter_spec_pages', lambda *args, **kwargs: iter(pages))
+    summary = run_one({'id': 'accounts', 'path': '/services/data/v{version}/query', 'query': 'SELECT Id FROM Account', 'typed': False}, tmp_path)
+    assert (summary['status'], summary['pages'], summary['records'], summary['format']) == ('ok', 2, 4, 'CSV')
+    assert summary['path'] == '/services/data/v60.0/query'
+    with open(summary['output'], newline='', encoding='utf-8') as output:
+        assert [row['Id'] for row in csv.DictReader(output)] == ['0', '1', '2', '3']
+
+
+def test_other_requests_save_the_response_json(tmp_path):
+    client = PostClient()
+    summary = run_one({'id': 'new', 'method': 'POST', 'path': '/services/data/v{version}/sobjects/Account', 'payload': {'Name': 'Acme'}},
+                      tmp_path, client)
+    assert summary['status'] == 'ok' and summary['status_codes'] == {'201': 1}
+    assert client.calls == [('POST', 'http://127.0.0.1:1/services/data/v60.0/sobjects/Account', {'Name': 'Acme'})]
+    with open(summary['output'], encoding='utf-8') as output:
+        assert json.load(output)['success']
+
+
+def test_paged_get_follows_every_page(tmp_path, monkeypatch):
+    pages = [{'items': [{'Id': 1}, {'Id': 2}], 'nextPageUrl': '/services/data/v60.0/items?page=2'},
+             {'items': [{'Id': 3}], 'nextPageUrl': None}]
+
+    def iter_spec_pages(client, headers, instance_url, api_version, endpoint_path, spec, workers, report=None):
+        selected = pages if spec.get('all_pages', True) else pages[:1]
+        return iter([(page['items'], page) for page in selected])
+    monkeypatch.setattr(resty_cli, 'iter_spec_pages', iter_spec_pages)
+
+    summary = run_one({'id': 'items', 'path': '/services/data/v{version}/items'}, tmp_path)
+    assert (summary['status'], summary['pages'], summary['records']) == ('ok', 2, 3)
+    with open(summary['output'], encoding='utf-8') as output:
+        assert json.load(output) == {'items': [{'Id': 1}, {'Id': 2}, {'Id': 3}], 'nextPageUrl': None}
+
+    summary = run_one({'id': 'first', 'path': '/services/data/v{version}/items', 'all_pages': False}, tmp_path)
+    with open(summary['output'], encoding='utf-8') as output:
+        assert json.load(output) == pages[0]
+
+
+def test_unexpected_error_fails_only_its_spec(tmp_path, monkeypatch):
+    def broken_sink(*args, **kwargs):
+        raise KeyError('boom')
+    monkeypatch.setattr(resty_cli, 'export_sink', broken_sink)
+    with MockServer(MockOrg(records=10)) as server:
+        auth_path = tmp_path / 'auth.json'
+        auth_path.write_text(json.dumps(server.auth_json()))
+        spec_path = tmp_path / 'specs.jsonl'
+        spec_path.write_text('{"id": "accounts", "path": "/services/data/v{version}/query", "query": "SELECT Id FROM Account"}\n'
+                             '{"id": "limits", "path": "/services/data/v{version}/limits"}\n')
+        summary = resty_cli.run(resty_cli.parse_args([str(spec_path), '--auth', str(auth_path), '--output-dir', str(tmp_path / 'out')]))
+    statuses = {result['id']: (result['status'], result['error']) for result in summary['requests']}
+    assert statuses == {'accounts': ('error', "KeyError: 'boom'"), 'limits': ('ok', None)}
+    assert (summary['succeeded'], summary['failed']) == (1, 1)
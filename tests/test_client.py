@@ -0,0 +1,21 @@
+import pytest
+import requests
+
+from conftest import HEADERS
+from resty_async import SyncRestyClient
+from resty_client import RestyClient
+
+DESCRIBE_PATH = '/services/data/v62.0/sobjects/Account/describe'
+
+
+@pytest.mark.parametrize('client_class', [RestyClient, SyncRestyClient])
+@pytest.mark.parametrize('timeout', [0.1, (1.0, 0.1)])
+def test_per_request_timeout_is_applied(mock_server, client_class, timeout):
+    server = mock_server(latency=0.5)
+    client = client_class(server.url)
+    try:
+        with pytest.raises(requests.Timeout):
+            client.get(server.url + DESCRIBE_PATH, headers=HEADERS, timeout=timeout)
+        assert client.get(server.url + DESCRIBE_PATH, headers=HEADERS).status_code == 200
+    finally:
+        client.close()
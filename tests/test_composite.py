@@ -0,0 +1,41 @@
+import pytest
+
+from conftest import HEADERS
+from resty_client import RestyClient
+from resty_composite import CompositeRequestBuilder, composite_failures, run_collections
+from resty_mock import DEFAULT_API_VERSION
+
+
+def test_delete_without_ids_lists_the_rows_before_any_call(mock_server):
+    server = mock_server(records=10)
+    client = RestyClient(server.url)
+    records = [{'Id': '001000000000000000'}, {'Name': 'no id'}, {'Id': ''}]
+    with pytest.raises(ValueError, match=r"2 rows have none: 2, 3$"):
+        run_collections(client, HEADERS, server.url, DEFAULT_API_VERSION, 'delete', 'Account', records)
+    assert server.org.request_count == 0
+
+
+def test_long_lists_of_rows_are_cut_short():
+    with pytest.raises(ValueError, match=r"1, 2, 3, 4, 5, 6, 7, 8, 9, 10 and 5 more$"):
+        run_collections(None, HEADERS, '', DEFAULT_API_VERSION, 'update', 'Account', [{'Name': 'x'}] * 15)
+
+
+# A graph that fails is rolled back as a whole, so its successful steps count as failed too
+@pytest.mark.parametrize('graph, failed', [(False, ['missing', 'contact']), (True, ['account', 'missing', 'contact'])])
+def test_failed_steps_are_reported(mock_server, graph, failed):
+    server = mock_server(records=10)
+    client = RestyClient(server.url)
+    builder = CompositeRequestBuilder(DEFAULT_API_VERSION)
+    account = builder.create('Account', 'account', {'Name': 'Acme'})
+    builder.update('Account', '001999999999999999', 'missing', {'Name': 'Gone'})
+    builder.create('Contact', 'contact', {'LastName': 'Smith', 'AccountId': account})
+    responses = builder.send(client, HEADERS, server.url, graph)
+    assert [response['referenceId'] for response in composite_failures(responses)] == failed
+
+
+def test_successful_steps_have_no_failures(mock_server):
+    server = mock_server(records=10)
+    client = RestyClient(server.url)
+    builder = CompositeRequestBuilder(DEFAULT_API_VERSION)
+    builder.create('Account', 'account', {'Name': 'Acme'})
+    assert composite_failures(builder.send(client, HEADERS, server.url, graph=True)) == []
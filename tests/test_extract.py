@@ -0,0 +1,110 @@
+from urllib.parse import urljoin
+
+import pytest
+
+from conftest import HEADERS, QUERY_PATH
+from resty_client import RestyClient
+from resty_extract import ExtractCheckpoint, resume_rest_pages
+from resty_query import PageFetchError, iter_pages
+from resty_retry import RetryPolicy
+
+LOCATOR = '/services/data/v62.0/query/01gXX0000000001'
+QUERY = "SELECT Id, Name FROM Account"
+
+
+def fake_pages(total, batch, start=0):
+    """Yields (records, response JSON) pages of a REST query from offset start."""
+    for offset in range(start, total, batch):
+        body = {'totalSize': total, 'records': [{'attributes': {'type': 'Account'}, 'Id': str(index)} for index in range(offset, min(offset + batch, total))]}
+        if offset + batch < total:
+            body['nextRecordsUrl'] = f"{LOCATOR}-{offset + batch}"
+        yield body['records'], body
+
+
+def test_checkpoint_points_after_the_last_spooled_page(tmp_path):
+    pages = ExtractCheckpoint(str(tmp_path)).spool(fake_pages(500, 100))
+    next(pages)
+    next(pages)
+    pages.close()
+    checkpoint = ExtractCheckpoint(str(tmp_path))
+    assert checkpoint.resumable
+    assert checkpoint.state['next_url'] == f"{LOCATOR}-200"
+    assert checkpoint.state['records'] == 200 and len(checkpoint.state['parts']) == 2
+
+
+def test_rerun_continues_from_the_checkpoint(tmp_path):
+    pages = ExtractCheckpoint(str(tmp_path)).spool(fake_pages(500, 100))
+    next(pages)
+    pages.close()
+    checkpoint = ExtractCheckpoint(str(tmp_path))
+    offset = int(checkpoint.state['next_url'].rsplit('-', 1)[1])
+    for _ in checkpoint.spool(fake_pages(500, 100, start=offset)):
+        pass
+    assert not ExtractCheckpoint(str(tmp_path)).resumable
+    assert checkpoint.frame()['Id'].tolist() == [str(index) for index in range(500)]
+    assert 'attributes' not in checkpoint.frame().columns
+
+
+def test_discard_starts_over(tmp_path):
+    checkpoint = ExtractCheckpoint(str(tmp_path / 'extract'))
+    for _ in checkpoint.spool(fake_pages(50, 100)):
+        pass
+    assert checkpoint.started
+    checkpoint.discard()
+    assert not ExtractCheckpoint(str(tmp_path / 'extract')).started
+
+
+def expected_ids(count):
+    return [f"001{index:015d}" for index in range(count)]
+
+
+def spool_first_pages(server, client, directory, count):
+    """Spools count pages of the query into a checkpoint and stops there, like a run that was interrupted."""
+    checkpoint = ExtractCheckpoint(str(directory))
+    pages = checkpoint.spool(iter_pages(client, server.url + QUERY_PATH, HEADERS, server.url, QUERY_PATH, True, QUERY))
+    for _ in range(count):
+        next(pages)
+    pages.close()
+    return ExtractCheckpoint(str(directory))
+
+
+def resume(server, client, checkpoint, reports):
+    pages = resume_rest_pages(
+        lambda: iter_pages(client, urljoin(server.url, checkpoint.state['next_url']), HEADERS, server.url, QUERY_PATH, True, QUERY),
+        lambda: iter_pages(client, server.url + QUERY_PATH, HEADERS, server.url, QUERY_PATH, True, QUERY),
+        checkpoint.state['records'], reports.append)
+    for _ in checkpoint.spool(pages):
+        pass
+    return checkpoint.frame()['Id'].tolist()
+
+
+def test_resume_continues_from_the_stored_locator(mock_server, tmp_path):
+    server = mock_server(records=500, page_size=100)
+    client = RestyClient(server.url)
+    checkpoint = spool_first_pages(server, client, tmp_path, 2)
+    assert checkpoint.resumable and checkpoint.state['records'] == 200
+    reports = []
+    assert resume(server, client, checkpoint, reports) == expected_ids(500)
+    assert reports == []
+    assert checkpoint.state['done']
+
+
+def test_expired_locator_reruns_the_query_and_skips_spooled_records(mock_server, tmp_path):
+    server = mock_server(records=500, page_size=100)
+    client = RestyClient(server.url, retry_policy=RetryPolicy(max_attempts=1))
+    checkpoint = spool_first_pages(server, client, tmp_path, 2)
+    # The org forgets every open cursor, as it does after about 15 minutes unread
+    server.org.cursors.clear()
+    reports = []
+    assert resume(server, client, checkpoint, reports) == expected_ids(500)
+    assert len(reports) == 1 and 'expired' in reports[0]
+    assert checkpoint.state['done']
+
+
+def test_other_resume_failures_are_raised(mock_server, tmp_path):
+    server = mock_server(records=500, page_size=100)
+    client = RestyClient(server.url, retry_policy=RetryPolicy(max_attempts=1, base_delay=0, jitter=False))
+    checkpoint = spool_first_pages(server, client, tmp_path, 2)
+    server.org.error_rate = 1.0
+    with pytest.raises(PageFetchError):
+        resume(server, client, checkpoint, [])
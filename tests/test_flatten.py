@@ -0,0 +1,112 @@
+import csv
+
+import pytest
+
+from resty_flatten import explode_children, flatten_records, query_fields
+from resty_sinks import CSVSink, DataFrameSink, drain
+
+QUERY = "SELECT Id, Name, Account.Name, Account.Owner.Name, (SELECT LastName FROM Contacts) FROM Opportunity"
+
+
+def account(name):
+    return {'attributes': {'type': 'Account'}, 'Name': name, 'Owner': {'attributes': {'type': 'User'}, 'Name': 'Ann'}}
+
+
+NULL_PAGE = [{'attributes': {'type': 'Opportunity'}, 'Id': '1', 'Name': 'a', 'Account': None, 'Contacts': None},
+             {'attributes': {'type': 'Opportunity'}, 'Id': '2', 'Name': 'b', 'Account': None, 'Contacts': None}]
+FILLED_PAGE = [{'attributes': {'type': 'Opportunity'}, 'Id': '3', 'Name': 'c', 'Account': account('Acme'),
+                'Contacts': {'totalSize': 1, 'done': True, 'records': [{'attributes': {'type': 'Contact'}, 'LastName': 'Lee'}]}}]
+
+
+def test_query_fields_layout():
+    assert query_fields(QUERY) == {'Id': None, 'Name': None, 'Account': {'Name': None, 'Owner': {'Name': None}},
+                                   'Contacts': [{'LastName': None}]}
+    assert query_fields("SELECT Id, TYPEOF What WHEN Account THEN Phone ELSE Name END FROM Event") == {'Id': None, 'What': {'Phone': None, 'Name': None}}
+    assert query_fields("SELECT toLabel(StageName) stage FROM Opportunity") == {'stage': None}
+    assert query_fields("SELECT COUNT(Id) FROM Account") is None
+    assert query_fields("SELECT Name, MAX(Amount) FROM Opportunity GROUP BY Name") is None
+    assert query_fields(None) is None
+
+
+def test_null_relationship_becomes_dotted_columns():
+    frame, children = flatten_records(NULL_PAGE, fields=query_fields(QUERY))
+    assert list(frame.columns) == ['Id', 'Name', 'Account.Name', 'Account.Owner.Name']
+    assert frame['Account.Name'].isna().all()
+    assert list(children['Contacts'].columns[:2]) == ['_parent_row', '_parent_id']
+
+
+def test_pages_without_fields_still_differ():
+    # Without the layout the shape can only come from the data
+    frame, _ = flatten_records(NULL_PAGE)
+    assert 'Account' in frame.columns
+
+
+def test_csv_keeps_relationship_after_null_first_page(tmp_path):
+    path = str(tmp_path / 'out.csv')
+    drain(iter([(NULL_PAGE, {}), (FILLED_PAGE, {})]), CSVSink(path, fields=query_fields(QUERY)))
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert list(rows[0]) == ['Id', 'Name', 'Account.Name', 'Account.Owner.Name']
+    assert [row['Account.Name'] for row in rows] == ['', '', 'Acme']
+
+
+def test_csv_raises_instead_of_dropping_columns(tmp_path):
+    sink = CSVSink(str(tmp_path / 'out.csv'))
+    with pytest.raises(ValueError, match='Account.Name'):
+        drain(iter([(NULL_PAGE, {}), (FILLED_PAGE, {})]), sink)
+
+
+def test_dataframe_matches_csv_columns():
+    sink = DataFrameSink(fields=query_fields(QUERY))
+    drain(iter([(NULL_PAGE, {}), (FILLED_PAGE, {})]), sink)
+    frame = sink.frame()
+    assert list(frame.columns) == ['Id', 'Name', 'Account.Name', 'Account.Owner.Name']
+    assert frame['Account.Name'].tolist()[2] == 'Acme'
+    assert sink.children()['Contacts']['_parent_row'].tolist() == [2]
+
+
+def opportunity(record_id, contacts):
+    return {'attributes': {'type': 'Opportunity'}, 'Id': record_id, 'Amount': 10.0,
+            'Owner': {'attributes': {'type': 'User'}, 'Name': 'Ann', 'Manager': {'attributes': {'type': 'User'}, 'Name': 'Bo'}},
+            'Contacts': {'totalSize': len(contacts), 'done': True,
+                         'records': [{'attributes': {'type': 'Contact'}, 'LastName': name} for name in contacts]} if contacts else None}
+
+
+def test_parents_become_dotted_columns_and_subqueries_child_frames():
+    frame, children = flatten_records([opportunity('006A', ['Lee', 'Kim']), opportunity('006B', [])])
+    assert list(frame.columns) == ['Id', 'Amount', 'Owner.Name', 'Owner.Manager.Name']
+    assert frame['Owner.Manager.Name'].tolist() == ['Bo', 'Bo']
+    contacts = children['Contacts']
+    assert contacts['_parent_row'].tolist() == [0, 0]
+    assert contacts['_parent_id'].tolist() == ['006A', '006A']
+    assert contacts['LastName'].tolist() == ['Lee', 'Kim']
+
+
+def test_child_rows_point_at_parents_across_pages():
+    sink = DataFrameSink()
+    drain(iter([([opportunity('006A', ['Lee'])], {}), ([opportunity('006B', []), opportunity('006C', ['Kim', 'Ng'])], {})]), sink)
+    frame = sink.frame()
+    contacts = sink.children()['Contacts']
+    assert frame.index.tolist() == [0, 1, 2]
+    assert contacts['_parent_row'].tolist() == [0, 2, 2]
+    assert contacts.index.tolist() == [0, 1, 2]
+
+
+def test_explode_keeps_parents_without_children_once():
+    frame, children = flatten_records([opportunity('006A', ['Lee', 'Kim']), opportunity('006B', [])])
+    exploded = explode_children(frame, children, 'Contacts')
+    assert exploded['Id'].tolist() == ['006A', '006A', '006B']
+    assert exploded['Contacts.LastName'].tolist()[:2] == ['Lee', 'Kim']
+    assert exploded['Contacts.LastName'].isna().tolist()[2]
+
+
+def test_nesting_beyond_the_layout_is_kept_whole():
+    record = {'attributes': {'type': 'Account'}, 'Id': '001A',
+              'BillingAddress': {'city': 'Oslo', 'country': 'NO'},
+              'Owner': {'attributes': {'type': 'User'}, 'Name': 'Ann', 'Extra': {'Deep': {'Value': 1}}}}
+    frame, _ = flatten_records([record], fields=query_fields("SELECT Id, BillingAddress, Owner.Name FROM Account"))
+    # One level below the query's own relationships is flattened, for compound address and location fields
+    assert list(frame.columns) == ['Id', 'BillingAddress.city', 'BillingAddress.country', 'Owner.Name', 'Owner.Extra.Deep']
+    assert frame['Owner.Extra.Deep'].tolist() == [{'Value': 1}]
+    frame, _ = flatten_records([record])
+    assert 'Owner.Extra.Deep.Value' in frame.columns
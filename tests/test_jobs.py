@@ -0,0 +1,139 @@
+import os
+import threading
+
+import pandas as pd
+
+from conftest import HEADERS, QUERY_PATH
+from resty_client import RestyClient
+from resty_jobs import JobRunner, fetch_job
+
+
+def test_fetch_job_streams_a_query_into_a_frame(mock_server):
+    server = mock_server(records=250, page_size=100)
+    client = RestyClient(server.url)
+    runner = JobRunner(1)
+    try:
+        spec = {'query': "SELECT Id, Name FROM Account", 'all_pages': True, 'typed': False}
+        job = runner.submit('fetch', 'accounts', fetch_job, client, HEADERS, server.url, '62.0', QUERY_PATH, spec, 1)
+        job.future.result(timeout=30)
+        assert (job.state, job.pages, job.records, job.total) == ('done', 3, 250, 250)
+        assert job.fraction() == 1.0
+        assert len(job.result['df']) == 250
+    finally:
+        runner.shutdown()
+        client.close()
+
+
+def test_cancel_stops_a_running_job_between_pages():
+    runner = JobRunner(1)
+    started = threading.Event()
+
+    def endless(job):
+        started.set()
+        while True:
+            job.check_cancelled()
+            job.cancel_event.wait(0.01)
+
+    try:
+        job = runner.submit('fetch', 'endless', endless)
+        assert started.wait(10)
+        assert runner.cancel(job.id)
+        job.future.result(timeout=10)
+        assert job.state == 'cancelled'
+        assert not runner.cancel(job.id)
+    finally:
+        runner.shutdown()
+
+
+def test_failed_job_keeps_its_error():
+    runner = JobRunner(1)
+
+    def broken(job):
+        raise ValueError('bad query')
+
+    try:
+        job = runner.submit('fetch', 'broken', broken)
+        job.future.result(timeout=10)
+        assert (job.state, job.error) == ('failed', 'bad query')
+        assert runner.remove(job.id)
+        assert runner.get(job.id) is None
+    finally:
+        runner.shutdown()
+
+
+def finish(runner, owner, result):
+    job = runner.submit('fetch', 'test', lambda job: result, owner=owner)
+    job.future.result(timeout=10)
+    return job
+
+
+def test_jobs_are_scoped_to_their_owner():
+    runner = JobRunner(1)
+    try:
+        job = finish(runner, 'alice', {'df': pd.DataFrame({'Id': ['1']})})
+        assert runner.get(job.id, 'alice') is job
+        assert runner.get(job.id, 'bob') is None
+        assert runner.jobs('bob') == []
+        assert not runner.remove(job.id, 'bob')
+        assert runner.remove(job.id, 'alice')
+        assert runner.get(job.id) is None
+    finally:
+        runner.shutdown()
+
+
+def test_spilled_result_is_read_back_and_deleted_on_remove(tmp_path):
+    runner = JobRunner(1)
+    try:
+        df = pd.DataFrame({'Id': ['1', '2'], 'Name': ['a', 'b']})
+        job = finish(runner, 'alice', {'df': df, 'records': 2})
+        job.spill(str(tmp_path))
+        assert job.result is None
+        assert os.path.exists(job.result_path)
+        pd.testing.assert_frame_equal(job.load_result()['df'], df)
+        path = job.result_path
+        assert runner.remove(job.id, 'alice')
+        assert not os.path.exists(path)
+        assert job.load_result() is None
+    finally:
+        runner.shutdown()
+
+
+def test_prune_keeps_finished_jobs_per_owner_and_releases_the_rest(tmp_path):
+    runner = JobRunner(1, keep_finished=2)
+    try:
+        other = finish(runner, 'bob', {'records': 0})
+        jobs = [finish(runner, 'alice', {'records': n}) for n in range(3)]
+        # jobs[0] is already pruned; jobs[1] goes with the next one
+        jobs[1].spill(str(tmp_path))
+        path = jobs[1].result_path
+        finish(runner, 'alice', {'records': 3})
+        assert [job.result['records'] for job in runner.jobs('alice')] == [3, 2]
+        assert not os.path.exists(path)
+        assert runner.jobs('bob') == [other]
+    finally:
+        runner.shutdown()
+
+
+def test_forget_drops_an_owners_jobs_and_the_result_of_a_running_one():
+    runner = JobRunner(2)
+    started, release = threading.Event(), threading.Event()
+
+    def slow(job):
+        started.set()
+        release.wait(10)
+        return {'records': 2}
+
+    try:
+        other = finish(runner, 'bob', {'records': 0})
+        done = finish(runner, 'alice', {'records': 1})
+        running = runner.submit('fetch', 'slow', slow, owner='alice')
+        assert started.wait(10)
+        runner.forget('alice')
+        assert runner.jobs('alice') == []
+        assert done.result is None
+        release.set()
+        running.future.result(timeout=10)
+        assert running.result is None
+        assert runner.jobs('bob') == [other]
+    finally:
+        runner.shutdown()
@@ -0,0 +1,69 @@
+import pytest
+import requests
+
+from conftest import HEADERS
+from resty_cache import ResponseCache
+from resty_client import RestyClient
+from resty_limits import ApiBudgetExhausted, RateLimiter, fetch_api_limits, parse_limit_info
+
+
+def test_limit_info_header_is_parsed():
+    assert parse_limit_info('api-usage=1234/15000') == (1234, 15000)
+    assert parse_limit_info(None) is None
+
+
+def test_token_bucket_waits_once_burst_is_spent():
+    limiter = RateLimiter(rate=10, burst=2)
+    delays = [limiter.take() for _ in range(3)]
+    assert delays[:2] == [0.0, 0.0]
+    assert delays[2] == pytest.approx(0.1, abs=0.02)
+
+
+def test_rate_scales_down_near_reserve():
+    limiter = RateLimiter(rate=20, reserve_percent=10, slowdown_window=1000)
+    limiter.observe(used=8000, maximum=10000)
+    assert limiter.current_rate() == 20
+    # 1,500 left, 1,000 of them reserved: half the slowdown window remains
+    limiter.observe(used=8500, maximum=10000)
+    assert limiter.current_rate() == pytest.approx(10)
+    limiter.observe(used=9000, maximum=10000)
+    with pytest.raises(ApiBudgetExhausted):
+        limiter.take()
+
+
+def test_reserve_is_enforced_with_throttling_off():
+    limiter = RateLimiter(reserve_percent=10, enabled=False)
+    response = requests.Response()
+    response.headers['Sforce-Limit-Info'] = 'api-usage=899/1000'
+    limiter.observe_response(response)
+    assert limiter.take() == 0.0
+    with pytest.raises(ApiBudgetExhausted):
+        limiter.take()
+
+
+def test_client_reads_usage_and_refuses_at_reserve(mock_server):
+    server = mock_server()
+    limiter = RateLimiter(reserve_percent=10)
+    client = RestyClient(server.url, limiter=limiter)
+    try:
+        client.get(server.url + '/services/data/v62.0/limits', headers=HEADERS)
+        assert limiter.used == server.org.request_count
+        limiter.observe(used=limiter.maximum - limiter.reserve, maximum=limiter.maximum)
+        sent = server.org.request_count
+        with pytest.raises(ApiBudgetExhausted):
+            client.get(server.url + '/services/data/v62.0/limits', headers=HEADERS)
+        assert server.org.request_count == sent
+    finally:
+        client.close()
+
+
+def test_api_limits_bypass_the_response_cache(mock_server):
+    server = mock_server()
+    client = RestyClient(server.url, cache=ResponseCache())
+    try:
+        first = fetch_api_limits(client, HEADERS, server.url, '62.0')
+        second = fetch_api_limits(client, HEADERS, server.url, '62.0')
+        assert server.org.requests_by_path['/services/data/v62.0/limits'] == 2
+        assert second[0] > first[0]
+    finally:
+        client.close()
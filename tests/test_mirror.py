@@ -0,0 +1,143 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from conftest import HEADERS, QUERY_PATH
+from resty_client import RestyClient
+from resty_mirror import MirrorSink, ObjectMirror, delta_query, finish_sync, mirror_query, plan_sync
+from resty_mock import DEFAULT_API_VERSION
+from resty_query import PageFetchError, iter_pages
+from resty_retry import RetryPolicy
+
+SINCE = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def account(index, stamp='2024-05-01T10:00:00.000+0000', **fields):
+    return dict({'attributes': {'type': 'Account'}, 'Id': f"001{index:015d}", 'Name': f"Account {index}", 'SystemModstamp': stamp,
+                 'Owner': {'attributes': {'type': 'User'}, 'Name': 'Ann'}}, **fields)
+
+
+class Response:
+    status_code = 200
+
+    def __init__(self, body):
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+class DeletedClient:
+    """Answers getDeleted with a fixed list of Ids."""
+    def __init__(self, ids):
+        self.ids = ids
+        self.params = []
+
+    def get(self, url, headers=None, params=None):
+        self.params.append(params)
+        return Response({'deletedRecords': [{'id': record_id} for record_id in self.ids], 'latestDateCovered': '2024-05-02T00:00:00.000+0000'})
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    mirror = ObjectMirror(str(tmp_path / 'mirror.db'))
+    yield mirror
+    mirror.close()
+
+
+def test_mirror_query_adds_the_key_and_watermark_fields():
+    assert mirror_query("SELECT Name FROM Account") == "SELECT Id, SystemModstamp, Name FROM Account"
+    assert mirror_query("SELECT Id, Name, SystemModstamp FROM Account") == "SELECT Id, Name, SystemModstamp FROM Account"
+    with pytest.raises(ValueError):
+        mirror_query("Account")
+    with pytest.raises(ValueError, match='LIMIT'):
+        mirror_query("SELECT Id FROM Account LIMIT 10")
+
+
+def test_delta_query_adds_the_watermark_and_reads_every_change_oldest_first():
+    assert delta_query("SELECT Id FROM Account", SINCE) == \
+        "SELECT Id FROM Account WHERE SystemModstamp > 2024-05-01T12:00:00Z ORDER BY SystemModstamp"
+    assert delta_query("SELECT Id FROM Account WHERE Name = 'a' OR Name = 'b'", SINCE) == \
+        "SELECT Id FROM Account WHERE (Name = 'a' OR Name = 'b') AND SystemModstamp > 2024-05-01T12:00:00Z ORDER BY SystemModstamp"
+    assert delta_query("SELECT Id FROM Account ORDER BY Name DESC LIMIT 10 OFFSET 5", SINCE) == \
+        "SELECT Id FROM Account WHERE SystemModstamp > 2024-05-01T12:00:00Z ORDER BY SystemModstamp"
+
+
+def test_upsert_replaces_rows_by_id_and_adds_columns(mirror):
+    mirror.upsert('Account', [account(0), account(1)])
+    mirror.upsert('Account', [account(1, Name='Renamed', Industry='Energy')])
+    rows = mirror.query('SELECT "Id", "Name", "Owner.Name", "Industry" FROM "Account" ORDER BY "Id"')
+    assert rows['Name'].tolist() == ['Account 0', 'Renamed']
+    assert rows['Owner.Name'].tolist() == ['Ann', 'Ann']
+    assert rows['Industry'].tolist()[1] == 'Energy'
+    assert mirror.delete('Account', [account(0)['Id']]) == 1
+    assert mirror.row_count('Account') == 1
+
+
+def test_second_sync_is_a_delta_that_applies_deletions(mirror):
+    query = "SELECT Name FROM Account"
+    sobject, soql, previous = plan_sync(mirror, query)
+    assert (sobject, previous) == ('Account', None)
+    sink = MirrorSink(mirror, sobject, staged=True)
+    sink.write([account(0), account(1, '2024-05-01T11:00:00.000+0000')])
+    state, warning = finish_sync(DeletedClient([]), {}, 'https://org.example.com', '62.0', mirror, sobject, query, sink, SINCE, previous)
+    assert state['mode'] == 'full' and state['watermark'] == '2024-05-01T11:00:00Z' and warning is None
+
+    _, soql, previous = plan_sync(mirror, query)
+    assert soql.endswith("WHERE SystemModstamp > 2024-05-01T10:59:00Z ORDER BY SystemModstamp")
+    client = DeletedClient([account(0)['Id']])
+    state, _ = finish_sync(client, {}, 'https://org.example.com', '62.0', mirror, sobject, query, MirrorSink(mirror, sobject), SINCE, previous)
+    assert state['mode'] == 'delta' and state['deleted'] == 1
+    assert mirror.row_count('Account') == 1
+    assert mirror.sync_status()['rows'].tolist() == [1]
+    # The stored query is the mirrored one, so the next run is a delta again
+    assert plan_sync(mirror, query)[2] is not None
+
+
+def sync(server, client, mirror, query, full_reload=False):
+    """Runs one sync of query against the mock the way the app does; returns (state, warning)."""
+    started_at = datetime.now(timezone.utc)
+    sobject, sync_query, previous = plan_sync(mirror, query, full_reload)
+    sink = MirrorSink(mirror, sobject, staged=previous is None)
+    for records, _ in iter_pages(client, server.url + QUERY_PATH, HEADERS, server.url, QUERY_PATH, True, sync_query):
+        sink.write(records)
+    return finish_sync(client, HEADERS, server.url, DEFAULT_API_VERSION, mirror, sobject, query, sink, started_at, previous)
+
+
+def mirrored_ids(mirror):
+    return mirror.query('SELECT "Id" FROM "Account" ORDER BY "Id"')['Id'].tolist()
+
+
+def test_mock_sync_loads_then_applies_changes_and_deletions(mock_server, mirror):
+    server = mock_server(records=50, page_size=20)
+    client = RestyClient(server.url)
+    query = "SELECT Name, Owner.Name FROM Account"
+    state, warning = sync(server, client, mirror, query)
+    assert state['mode'] == 'full' and state['upserted'] == 50 and warning is None
+    ids = mirrored_ids(mirror)
+    assert ids == server.org.all_ids('Account')
+
+    server.org.update('Account', ids[3], {'Name': 'Renamed'})
+    server.org.delete('Account', ids[7])
+    state, warning = sync(server, client, mirror, query)
+    # The last generated record sits inside the overlap, so it is read again with the changed one
+    assert state['mode'] == 'delta' and state['upserted'] == 2 and state['deleted'] == 1 and warning is None
+    assert mirrored_ids(mirror) == [record_id for record_id in ids if record_id != ids[7]]
+    names = mirror.query(f"SELECT \"Name\" FROM \"Account\" WHERE \"Id\" = '{ids[3]}'")['Name'].tolist()
+    assert names == ['Renamed']
+
+
+def test_failed_mock_full_reload_keeps_the_mirror(mock_server, mirror):
+    server = mock_server(records=50, page_size=20)
+    client = RestyClient(server.url, retry_policy=RetryPolicy(max_attempts=1, base_delay=0, jitter=False))
+    query = "SELECT Name FROM Account"
+    before, _ = sync(server, client, mirror, query)
+    server.org.error_rate = 1.0
+    with pytest.raises(PageFetchError):
+        sync(server, client, mirror, query, full_reload=True)
+    assert mirrored_ids(mirror) == server.org.all_ids('Account')
+    assert mirror.state('Account') == before
+    # The next attempt starts from a fresh staging table
+    server.org.error_rate = 0.0
+    state, _ = sync(server, client, mirror, query, full_reload=True)
+    assert state['mode'] == 'full' and mirror.row_count('Account') == 50
@@ -0,0 +1,57 @@
+import json
+
+import pandas as pd
+
+from resty_client import RestyClient
+from resty_orgs import fan_out, fetch_org, load_profiles, merge_org_frames
+
+
+def write_profile(directory, file_name, server, alias=None):
+    auth = server.auth_json()
+    if alias:
+        auth['result']['alias'] = alias
+    (directory / file_name).write_text(json.dumps(auth))
+
+
+def test_profiles_are_named_and_bad_files_skipped(tmp_path, mock_server):
+    server = mock_server(records=1)
+    write_profile(tmp_path, 'a.json', server, alias='prod')
+    write_profile(tmp_path, 'b.json', server)
+    write_profile(tmp_path, 'c.json', server)
+    (tmp_path / 'broken.json').write_text('{')
+    (tmp_path / 'notes.txt').write_text('ignored')
+    profiles, skipped = load_profiles(str(tmp_path))
+    assert [profile['name'] for profile in profiles] == ['prod', 'mock@example.com', 'mock@example.com (c.json)']
+    assert [file_name for file_name, _ in skipped] == ['broken.json']
+
+
+def test_query_fans_out_and_merges_with_an_org_column(tmp_path, mock_server):
+    servers = {'one': mock_server(records=120, page_size=50), 'two': mock_server(records=30, page_size=50)}
+    for name, server in servers.items():
+        write_profile(tmp_path, f"{name}.json", server, alias=name)
+    profiles, _ = load_profiles(str(tmp_path))
+    # One org stops answering; the other still finishes
+    servers['two'].org.error_rate = 1.0
+    clients = {profile['name']: RestyClient(profile['instance_url']) for profile in profiles}
+    spec = {'query': "SELECT Id, Name FROM Account", 'all_pages': True, 'typed': False}
+    try:
+        outcomes = {profile['name']: (result, error) for profile, result, error, _ in
+                    fan_out(profiles, lambda profile: fetch_org(profile, clients[profile['name']], '/services/data/v{version}/query', spec))}
+    finally:
+        for client in clients.values():
+            client.close()
+    result, error = outcomes['one']
+    assert error is None and (result['records'], result['pages']) == (120, 3)
+    assert outcomes['two'][0] is None and outcomes['two'][1] is not None
+
+    merged = merge_org_frames({'one': result['df'], 'two': result['df'].head(2)})
+    assert merged.columns[0] == 'org'
+    assert merged['org'].tolist().count('two') == 2 and len(merged) == 122
+
+
+def test_picklists_stay_categorical_across_orgs():
+    merged = merge_org_frames({'a': pd.DataFrame({'Stage': pd.Categorical(['Won'])}),
+                               'b': pd.DataFrame({'Stage': pd.Categorical(['Lost'])}),
+                               'c': pd.DataFrame()})
+    assert isinstance(merged['Stage'].dtype, pd.CategoricalDtype)
+    assert merged['org'].tolist() == ['a', 'b']
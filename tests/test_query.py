@@ -0,0 +1,114 @@
+from urllib.parse import urljoin
+
+import pytest
+
+from conftest import HEADERS
+from resty_async import SyncRestyClient
+from resty_client import RestyClient
+from resty_query import PageFetchError, iter_pages, locator_page_urls, parse_query_locator
+from resty_retry import RetryPolicy
+
+LOCATOR = '/services/data/v62.0/query/01gXX0000000001'
+INSTANCE_URL = 'https://org.example.com'
+QUERY_PATH = '/services/data/v62.0/query'
+
+
+class Response:
+    def __init__(self, body, status_code=200):
+        self.body = body
+        self.status_code = status_code
+        self.text = str(body)
+        self.headers = {}
+
+    def json(self):
+        return self.body
+
+
+class QueryClient:
+    """Serves a query of total records in pages of batch, with locator URLs like the REST API's."""
+    pool_size = 4
+
+    def __init__(self, total, batch, failing=()):
+        self.total = total
+        self.batch = batch
+        self.failing = set(failing)
+        self.urls = []
+
+    def get(self, url, headers=None, params=None):
+        self.urls.append(url)
+        offset = 0 if params else int(url.rsplit('-', 1)[1])
+        if offset in self.failing:
+            return Response([{'errorCode': 'SERVER_UNAVAILABLE', 'message': 'busy'}], 503)
+        body = {'totalSize': self.total, 'done': offset + self.batch >= self.total,
+                'records': [{'Id': str(index)} for index in range(offset, min(offset + self.batch, self.total))]}
+        if not body['done']:
+            body['nextRecordsUrl'] = f"{LOCATOR}-{offset + self.batch}"
+        return Response(body)
+
+
+def expected_ids(count):
+    return [f"001{index:015d}" for index in range(count)]
+
+
+def record_ids(pages):
+    return [record['Id'] for records, _ in pages for record in records]
+
+
+def test_locator_is_split_into_prefix_id_and_offset():
+    assert parse_query_locator(f"{LOCATOR}-2000") == ('/services/data/v62.0/query/', '01gXX0000000001', 2000)
+    assert parse_query_locator('/services/data/v62.0/sobjects/Account') is None
+
+
+@pytest.mark.parametrize('total, offsets', [(4500, [2000, 4000]), (2000, []), (2001, [2000])])
+def test_remaining_page_urls_step_by_the_first_batch(total, offsets):
+    assert locator_page_urls(f"{LOCATOR}-2000", total) == [f"{LOCATOR}-{offset}" for offset in offsets]
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_pages_come_back_in_order(workers):
+    client = QueryClient(total=1000, batch=100)
+    pages = iter_pages(client, INSTANCE_URL + QUERY_PATH, {}, INSTANCE_URL, QUERY_PATH, True, "SELECT Id FROM Account", workers)
+    assert record_ids(pages) == [str(index) for index in range(1000)]
+    assert len(client.urls) == 10
+
+
+def test_resume_from_failed_page():
+    client = QueryClient(total=500, batch=100, failing={200})
+    pages = iter_pages(client, INSTANCE_URL + QUERY_PATH, {}, INSTANCE_URL, QUERY_PATH, True, "SELECT Id FROM Account")
+    fetched = record_ids([next(pages), next(pages)])
+    with pytest.raises(PageFetchError) as failure:
+        next(pages)
+    assert failure.value.resume_url == f"{INSTANCE_URL}{LOCATOR}-200"
+    client.failing.clear()
+    resumed = iter_pages(client, failure.value.resume_url, {}, INSTANCE_URL, QUERY_PATH, True, "SELECT Id FROM Account")
+    assert fetched + record_ids(resumed) == [str(index) for index in range(500)]
+
+
+@pytest.mark.parametrize('client_class', [RestyClient, SyncRestyClient])
+@pytest.mark.parametrize('workers', [1, 4])
+def test_pages_in_order_without_duplicates_under_503s(mock_server, client_class, workers):
+    server = mock_server(records=1000, page_size=100, error_rate=0.3, seed=7)
+    client = client_class(server.url, pool_size=4, retry_policy=RetryPolicy(max_attempts=30, base_delay=0, jitter=False))
+    try:
+        pages = iter_pages(client, server.url + QUERY_PATH, HEADERS, server.url, QUERY_PATH, True, "SELECT Id, Name FROM Account", workers)
+        assert record_ids(pages) == expected_ids(1000)
+    finally:
+        client.close()
+    # The 503s really happened and were retried
+    assert server.org.request_count > 10
+
+
+def test_resume_from_a_failed_mock_page(mock_server):
+    server = mock_server(records=500, page_size=100)
+    client = RestyClient(server.url, retry_policy=RetryPolicy(max_attempts=2, base_delay=0, jitter=False))
+    query = "SELECT Id, Name FROM Account"
+    pages = iter_pages(client, server.url + QUERY_PATH, HEADERS, server.url, QUERY_PATH, True, query)
+    fetched = record_ids([next(pages), next(pages)])
+    server.org.error_rate = 1.0
+    with pytest.raises(PageFetchError) as failure:
+        next(pages)
+    assert failure.value.resume_url.endswith('-200')
+    server.org.error_rate = 0.0
+    resumed = iter_pages(client, urljoin(server.url, failure.value.resume_url), HEADERS, server.url, QUERY_PATH, True, query)
+    assert fetched + record_ids(resumed) == expected_ids(500)
+    client.close()
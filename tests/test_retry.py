@@ -0,0 +1,45 @@
+import json
+
+import pytest
+import requests
+
+from resty_retry import RetryPolicy
+
+
+def response(status_code, body=None, retry_after=None):
+    result = requests.Response()
+    result.status_code = status_code
+    result._content = json.dumps(body).encode('utf-8') if body is not None else b''
+    if retry_after is not None:
+        result.headers['Retry-After'] = retry_after
+    return result
+
+
+def test_retry_backoff_honours_retry_after():
+    policy = RetryPolicy(base_delay=0.5, max_delay=4, jitter=False)
+    assert [policy.backoff(attempt) for attempt in (1, 2, 3, 4, 5)] == [0.5, 1, 2, 4, 4]
+    assert policy.backoff(1, response(503, retry_after='3')) == 3
+
+
+@pytest.mark.parametrize('method, status_code, body, retried', [
+    ('GET', 500, None, True),
+    ('POST', 500, None, False),
+    ('POST', 503, None, True),
+    ('POST', 400, [{'errorCode': 'UNABLE_TO_LOCK_ROW', 'message': 'locked'}], True),
+    ('GET', 400, [{'errorCode': 'MALFORMED_QUERY', 'message': 'bad'}], False),
+])
+def test_only_safe_requests_are_retried(method, status_code, body, retried):
+    assert RetryPolicy().should_retry_response(method, response(status_code, body), 1) is retried
+
+
+def test_attempts_are_capped():
+    policy = RetryPolicy(max_attempts=3)
+    assert policy.should_retry_response('GET', response(503), 2)
+    assert not policy.should_retry_response('GET', response(503), 3)
+
+
+def test_post_is_retried_only_when_the_connect_failed():
+    policy = RetryPolicy()
+    assert policy.should_retry_error('POST', requests.ConnectTimeout(), 1)
+    assert not policy.should_retry_error('POST', requests.ReadTimeout(), 1)
+    assert policy.should_retry_error('GET', requests.ReadTimeout(), 1)
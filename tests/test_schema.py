@@ -0,0 +1,124 @@
+import pandas as pd
+
+from resty_bulk import sobject_from_soql
+from resty_engine import schema_resolver
+from resty_flatten import query_fields
+from resty_schema import SchemaCache, SObjectSchema
+from resty_sinks import TypedDataFrameSink
+
+DESCRIBE = {
+    'name': 'Account',
+    'fields': [
+        {'name': 'Id', 'type': 'id'},
+        {'name': 'NumberOfEmployees', 'type': 'int'},
+        {'name': 'AnnualRevenue', 'type': 'currency'},
+        {'name': 'IsDeleted', 'type': 'boolean'},
+        {'name': 'CreatedDate', 'type': 'datetime'},
+        {'name': 'LastActivityDate', 'type': 'date'},
+        {'name': 'Industry', 'type': 'picklist', 'picklistValues': [{'value': 'Energy'}, {'value': 'Retail'}]},
+    ],
+}
+
+
+OPPORTUNITY_DESCRIBE = {
+    'name': 'Opportunity',
+    'fields': [
+        {'name': 'Id', 'type': 'id'},
+        {'name': 'Amount', 'type': 'currency'},
+        {'name': 'AccountId', 'type': 'reference', 'relationshipName': 'Account', 'referenceTo': ['Account']},
+        {'name': 'OwnerId', 'type': 'reference', 'relationshipName': 'Owner', 'referenceTo': ['Group', 'User']},
+    ],
+}
+
+
+class Response:
+    status_code = 200
+
+    def __init__(self, body=DESCRIBE):
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+class DescribeClient:
+    def __init__(self):
+        self.urls = []
+
+    def get(self, url, headers=None, params=None):
+        self.urls.append(url)
+        return Response(OPPORTUNITY_DESCRIBE if '/Opportunity/' in url else DESCRIBE)
+
+
+def test_columns_get_the_dtype_of_their_field():
+    schema = SObjectSchema.from_describe(DESCRIBE)
+    df = schema.frame([
+        {'Id': '001A', 'NumberOfEmployees': 10, 'AnnualRevenue': 1.5, 'IsDeleted': False, 'CreatedDate': '2024-01-02T03:04:05.000+0000',
+         'LastActivityDate': '2024-01-02', 'Industry': 'Energy'},
+        {'Id': '001B', 'NumberOfEmployees': None, 'AnnualRevenue': None, 'IsDeleted': None, 'CreatedDate': None,
+         'LastActivityDate': None, 'Industry': 'Mining'},
+    ])
+    assert str(df['NumberOfEmployees'].dtype) == 'Int64' and df['NumberOfEmployees'].isna().tolist() == [False, True]
+    assert df['AnnualRevenue'].dtype == 'float64'
+    assert str(df['IsDeleted'].dtype) == 'boolean'
+    assert isinstance(df['CreatedDate'].dtype, pd.DatetimeTZDtype) and str(df['CreatedDate'].dt.tz) == 'UTC'
+    assert pd.api.types.is_datetime64_dtype(df['LastActivityDate'])
+    # Values the describe does not list, such as inactive picklist entries, are kept after the known ones
+    assert list(df['Industry'].cat.categories) == ['Energy', 'Retail', 'Mining']
+    assert df['Id'].tolist() == ['001A', '001B']
+
+
+def test_bulk_csv_empty_strings_are_nulls_and_case_is_ignored():
+    schema = SObjectSchema.from_describe(DESCRIBE)
+    df = schema.frame([{'numberofemployees': '', 'isdeleted': 'true'}, {'numberofemployees': '7', 'isdeleted': 'false'}])
+    assert df['numberofemployees'].tolist() == [pd.NA, 7]
+    assert df['isdeleted'].tolist() == [True, False]
+
+
+def test_schema_cache_describes_each_object_once():
+    client = DescribeClient()
+    cache = SchemaCache()
+    for _ in range(3):
+        schema = cache.get(client, {}, 'https://org.example.com/', '62.0', 'Account')
+    assert schema.kind('industry') == 'category'
+    assert client.urls == ['https://org.example.com/services/data/v62.0/sobjects/Account/describe']
+
+
+def test_typed_sink_restores_categoricals_across_pages():
+    resolved = []
+
+    def resolve_schema(sobject):
+        resolved.append(sobject)
+        return SObjectSchema.from_describe(DESCRIBE)
+
+    sink = TypedDataFrameSink(resolve_schema=resolve_schema)
+    sink.write([{'attributes': {'type': 'Account'}, 'Id': '001A', 'Industry': 'Energy'}])
+    sink.write([{'attributes': {'type': 'Account'}, 'Id': '001B', 'Industry': 'Retail'}])
+    df = sink.frame()
+    assert resolved == ['Account']
+    assert isinstance(df['Industry'].dtype, pd.CategoricalDtype)
+    assert df['Industry'].tolist() == ['Energy', 'Retail']
+
+
+def test_dotted_columns_are_typed_from_the_related_describe():
+    query = "SELECT Id, Amount, Account.AnnualRevenue, Account.Industry, Owner.Name FROM Opportunity"
+    client = DescribeClient()
+    resolve = schema_resolver(client, {}, 'https://org.example.com', '62.0', query, SchemaCache())
+    sink = TypedDataFrameSink(resolve_schema=resolve, fields=query_fields(query))
+    owner = {'attributes': {'type': 'User'}, 'Name': 'Ann'}
+    sink.write([{'attributes': {'type': 'Opportunity'}, 'Id': '006A', 'Amount': 5,
+                 'Account': {'attributes': {'type': 'Account'}, 'AnnualRevenue': 1.5, 'Industry': 'Energy'}, 'Owner': owner},
+                {'attributes': {'type': 'Opportunity'}, 'Id': '006B', 'Amount': None, 'Account': None, 'Owner': owner}])
+    df = sink.frame()
+    assert list(df.columns) == ['Id', 'Amount', 'Account.AnnualRevenue', 'Account.Industry', 'Owner.Name']
+    assert df['Amount'].dtype == 'float64' and df['Account.AnnualRevenue'].dtype == 'float64'
+    assert list(df['Account.Industry'].cat.categories) == ['Energy', 'Retail']
+    assert df['Account.Industry'].isna().tolist() == [False, True]
+    # Owner can be a User or a Group, so its columns are left untyped and neither is described
+    assert df['Owner.Name'].tolist() == ['Ann', 'Ann']
+    assert [url.rsplit('/', 2)[1] for url in client.urls] == ['Opportunity', 'Account']
+
+
+def test_sobject_is_read_from_the_top_level_from():
+    assert sobject_from_soql("SELECT Id, (SELECT Id FROM Contacts) FROM Account WHERE Name != 'FROM x'") == 'Account'
+    assert sobject_from_soql("SELECT COUNT() FROM opportunity") == 'opportunity'
@@ -0,0 +1,92 @@
+import io
+import json
+
+import pandas as pd
+
+from resty_session import SessionCache, frame_bytes, spec_key
+
+AUTH = {'result': {'instanceUrl': 'https://one.example.com', 'accessToken': 'token', 'apiVersion': '62.0'}}
+
+
+class Upload(io.BytesIO):
+    """Stands in for a Streamlit UploadedFile."""
+
+
+def upload(auth):
+    return Upload(json.dumps(auth).encode('utf-8'))
+
+
+def frame(rows):
+    return pd.DataFrame({'Id': [f"001{index:015d}" for index in range(rows)]})
+
+
+def test_spec_key_ignores_argument_order():
+    assert spec_key(endpoint='/query', soql='SELECT Id FROM Account') == spec_key(soql='SELECT Id FROM Account', endpoint='/query')
+    assert spec_key(endpoint='/query', all_pages=True) != spec_key(endpoint='/query', all_pages=False)
+
+
+def test_results_are_served_until_evicted_least_recently_used_first():
+    size = frame_bytes(frame(100))
+    cache = SessionCache(max_bytes=int(size * 2.5))
+    for name in ('a', 'b'):
+        cache.put(name, frame(100), {}, {}, instance_url='https://one.example.com')
+    assert cache.get('a') is not None
+    cache.put('c', frame(100), {}, {}, instance_url='https://one.example.com')
+    assert list(cache.results) == ['a', 'c']
+    assert cache.get('b') is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.put('huge', frame(1000), {}, {}) is None
+
+
+def test_exports_are_built_once():
+    cache = SessionCache()
+    entry = cache.put('a', frame(10), {}, {})
+    builds = []
+
+    def build():
+        builds.append(1)
+        return b'Id\n'
+
+    assert cache.export(entry, 'CSV', build) == cache.export(entry, 'CSV', build) == b'Id\n'
+    assert len(builds) == 1
+
+
+def test_invalidate_by_org_or_key():
+    cache = SessionCache()
+    cache.put('a', frame(1), {}, {}, instance_url='https://one.example.com')
+    cache.put('b', frame(1), {}, {}, instance_url='https://two.example.com')
+    cache.put('c', frame(1), {}, {}, instance_url='https://one.example.com')
+    assert cache.invalidate(instance_url='https://one.example.com') == 2
+    assert cache.invalidate(key='b') == 1
+    assert cache.results == {}
+
+
+def test_a_write_to_any_org_drops_a_multi_org_result():
+    cache = SessionCache()
+    cache.put('orgs', frame(2), {}, {}, instance_urls=['https://one.example.com', 'https://two.example.com'])
+    cache.put('three', frame(1), {}, {}, instance_url='https://three.example.com')
+    assert cache.invalidate(instance_url='https://two.example.com') == 1
+    assert list(cache.results) == ['three']
+
+
+def test_credentials_are_parsed_once_and_another_login_drops_results():
+    cache = SessionCache()
+    credentials = cache.credentials_for(upload(AUTH))
+    assert cache.credentials_for(upload(AUTH)) is credentials
+    cache.put('a', frame(1), {}, {})
+    other = {'result': dict(AUTH['result'], instanceUrl='https://two.example.com')}
+    cache.credentials_for(upload(other))
+    assert cache.results == {}
+
+
+def test_client_is_rebuilt_only_when_the_settings_change():
+    cache = SessionCache()
+    built = []
+
+    def factory():
+        built.append(object())
+        return built[-1]
+
+    assert cache.client_for(('requests', 8), factory) is cache.client_for(('requests', 8), factory)
+    cache.client_for(('httpx', 8), factory)
+    assert len(built) == 2
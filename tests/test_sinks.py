@@ -0,0 +1,143 @@
+import copy
+import gzip
+import io
+
+import pandas as pd
+import pytest
+
+from conftest import HEADERS, QUERY_PATH
+from resty_client import RestyClient
+from resty_flatten import flatten_frame, query_fields
+from resty_query import iter_pages
+from resty_schema import SObjectSchema
+from resty_sinks import EXPORT_FORMATS, ArrowIPCSink, DataFrameSink, ParquetSink, drain, export_sink, zstandard
+from test_flatten import FILLED_PAGE, NULL_PAGE, QUERY
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+needs_pyarrow = pytest.mark.skipif(pa is None, reason="needs pyarrow")
+MOCK_QUERY = "SELECT Id, Name, AnnualRevenue, IsActive__c, Owner.Name FROM Account"
+
+
+def account(index):
+    return {'attributes': {'type': 'Account'}, 'Id': f"001{index:015d}", 'Name': f"Account {index}", 'AnnualRevenue': index * 1.5,
+            'Owner': {'attributes': {'type': 'User'}, 'Name': f"Owner {index % 3}"}}
+
+
+PAGES = [([account(index) for index in range(start, start + 50)], {}) for start in (0, 50, 100)]
+
+
+@pytest.fixture
+def mock_pages(mock_server):
+    """Three pages of mock Accounts with the Owner relationship null on every record of the first page."""
+    server = mock_server(records=250, page_size=100)
+    client = RestyClient(server.url)
+    pages = list(iter_pages(client, server.url + QUERY_PATH, HEADERS, server.url, QUERY_PATH, True, MOCK_QUERY))
+    client.close()
+    pages = copy.deepcopy(pages)
+    for record in pages[0][0]:
+        record['Owner'] = None
+    return pages
+
+
+def read_text(path, compression):
+    if compression == 'gzip':
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return f.read()
+    if compression == 'zstd':
+        with open(path, 'rb') as f:
+            return zstandard.ZstdDecompressor().stream_reader(f).read().decode('utf-8')
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def read_back(export_format, path, fields=None):
+    compression = 'gzip' if '(gzip)' in export_format else 'zstd' if '(zstd)' in export_format else None
+    if export_format == 'Parquet':
+        return pd.read_parquet(path)
+    if export_format == 'Arrow IPC':
+        with pa.OSFile(path, 'rb') as source:
+            return pa.ipc.open_file(source).read_pandas()
+    text = io.StringIO(read_text(path, compression))
+    if export_format.startswith('JSONL'):
+        return flatten_frame(pd.read_json(text, lines=True, dtype=False), fields=fields)[0]
+    return pd.read_csv(text, dtype=str, keep_default_na=False)
+
+
+def values(series):
+    return [None if value in ('', None) or value != value else str(value) for value in series]
+
+
+@pytest.mark.parametrize('export_format', list(EXPORT_FORMATS))
+def test_export_round_trip(tmp_path, export_format):
+    expected = DataFrameSink()
+    path = str(tmp_path / f"out{EXPORT_FORMATS[export_format][0]}")
+    drain(iter(PAGES), expected, export_sink(export_format, path))
+    frame = expected.frame()
+    written = read_back(export_format, path)
+    assert list(written.columns) == ['Id', 'Name', 'AnnualRevenue', 'Owner.Name']
+    assert len(written) == 150
+    for column in ('Id', 'Name', 'Owner.Name'):
+        assert values(written[column]) == values(frame[column])
+
+
+@pytest.mark.parametrize('export_format', list(EXPORT_FORMATS))
+def test_mock_pages_round_trip_with_a_null_first_page(tmp_path, mock_pages, export_format):
+    fields = query_fields(MOCK_QUERY)
+    expected = DataFrameSink(fields=fields)
+    path = str(tmp_path / f"out{EXPORT_FORMATS[export_format][0]}")
+    drain(iter(mock_pages), expected, export_sink(export_format, path, fields=fields))
+    frame = expected.frame()
+    assert list(frame.columns) == ['Id', 'Name', 'AnnualRevenue', 'IsActive__c', 'Owner.Name']
+
+    written = read_back(export_format, path, fields)
+    assert list(written.columns) == list(frame.columns)
+    assert len(written) == 250
+    for column in ('Id', 'Name', 'Owner.Name'):
+        assert values(written[column]) == values(frame[column])
+    assert values(written['Owner.Name'])[:100] == [None] * 100
+    assert values(written['Owner.Name'])[100] == 'Owner 0'
+
+
+@needs_pyarrow
+def test_parquet_keeps_describe_types(tmp_path):
+    schema = SObjectSchema('Account', {'AnnualRevenue': 'float', 'Industry': 'category'}, {'Industry': ['Energy', 'Retail']})
+    pages = [([dict(account(0), Industry='Energy')], {}), ([dict(account(1), Industry='Retail', AnnualRevenue=None)], {})]
+    path = str(tmp_path / 'out.parquet')
+    drain(iter(pages), export_sink('Parquet', path, schema=schema))
+    written = pd.read_parquet(path)
+    assert written['AnnualRevenue'].dtype == 'float64'
+    assert values(written['Industry']) == ['Energy', 'Retail']
+
+
+@needs_pyarrow
+@pytest.mark.parametrize('export_format', ['Parquet', 'Arrow IPC'])
+def test_empty_arrow_export_is_still_a_valid_file(tmp_path, export_format):
+    path = str(tmp_path / 'out')
+    drain(iter([]), export_sink(export_format, path))
+    assert len(read_back(export_format, path)) == 0
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match='Excel'):
+        export_sink('Excel', str(tmp_path / 'out.xlsx'))
+
+
+@needs_pyarrow
+@pytest.mark.parametrize('sink_class', [ParquetSink, ArrowIPCSink])
+def test_arrow_schema_from_query_fields(tmp_path, sink_class):
+    path = str(tmp_path / 'out')
+    drain(iter([(NULL_PAGE, {}), (FILLED_PAGE, {})]), sink_class(path, fields=query_fields(QUERY)))
+    table = read_back('Parquet' if sink_class is ParquetSink else 'Arrow IPC', path)
+    assert list(table.columns) == ['Id', 'Name', 'Account.Name', 'Account.Owner.Name']
+    assert values(table['Account.Name']) == [None, None, 'Acme']
+
+
+@needs_pyarrow
+@pytest.mark.parametrize('sink_class', [ParquetSink, ArrowIPCSink])
+def test_arrow_raises_on_schema_drift(tmp_path, sink_class):
+    with pytest.raises(ValueError, match='Account.Name'):
+        drain(iter([(NULL_PAGE, {}), (FILLED_PAGE, {})]), sink_class(str(tmp_path / 'out')))
@@ -0,0 +1,92 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from resty_client import RestyClient
+from resty_trace import SPAN_KIND_CLIENT, Tracer, span, wrap_context
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = b'{"sobjects": []}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_spans_nest_and_nothing_is_recorded_without_a_tracer():
+    with span('outside'):
+        pass
+    tracer = Tracer()
+    with tracer.activate():
+        with span('build') as attributes:
+            attributes['records'] = 10
+            with span('encode'):
+                pass
+    build, encode = sorted(tracer.to_records(), key=lambda record: record['name'])
+    assert encode['parent_id'] == build['span_id']
+    assert build['attributes'] == {'records': 10}
+    assert set(tracer.categories()) == {'network', 'salesforce', 'client', 'throttle/retry'}
+
+
+def test_gaps_between_http_phases_count_as_wait():
+    tracer = Tracer()
+    tracer.add_http('GET', 'https://org.example.com/services/data/v62.0/limits', 0, 10_000_000,
+                    [('connect', 2_000_000, 3_000_000), ('ttfb', 3_000_000, 8_000_000), ('download', 8_000_000, 10_000_000)])
+    assert tracer.breakdown() == {'wait': 2.0, 'connect': 1.0, 'ttfb': 5.0, 'download': 2.0}
+    assert tracer.categories() == {'network': 3.0, 'salesforce': 5.0, 'client': 0.0, 'throttle/retry': 2.0}
+    request = next(record for record in tracer.to_records() if record['kind'] == SPAN_KIND_CLIENT)
+    assert request['name'] == 'GET v62.0/limits'
+
+
+def test_worker_threads_record_into_the_callers_tracer():
+    tracer = Tracer()
+
+    def work(index):
+        with span('page', index=index):
+            pass
+
+    with tracer.activate(), ThreadPoolExecutor(2) as executor:
+        list(executor.map(wrap_context(work), range(4)))
+    assert sorted(record['attributes']['index'] for record in tracer.to_records()) == [0, 1, 2, 3]
+
+
+def test_otlp_export_carries_every_span():
+    tracer = Tracer()
+    with tracer.activate(), span('decode', bytes=12):
+        pass
+    scope = tracer.to_otlp()['resourceSpans'][0]['scopeSpans'][0]
+    (exported,) = scope['spans']
+    assert exported['traceId'] == tracer.trace_id and exported['name'] == 'decode'
+    assert exported['attributes'] == [{'key': 'bytes', 'value': {'intValue': '12'}}]
+
+
+def test_client_records_the_phases_of_a_request(server_url):
+    tracer = Tracer()
+    client = RestyClient(server_url)
+    try:
+        with tracer.activate():
+            assert client.get(server_url + '/services/data/v62.0/sobjects').json() == {'sobjects': []}
+    finally:
+        client.close()
+    (request,) = [record for record in tracer.to_records() if record['kind'] == SPAN_KIND_CLIENT]
+    phases = {record['name'] for record in tracer.to_records() if record['parent_id'] == request['span_id']}
+    assert {'connect', 'send', 'ttfb', 'download'} <= phases
+    assert request['attributes']['http.method'] == 'GET'
@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+
+from resty_viewer import FrameView, filter_choices, filter_kind, filter_mask, page_count
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        'Name': ['Acme', 'Globex', None, 'acme west', 'Initech'],
+        'Employees': pd.array([10, None, 30, 40, 50], dtype='Int64'),
+        'Industry': pd.Categorical(['Energy', 'Retail', 'Energy', None, 'Retail'], categories=['Energy', 'Retail', 'Mining']),
+        'Active': pd.array([True, False, None, True, True], dtype='boolean'),
+        'CreatedDate': pd.to_datetime(['2024-01-01', '2024-02-01', '2024-03-01', None, '2024-05-01'], utc=True),
+    })
+
+
+def test_filter_kinds_follow_the_dtype(df):
+    assert [filter_kind(df[column]) for column in df.columns] == ['text', 'range', 'values', 'values', 'range']
+    assert filter_choices(df['Industry']) == ['Energy', 'Retail', 'Mining']
+    assert filter_choices(df['Active']) == [True, False]
+
+
+def test_missing_values_never_pass_a_filter(df):
+    assert filter_mask(df['Name'], 'contains', 'ACME').tolist() == [True, False, False, True, False]
+    assert filter_mask(df['Employees'], 'range', (20, None)).tolist() == [False, False, True, True, True]
+    assert filter_mask(df['Industry'], 'in', ('Retail',)).tolist() == [False, True, False, False, True]
+    # Naive bounds are compared in the column's time zone
+    assert filter_mask(df['CreatedDate'], 'range', ('2024-02-01', '2024-03-31')).tolist() == [False, True, True, False, False]
+    with pytest.raises(ValueError):
+        filter_mask(df['Name'], 'startswith', 'A')
+
+
+def test_window_pages_filtered_sorted_rows(df):
+    view = FrameView(df)
+    rows, total = view.window(page=1, page_size=2, filters=(('Active', 'in', (True,)),), sort_by='Employees', ascending=False)
+    assert total == 3
+    assert rows['Name'].tolist() == ['Initech', 'acme west']
+    positions = view.positions
+    rows, _ = view.window(page=2, page_size=2, filters=(('Active', 'in', (True,)),), sort_by='Employees', ascending=False)
+    assert rows['Name'].tolist() == ['Acme']
+    # Moving between pages reuses the positions worked out for the filters and sort
+    assert view.positions is positions
+
+
+def test_sort_puts_missing_last_and_mixed_columns_sort_as_text():
+    view = FrameView(pd.DataFrame({'Value': [3, 'b', None, 1]}))
+    rows, _ = view.window(sort_by='Value')
+    assert rows['Value'].tolist()[:3] == [1, 3, 'b']
+    assert page_count(0, 100) == 1 and page_count(201, 100) == 3